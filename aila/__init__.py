@@ -1,4 +1,4 @@
 """Aila Ubuntu core package."""
 
-from .core.mind import MindPipeline
+from .core.mind import AsyncMindPipeline, MindPipeline
 from .runtime.orchestrator import Orchestrator
@@ -1,5 +1,8 @@
 """Core cognition pipeline."""
 
-from .mind import MindPipeline
+from .memory import SessionStore
+from .mind import AsyncMindPipeline, MindPipeline
 from .perception import PerceptionRouter
 from .planner import Planner
+from .synthesis import AsyncSentencePipeline, SentencePipeline, split_sentences
+from .response_cache import ResponseCache
@@ -0,0 +1,206 @@
+"""Per-session conversation memory bounded by a token budget with a rolling summary."""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from ..interfaces.offload import blocking_executor
+
+
+logger = logging.getLogger(__name__)
+
+_CJK = re.compile("[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_WORD = re.compile("[^\\s\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]+")
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and the assistant Aila. "
+    "Merge the new turns into the existing summary. Keep names, preferences, open questions and "
+    "commitments; drop small talk. Reply with the updated summary only, at most {limit} words."
+)
+
+Summarizer = Callable[[str, Sequence["Turn"], int], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap tokenizer-free estimate: one token per CJK character, ~4 characters per other word token."""
+    cjk = len(_CJK.findall(text))
+    other = sum(math.ceil(len(word) / 4) for word in _WORD.findall(text))
+    return cjk + other
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Keep the end of ``text`` within ``budget`` estimated tokens."""
+    if estimate_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high) // 2
+        if estimate_tokens(text[mid:]) <= budget:
+            high = mid
+        else:
+            low = mid + 1
+    return text[low:]
+
+
+@dataclass
+class Turn:
+    role: str
+    content: str
+    tokens: int
+
+
+class LLMSummarizer:
+    """Fold turns into the summary with one LLM call per fold, never re-reading folded turns."""
+
+    def __init__(self, llm: Any) -> None:
+        self.llm = llm
+
+    def __call__(self, summary: str, turns: Sequence[Turn], limit: int) -> str:
+        transcript = "\n".join(f"{turn.role}: {turn.content}" for turn in turns)
+        prompt = f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
+        return self.llm.complete(SUMMARY_SYSTEM_PROMPT.format(limit=limit), prompt).strip()
+
+
+@dataclass
+class Session:
+    summary: str = ""
+    turns: Deque[Turn] = field(default_factory=deque)
+    tokens: int = 0
+    folding: bool = False
+    touched: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class SessionStore:
+    """LRU map of session id to recent turns plus a rolling summary.
+
+    ``history`` always fits in ``token_budget`` tokens and the summary in
+    ``summary_budget``, so per-session memory and prompt size stay flat however long a
+    conversation runs. Once the turns exceed ``token_budget``, the oldest are folded
+    into the summary in the background until they are back under ``low_water`` of the
+    budget; the gap between the two marks keeps folds (and summary changes) rare.
+
+    Turns being folded stay in the history until their summary is committed. If the
+    summarizer fails they are kept for the next fold, unless the session has grown past
+    twice the budget, in which case they are dropped so memory stays bounded.
+    """
+
+    summarizer: Optional[Summarizer] = None
+    token_budget: int = 1024
+    summary_budget: int = 256
+    low_water: float = 0.5
+    max_sessions: int = 256
+    idle_ttl: float = 3600.0
+    folds: int = field(default=0, init=False)
+    _sessions: "OrderedDict[str, Session]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _session(self, session_id: str) -> Session:
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None or now - session.touched > self.idle_ttl:
+            session = Session()
+            self._sessions[session_id] = session
+        session.touched = now
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def summary(self, session_id: str) -> str:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.summary if session is not None else ""
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Most recent turns as chat messages, newest last, within ``token_budget``."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            kept: List[Turn] = []
+            used = 0
+            for turn in reversed(session.turns):
+                if used + turn.tokens > self.token_budget:
+                    break
+                kept.append(turn)
+                used += turn.tokens
+            # Never start the window on an assistant reply without its question.
+            while kept and kept[-1].role == "assistant":
+                kept.pop()
+            return [{"role": turn.role, "content": turn.content} for turn in reversed(kept)]
+
+    def record(self, session_id: str, prompt: str, reply: str) -> None:
+        with self._lock:
+            session = self._session(session_id)
+            for role, content in (("user", prompt), ("assistant", reply)):
+                turn = Turn(role, content, estimate_tokens(content))
+                session.turns.append(turn)
+                session.tokens += turn.tokens
+            if session.tokens <= self.token_budget or session.folding:
+                return
+            folded = self._take_oldest(session)
+            session.folding = True
+        blocking_executor().submit(self._fold, session, folded)
+
+    def _take_oldest(self, session: Session) -> List[Turn]:
+        """Oldest turns to fold so the rest fit ``low_water``; they stay in ``session.turns``."""
+        target = int(self.token_budget * self.low_water)
+        remaining = session.tokens
+        folded: List[Turn] = []
+        for turn in session.turns:
+            if remaining <= target and turn.role != "assistant":
+                break
+            remaining -= turn.tokens
+            folded.append(turn)
+        return folded
+
+    def _fold(self, session: Session, turns: List[Turn]) -> None:
+        summary = session.summary
+        failed = False
+        if self.summarizer is not None:
+            try:
+                summary = self.summarizer(summary, turns, self.summary_budget)
+            except Exception as exc:
+                failed = True
+                logger.warning("Conversation summary failed for %d turns: %s", len(turns), exc)
+        with self._lock:
+            if failed and session.tokens <= 2 * self.token_budget:
+                # Keep the turns; the next recorded turn retries the fold.
+                session.folding = False
+                return
+            if failed:
+                logger.warning("Dropping %d unsummarized turns to keep the session bounded", len(turns))
+            else:
+                session.summary = truncate_tokens(summary, self.summary_budget)
+                self.folds += 1
+            # Only appends happen meanwhile, so the folded turns are still the oldest.
+            for _ in turns:
+                session.tokens -= session.turns.popleft().tokens
+            # Turns recorded while this fold ran may already need the next one.
+            if session.tokens <= self.token_budget:
+                session.folding = False
+                return
+            turns = self._take_oldest(session)
+        blocking_executor().submit(self._fold, session, turns)
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "folds": self.folds,
+                "turn_tokens": sum(session.tokens for session in sessions),
+                "summary_tokens": sum(estimate_tokens(session.summary) for session in sessions),
+            }
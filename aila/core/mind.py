@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Iterable
+import threading
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, Iterator, Union
 
 from .perception import PerceptionRouter
 from .planner import Planner
+from .synthesis import AsyncSentencePipeline, SentencePipeline, aiter_sentences, iter_sentences
 from ..interfaces.speech import SpeechInterface
 
 
@@ -15,12 +17,89 @@ class MindPipeline:
     perception: PerceptionRouter
     planner: Planner
     speech: SpeechInterface
+    tts_workers: int = 3
+    _sentences: SentencePipeline = field(init=False, repr=False)
 
-    def handle_audio(self, audio_path: str) -> str:
+    def __post_init__(self) -> None:
+        self._sentences = SentencePipeline(speech=self.speech, max_workers=self.tts_workers)
+
+    def handle_audio(self, audio_path: str, context: Dict[str, str] | None = None) -> str:
         transcript = self.perception.transcribe(audio_path)
-        decision = self.planner.plan(transcript)
+        decision = self.planner.plan(transcript, context=context)
         return self.speech.speak(decision)
 
+    def handle_audio_stream(
+        self, audio_path: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> Iterator[Union[str, bytes]]:
+        """Yield one synthesized audio segment per reply sentence, in order.
+
+        Sentences are synthesized as soon as the planner stream completes them, so the
+        first segment is ready after the first sentence rather than the whole reply.
+        Segments are file paths, or in-memory audio when ``as_bytes`` is set.
+        """
+        transcript = self.perception.transcribe(audio_path)
+        stop = threading.Event()
+        sentences = iter_sentences(self.planner.plan_stream(transcript, context=context), stop)
+        return self._sentences.synthesize(sentences, as_bytes=as_bytes, stop=stop)
+
     def handle_text(self, text: str, context: Dict[str, str] | None = None) -> str:
         decision = self.planner.plan(text, context=context)
         return decision
+
+    def handle_text_stream(self, text: str, context: Dict[str, str] | None = None) -> Iterator[str]:
+        """Stream the planner decision as text deltas."""
+        return self.planner.plan_stream(text, context=context)
+
+
+@dataclass
+class AsyncMindPipeline:
+    """Asyncio variant of :class:`MindPipeline` for serving many sessions in one process.
+
+    It shares the perception, planner and speech components (and their connection
+    pools) with the synchronous pipeline.
+    """
+
+    perception: PerceptionRouter
+    planner: Planner
+    speech: SpeechInterface
+    tts_workers: int = 3
+
+    @classmethod
+    def from_pipeline(cls, mind: MindPipeline) -> "AsyncMindPipeline":
+        return cls(
+            perception=mind.perception,
+            planner=mind.planner,
+            speech=mind.speech,
+            tts_workers=mind.tts_workers,
+        )
+
+    async def handle_audio(
+        self, audio_path: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> Union[str, bytes]:
+        transcript = await self.perception.atranscribe(audio_path)
+        decision = await self.planner.aplan(transcript, context=context)
+        if as_bytes:
+            return await self.speech.asynthesize(decision)
+        return await self.speech.aspeak(decision)
+
+    async def handle_audio_stream(
+        self, audio_path: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> AsyncIterator[Union[str, bytes]]:
+        transcript = await self.perception.atranscribe(audio_path)
+        async for segment in self.respond_stream(transcript, context=context, as_bytes=as_bytes):
+            yield segment
+
+    async def respond_stream(
+        self, text: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> AsyncIterator[Union[str, bytes]]:
+        """Speak the reply to ``text`` sentence by sentence as it is planned."""
+        sentences = aiter_sentences(self.planner.aplan_stream(text, context=context))
+        pipeline = AsyncSentencePipeline(speech=self.speech, max_concurrency=self.tts_workers)
+        async for segment in pipeline.synthesize(sentences, as_bytes=as_bytes):
+            yield segment
+
+    async def handle_text(self, text: str, context: Dict[str, str] | None = None) -> str:
+        return await self.planner.aplan(text, context=context)
+
+    def handle_text_stream(self, text: str, context: Dict[str, str] | None = None) -> AsyncIterator[str]:
+        return self.planner.aplan_stream(text, context=context)
@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import tempfile
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Protocol
 
+from ..interfaces.offload import run_blocking
+from ..telemetry import stage
+
 
 class SpeechRecognitionClient(Protocol):
     def transcribe(self, audio_path: str) -> str: ...
@@ -15,4 +20,30 @@ class PerceptionRouter:
     recognizer: SpeechRecognitionClient
 
     def transcribe(self, audio_path: str) -> str:
-        return self.recognizer.transcribe(audio_path)
+        with stage("asr"):
+            return self.recognizer.transcribe(audio_path)
+
+    async def atranscribe(self, audio_path: str) -> str:
+        with stage("asr"):
+            atranscribe = getattr(self.recognizer, "atranscribe", None)
+            if atranscribe is None:
+                return await run_blocking(self.recognizer.transcribe, audio_path)
+            return await atranscribe(audio_path)
+
+    async def atranscribe_bytes(self, data: bytes, suffix: str = ".wav") -> str:
+        """Transcribe in-memory audio, spooling to a temp file only for path-based recognizers."""
+        atranscribe_bytes = getattr(self.recognizer, "atranscribe_bytes", None)
+        if atranscribe_bytes is not None:
+            with stage("asr"):
+                return await atranscribe_bytes(data, suffix)
+        path = await run_blocking(_write_temp, data, suffix)
+        try:
+            return await self.atranscribe(str(path))
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def _write_temp(data: bytes, suffix: str) -> Path:
+    with tempfile.NamedTemporaryFile(delete=False, prefix="aila-upload-", suffix=suffix) as handle:
+        handle.write(data)
+        return Path(handle.name)
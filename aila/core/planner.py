@@ -2,17 +2,195 @@
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from typing import Dict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
+from .memory import SessionStore
+from .response_cache import CacheKey, ResponseCache
 from ..interfaces.llm import LLMClient
+from ..telemetry import STAGE_SECONDS, add_span, annotate, stage
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+CacheSlot = Tuple[ResponseCache, CacheKey]
+History = Optional[List[Dict[str, str]]]
 
 
 @dataclass
 class Planner:
     llm: LLMClient
+    cache: Optional[ResponseCache] = None
+    memory: Optional[SessionStore] = None
 
     def plan(self, prompt: str, context: Dict[str, str] | None = None) -> str:
+        with stage("llm"):
+            decision = self._plan(prompt, context)
+        annotate(prompt_chars=len(prompt), reply_chars=len(decision))
+        return decision
+
+    def plan_stream(self, prompt: str, context: Dict[str, str] | None = None) -> Iterator[str]:
+        """Yield the decision incrementally as the LLM produces it."""
+        started = time.perf_counter()
+        first = True
+        chars = 0
+        for delta in self._plan_stream(prompt, context):
+            if first:
+                STAGE_SECONDS.labels("llm_first_token").observe(time.perf_counter() - started)
+                add_span("llm_first_token", started)
+                first = False
+            chars += len(delta)
+            yield delta
+        STAGE_SECONDS.labels("llm").observe(time.perf_counter() - started)
+        add_span("llm", started, streamed=True)
+        annotate(prompt_chars=len(prompt), reply_chars=chars)
+
+    async def aplan(self, prompt: str, context: Dict[str, str] | None = None) -> str:
+        with stage("llm"):
+            decision = await self._aplan(prompt, context)
+        annotate(prompt_chars=len(prompt), reply_chars=len(decision))
+        return decision
+
+    async def aplan_stream(self, prompt: str, context: Dict[str, str] | None = None) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        first = True
+        chars = 0
+        async for delta in self._aplan_stream(prompt, context):
+            if first:
+                STAGE_SECONDS.labels("llm_first_token").observe(time.perf_counter() - started)
+                add_span("llm_first_token", started)
+                first = False
+            chars += len(delta)
+            yield delta
+        STAGE_SECONDS.labels("llm").observe(time.perf_counter() - started)
+        add_span("llm", started, streamed=True)
+        annotate(prompt_chars=len(prompt), reply_chars=chars)
+
+    def _plan(self, prompt: str, context: Dict[str, str] | None = None) -> str:
+        session_id = self._session_id(context)
+        if session_id is not None:
+            system_prompt, history = self._with_memory(session_id, context)
+            decision = self.llm.complete(system_prompt, prompt, history=history)
+            self.memory.record(session_id, prompt, decision)
+            return decision
+        system_prompt = self._system_prompt(context)
+        slot = self._cache_slot(prompt, system_prompt, context)
+        if slot is not None:
+            cached = slot[0].get(slot[1])
+            if cached is not None:
+                return cached
+        decision = self.llm.complete(system_prompt, prompt)
+        if slot is not None:
+            slot[0].put(slot[1], decision)
+        return decision
+
+    def _plan_stream(self, prompt: str, context: Dict[str, str] | None = None) -> Iterator[str]:
+        session_id = self._session_id(context)
+        if session_id is not None:
+            return self._session_stream(session_id, prompt, context)
+        system_prompt = self._system_prompt(context)
+        slot = self._cache_slot(prompt, system_prompt, context)
+        if slot is None:
+            return self.llm.stream(system_prompt, prompt)
+        return self._cached_stream(slot, system_prompt, prompt)
+
+    def _cached_stream(self, slot: CacheSlot, system_prompt: str, prompt: str) -> Iterator[str]:
+        cache, key = slot
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        parts: List[str] = []
+        for delta in self.llm.stream(system_prompt, prompt):
+            parts.append(delta)
+            yield delta
+        cache.put(key, "".join(parts))
+
+    def _session_stream(self, session_id: str, prompt: str, context: Dict[str, str] | None) -> Iterator[str]:
+        system_prompt, history = self._with_memory(session_id, context)
+        parts: List[str] = []
+        for delta in self.llm.stream(system_prompt, prompt, history=history):
+            parts.append(delta)
+            yield delta
+        self.memory.record(session_id, prompt, "".join(parts))
+
+    async def _aplan(self, prompt: str, context: Dict[str, str] | None = None) -> str:
+        session_id = self._session_id(context)
+        if session_id is not None:
+            system_prompt, history = self._with_memory(session_id, context)
+            decision = await self.llm.acomplete(system_prompt, prompt, history=history)
+            self.memory.record(session_id, prompt, decision)
+            return decision
+        system_prompt = self._system_prompt(context)
+        slot = self._cache_slot(prompt, system_prompt, context)
+        if slot is not None:
+            cached = slot[0].get(slot[1])
+            if cached is not None:
+                return cached
+        decision = await self.llm.acomplete(system_prompt, prompt)
+        if slot is not None:
+            slot[0].put(slot[1], decision)
+        return decision
+
+    def _aplan_stream(self, prompt: str, context: Dict[str, str] | None = None) -> AsyncIterator[str]:
+        session_id = self._session_id(context)
+        if session_id is not None:
+            return self._asession_stream(session_id, prompt, context)
+        system_prompt = self._system_prompt(context)
+        slot = self._cache_slot(prompt, system_prompt, context)
+        if slot is None:
+            return self.llm.astream(system_prompt, prompt)
+        return self._acached_stream(slot, system_prompt, prompt)
+
+    async def _acached_stream(self, slot: CacheSlot, system_prompt: str, prompt: str) -> AsyncIterator[str]:
+        cache, key = slot
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        parts: List[str] = []
+        async for delta in self.llm.astream(system_prompt, prompt):
+            parts.append(delta)
+            yield delta
+        cache.put(key, "".join(parts))
+
+    async def _asession_stream(
+        self, session_id: str, prompt: str, context: Dict[str, str] | None
+    ) -> AsyncIterator[str]:
+        system_prompt, history = self._with_memory(session_id, context)
+        parts: List[str] = []
+        async for delta in self.llm.astream(system_prompt, prompt, history=history):
+            parts.append(delta)
+            yield delta
+        self.memory.record(session_id, prompt, "".join(parts))
+
+    def _session_id(self, context: Dict[str, str] | None) -> Optional[str]:
+        """Session to remember the turn in; replies that depend on history are never cached."""
+        if self.memory is None or not context or not context.get("session_id"):
+            return None
+        return str(context["session_id"])
+
+    def _with_memory(self, session_id: str, context: Dict[str, str] | None) -> Tuple[str, History]:
+        system_prompt = self._system_prompt(context)
+        summary = self.memory.summary(session_id)
+        # The summary goes after the fixed persona text and only changes when turns
+        # are folded, so the persona and replayed turns stay a stable prompt prefix
+        # that local backends can serve from their KV cache.
+        if summary:
+            system_prompt = f"{system_prompt}\n\nConversation so far (summary): {summary}"
+        return system_prompt, self.memory.history(session_id) or None
+
+    def _cache_slot(self, prompt: str, system_prompt: str, context: Dict[str, str] | None) -> Optional[CacheSlot]:
+        """Cache and key when a cache is configured and the request opted in via ``context["cache"]``."""
+        if self.cache is None or not context:
+            return None
+        if str(context.get("cache", "")).lower() not in _TRUTHY:
+            return None
+        model = getattr(self.llm, "model", None) or getattr(self.llm, "api_url", None) or type(self.llm).__name__
+        key = self.cache.key(prompt, system_prompt, getattr(self.llm, "temperature", None), model)
+        return self.cache, key
+
+    @staticmethod
+    def _system_prompt(context: Dict[str, str] | None) -> str:
         context = context or {}
-        system_prompt = context.get("system_prompt", "You are Aila, an empathetic assistant.")
-        return self.llm.complete(system_prompt, prompt)
+        return context.get("system_prompt", "You are Aila, an empathetic assistant.")
@@ -0,0 +1,84 @@
+"""In-memory cache of planner replies for repeated prompts."""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = "。！？!?.,，、；;：:~～…\"'“”‘’ "
+
+CacheKey = Tuple[Hashable, ...]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold width, case, whitespace and trailing punctuation so near-identical FAQs match."""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(_EDGE_PUNCTUATION)
+
+
+@dataclass
+class ResponseCache:
+    """LRU cache with a per-entry TTL and a bound on the number of entries."""
+
+    ttl: float = 3600.0
+    max_entries: int = 1024
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    expirations: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    _entries: "OrderedDict[CacheKey, Tuple[float, str]]" = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @staticmethod
+    def key(prompt: str, system_prompt: str, temperature: Any, model: Any) -> CacheKey:
+        return (normalize_prompt(prompt), system_prompt, temperature, model)
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,235 @@
+"""Sentence-level speech synthesis pipelined behind the planner stream."""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Union
+
+from ..interfaces.speech import SpeechInterface
+
+# Full-width terminators end a sentence on their own; Latin ones only when followed by
+# whitespace so decimals ("3.14") and abbreviations inside words are left alone.
+_SENTENCE_END = re.compile(r"[。！？；…\n]+|[.!?;]+(?=\s)")
+_TRAILING_CLOSERS = "”’」』）)\"'"
+
+
+class SentenceSplitter:
+    """Incrementally cut streamed text into sentences (Chinese and Latin punctuation)."""
+
+    def __init__(self) -> None:
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        sentences: List[str] = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            end = match.end()
+            while end < len(self._buffer) and self._buffer[end] in _TRAILING_CLOSERS:
+                end += 1
+            sentence = self._buffer[start:end].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = end
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        sentence = self._buffer.strip()
+        self._buffer = ""
+        return [sentence] if sentence else []
+
+
+def split_sentences(text: str) -> List[str]:
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+def iter_sentences(deltas: Iterable[str], stop: Optional[threading.Event] = None) -> Iterator[str]:
+    """Regroup a stream of text deltas into complete sentences.
+
+    Once ``stop`` is set the delta stream is closed at the next delta, so an abandoned
+    reply stops generating (and frees its LLM slot) mid-sentence.
+    """
+    splitter = SentenceSplitter()
+    upstream = iter(deltas)
+    for delta in upstream:
+        if stop is not None and stop.is_set():
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                close()
+            return
+        yield from splitter.feed(delta)
+    yield from splitter.flush()
+
+
+async def aiter_sentences(deltas: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Async counterpart of :func:`iter_sentences`."""
+    splitter = SentenceSplitter()
+    async for delta in deltas:
+        for sentence in splitter.feed(delta):
+            yield sentence
+    for sentence in splitter.flush():
+        yield sentence
+
+
+_DONE = object()
+
+
+@dataclass
+class SentencePipeline:
+    """Synthesize sentences concurrently and yield the audio in sentence order.
+
+    Sentences are pulled from the source on a background thread, so synthesis of the
+    first sentence starts while the LLM is still producing the rest. At most
+    ``max_in_flight`` sentences are queued or synthesizing at once.
+    """
+
+    speech: SpeechInterface
+    max_workers: int = 3
+    max_in_flight: int = 6
+    _executor: Optional[ThreadPoolExecutor] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="aila-tts"
+                )
+            return self._executor
+
+    def synthesize(
+        self,
+        sentences: Iterable[str],
+        *,
+        as_bytes: bool = False,
+        stop: Optional[threading.Event] = None,
+    ) -> Iterator[Union[str, bytes]]:
+        """Yield audio file paths, or in-memory audio when ``as_bytes`` is set.
+
+        ``stop`` is set when the consumer goes away; pass the same event to
+        :func:`iter_sentences` so the LLM stream is closed without waiting for the
+        next full sentence.
+        """
+        pool = self._pool()
+        render = self.speech.synthesize if as_bytes else self.speech.speak
+        pending: "queue.Queue[object]" = queue.Queue(maxsize=max(1, self.max_in_flight))
+        if stop is None:
+            stop = threading.Event()
+
+        def put(item: object) -> bool:
+            while not stop.is_set():
+                try:
+                    pending.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def drain() -> None:
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if isinstance(item, Future):
+                    item.cancel()
+
+        def produce() -> None:
+            upstream = iter(sentences)
+            try:
+                for sentence in upstream:
+                    if stop.is_set():
+                        return
+                    # Carry the trace into the worker like run_blocking does.
+                    job = pool.submit(contextvars.copy_context().run, render, sentence)
+                    if not put(job):
+                        job.cancel()
+                        return
+            except BaseException as exc:  # surfaced to the consumer in order
+                put(exc)
+                return
+            finally:
+                if stop.is_set():
+                    # Abandoned: stop reading the LLM stream and drop anything that
+                    # slipped into the queue after the consumer drained it.
+                    close = getattr(upstream, "close", None)
+                    if close is not None:
+                        close()
+                    drain()
+            put(_DONE)
+
+        producer = threading.Thread(
+            target=contextvars.copy_context().run, args=(produce,), name="aila-tts-feed", daemon=True
+        )
+        producer.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item.result()  # type: ignore[union-attr]
+        finally:
+            stop.set()
+            drain()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+@dataclass
+class AsyncSentencePipeline:
+    """Asyncio counterpart of :class:`SentencePipeline` for one conversation turn."""
+
+    speech: SpeechInterface
+    max_concurrency: int = 3
+    max_in_flight: int = 6
+
+    async def synthesize(
+        self, sentences: AsyncIterable[str], *, as_bytes: bool = False
+    ) -> AsyncIterator[Union[str, bytes]]:
+        import asyncio  # deferred so synchronous CLI runs do not import it
+
+        render = self.speech.asynthesize if as_bytes else self.speech.aspeak
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending: "asyncio.Queue[object]" = asyncio.Queue(maxsize=max(1, self.max_in_flight))
+
+        async def bounded(sentence: str) -> Union[str, bytes]:
+            async with semaphore:
+                return await render(sentence)
+
+        async def produce() -> None:
+            try:
+                async for sentence in sentences:
+                    await pending.put(asyncio.ensure_future(bounded(sentence)))
+            except Exception as exc:  # surfaced to the consumer in order
+                await pending.put(exc)
+                return
+            await pending.put(_DONE)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                item = await pending.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield await item  # type: ignore[misc]
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if isinstance(item, asyncio.Future):
+                    item.cancel()
@@ -4,12 +4,16 @@ from __future__ import annotations
 
 import base64
 import logging
+import os
+import tempfile
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Optional
 
-from tencentcloud.asr.v20190614 import asr_client, models
-from tencentcloud.common import credential
-from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+from .offload import run_blocking
+from .throttle import Throttle, ThrottledError, call_tencent, get_throttle, tencent_client_profile
+from ..telemetry import record_bytes, record_response, span
 
 
 logger = logging.getLogger(__name__)
@@ -21,6 +25,28 @@ class SpeechRecognitionClient:
     def transcribe(self, audio_path: str) -> str:
         raise NotImplementedError
 
+    def transcribe_bytes(self, data: bytes, suffix: str = ".wav") -> str:
+        """Transcribe in-memory audio; defaults to spooling it to a temp file for :meth:`transcribe`."""
+        with tempfile.NamedTemporaryFile(prefix="aila-asr-", suffix=suffix) as handle:
+            handle.write(data)
+            handle.flush()
+            return self.transcribe(handle.name)
+
+    async def atranscribe(self, audio_path: str) -> str:
+        """Async transcription; defaults to running :meth:`transcribe` on the shared pool."""
+        return await run_blocking(self.transcribe, audio_path)
+
+
+# Content types understood by the Whisper service, keyed by file suffix.
+_WHISPER_CONTENT_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".pcm": "audio/L16;rate=16000",
+}
+
 
 @dataclass
 class TencentASRClient(SpeechRecognitionClient):
@@ -32,25 +58,49 @@ class TencentASRClient(SpeechRecognitionClient):
     engine_model: str = "16k_zh"
     audio_format: str = "wav"
     enable_punctuation: bool = True
-    _client: asr_client.AsrClient = field(init=False, repr=False)
-
-    def __post_init__(self) -> None:
-        cred = credential.Credential(self.secret_id, self.secret_key)
-        self._client = asr_client.AsrClient(cred, self.region)
-        logger.info(
-            "Initialized Tencent ASR client (region=%s, model=%s, format=%s)",
-            self.region,
-            self.engine_model,
-            self.audio_format,
-        )
+    endpoint: Optional[str] = field(default_factory=lambda: os.getenv("TENCENT_ASR_ENDPOINT") or None)
+    throttle: Throttle = field(default_factory=lambda: get_throttle("tencent_asr"), repr=False)
+    _client: Any = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _sdk_client(self) -> Any:
+        """Build the SDK client on first use; importing tencentcloud dominates startup."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.secret_id or not self.secret_key:
+                        raise RuntimeError(
+                            "TENCENT_SECRET_ID and TENCENT_SECRET_KEY must be set "
+                            "(see system/etc/aila/env.d/tencent.conf)."
+                        )
+                    from tencentcloud.asr.v20190614 import asr_client
+                    from tencentcloud.common import credential
+
+                    cred = credential.Credential(self.secret_id, self.secret_key)
+                    self._client = asr_client.AsrClient(cred, self.region, tencent_client_profile(self.endpoint))
+                    logger.info(
+                        "Initialized Tencent ASR client (region=%s, model=%s, format=%s)",
+                        self.region,
+                        self.engine_model,
+                        self.audio_format,
+                    )
+        return self._client
 
     def transcribe(self, audio_path: str) -> str:
         path = Path(audio_path)
         if not path.exists():
             raise FileNotFoundError(f"Audio file not found: {path}")
+        result = self.transcribe_bytes(path.read_bytes())
+        logger.debug("Tencent ASR transcription completed for %s", path)
+        return result
 
-        data = path.read_bytes()
-        encoded = base64.b64encode(data).decode("utf-8")
+    def transcribe_bytes(self, data: bytes, suffix: str = ".wav") -> str:
+        from tencentcloud.asr.v20190614 import models
+        from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+
+        client = self._sdk_client()
+        with span("base64_encode", bytes=len(data)):
+            encoded = base64.b64encode(data).decode("utf-8")
 
         request = models.SentenceRecognitionRequest()
         request.EngineModelType = self.engine_model
@@ -60,14 +110,125 @@ class TencentASRClient(SpeechRecognitionClient):
         request.EnablePunctuation = 1 if self.enable_punctuation else 0
 
         try:
-            response = self._client.SentenceRecognition(request)
+            response = self.throttle.call(call_tencent, client.SentenceRecognition, request)
+        except ThrottledError as exc:
+            raise ThrottledError(f"Tencent ASR transcription throttled: {exc}") from exc
         except TencentCloudSDKException as exc:  # pragma: no cover - network failure
             logger.error("Tencent ASR transcription failed: %s", exc)
             raise RuntimeError(f"Tencent ASR transcription failed: {exc}") from exc
 
         result = getattr(response, "Result", None)
+        record_bytes(self.throttle.name, sent=len(encoded), received=len(result or ""))
         if not result:
             raise RuntimeError("Tencent ASR response missing Result field")
-
-        logger.debug("Tencent ASR transcription completed for %s", path)
         return result
+
+
+def _whisper_error(status: int, body: str, retry_after: Optional[str]) -> RuntimeError:
+    if status == 429:
+        try:
+            delay: Optional[float] = float(retry_after) if retry_after else None
+        except ValueError:
+            delay = None
+        return ThrottledError(f"Whisper service busy: HTTP 429 - {body}", retry_after=delay)
+    return RuntimeError(f"Whisper transcription failed: HTTP {status} - {body}")
+
+
+@dataclass
+class WhisperServiceClient(SpeechRecognitionClient):
+    """Client for the local ``services/whisper`` service.
+
+    Audio is posted as the request body over keep-alive connections, so no shared disk
+    or base64 encoding is involved.
+    """
+
+    base_url: str = field(default_factory=lambda: os.getenv("WHISPER_URL", "http://127.0.0.1:9081"))
+    language: Optional[str] = field(default_factory=lambda: os.getenv("WHISPER_LANGUAGE") or None)
+    timeout: float = field(default_factory=lambda: float(os.getenv("WHISPER_TIMEOUT", "30")))
+    max_connections: int = field(default_factory=lambda: int(os.getenv("WHISPER_MAX_CONNECTIONS", "8")))
+    throttle: Throttle = field(default_factory=lambda: get_throttle("whisper"), repr=False)
+    _session: Any = field(default=None, init=False, repr=False)
+    _async_http: Any = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def url(self) -> str:
+        return self.base_url.rstrip("/") + "/transcribe"
+
+    def _params(self) -> dict:
+        return {"language": self.language} if self.language else {}
+
+    def _http(self) -> Any:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _async_client(self) -> Any:
+        if self._async_http is None:
+            import httpx
+
+            self._async_http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._async_http
+
+    def transcribe(self, audio_path: str) -> str:
+        path = Path(audio_path)
+        if not path.exists():
+            raise FileNotFoundError(f"Audio file not found: {path}")
+        return self.transcribe_bytes(path.read_bytes(), path.suffix)
+
+    def transcribe_bytes(self, data: bytes, suffix: str = ".wav") -> str:
+        return self.throttle.call(self._post, data, _WHISPER_CONTENT_TYPES.get(suffix.lower(), "audio/wav"))
+
+    def _post(self, data: bytes, content_type: str) -> str:
+        response = self._http().post(
+            self.url,
+            data=data,
+            params=self._params(),
+            headers={"Content-Type": content_type},
+            timeout=self.timeout,
+        )
+        record_response(self.throttle.name, response)
+        if not response.ok:
+            raise _whisper_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        return response.json()["text"]
+
+    async def atranscribe(self, audio_path: str) -> str:
+        path = Path(audio_path)
+        data = await run_blocking(path.read_bytes)
+        return await self.atranscribe_bytes(data, path.suffix)
+
+    async def atranscribe_bytes(self, data: bytes, suffix: str = ".wav") -> str:
+        content_type = _WHISPER_CONTENT_TYPES.get(suffix.lower(), "audio/wav")
+        return await self.throttle.acall(self._apost, data, content_type)
+
+    async def _apost(self, data: bytes, content_type: str) -> str:
+        response = await self._async_client().post(
+            self.url,
+            content=data,
+            params=self._params(),
+            headers={"Content-Type": content_type},
+        )
+        record_response(self.throttle.name, response)
+        if response.is_error:
+            raise _whisper_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        return response.json()["text"]
+
+    async def aclose(self) -> None:
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
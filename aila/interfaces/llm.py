@@ -5,28 +5,108 @@ from __future__ import annotations
 import base64
 import hashlib
 import hmac
+import json
 import os
 import time
 from dataclasses import dataclass, field
-from email.utils import formatdate
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
 from urllib.parse import urlparse
 
-import requests
+from .throttle import Throttle, ThrottledError, get_throttle
+from ..telemetry import record_bytes, record_response
 
 
 class LLMError(RuntimeError):
     """Raised when the LLM backend returns an error response."""
 
 
-def _build_messages(system_prompt: str | None, prompt: str) -> List[Dict[str, str]]:
+class SparkThrottledError(LLMError, ThrottledError):
+    """Spark rejected the request because a QPS or concurrency quota was exceeded."""
+
+
+# Spark error codes for "QPS over limit" and "concurrency over limit".
+_SPARK_THROTTLE_CODES = {11202, 11203}
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _spark_code_error(code: Any, message: Any) -> LLMError:
+    if code in _SPARK_THROTTLE_CODES:
+        return SparkThrottledError(f"Spark throttled {code}: {message}")
+    return LLMError(f"Spark error {code}: {message}")
+
+
+def _spark_http_error(status: int, body: str, retry_after: Optional[str]) -> LLMError:
+    try:
+        code = json.loads(body).get("code")
+    except (ValueError, AttributeError):
+        code = None
+    if status == 429 or code in _SPARK_THROTTLE_CODES:
+        return SparkThrottledError(
+            f"Spark request throttled: HTTP {status} - {body}", retry_after=_retry_after(retry_after)
+        )
+    return LLMError(f"Spark request failed: HTTP {status} - {body}")
+
+
+def _build_messages(
+    system_prompt: str | None, prompt: str, history: Optional[List[Dict[str, str]]] = None
+) -> List[Dict[str, str]]:
     messages: List[Dict[str, str]] = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history or ())
     messages.append({"role": "user", "content": prompt})
     return messages
 
 
+_SSE_DONE = "[DONE]"
+
+
+def _sse_data(line: str) -> Optional[str]:
+    """Return the ``data:`` payload of a server-sent event line, if any."""
+    if not line or not line.startswith("data:"):
+        return None
+    return line[len("data:") :].strip()
+
+
+def _iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the ``data:`` payloads of a server-sent event stream."""
+    for line in lines:
+        data = _sse_data(line)
+        if data is None:
+            continue
+        if data == _SSE_DONE:
+            return
+        yield data
+
+
+def _parse_completion(data: Any) -> str:
+    if isinstance(data, dict) and data.get("code", 0) != 0:
+        raise _spark_code_error(data.get("code"), data.get("message"))
+    try:
+        return data["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError) as exc:
+        raise LLMError(f"Unexpected Spark response shape: {data}") from exc
+
+
+def _parse_stream_chunk(data: str) -> str:
+    try:
+        chunk = json.loads(data)
+    except ValueError as exc:
+        raise LLMError(f"Malformed Spark stream chunk: {data!r}") from exc
+    if chunk.get("code", 0) != 0:
+        raise _spark_code_error(chunk.get("code"), chunk.get("message"))
+    try:
+        return chunk["choices"][0]["delta"].get("content") or ""
+    except (KeyError, IndexError, TypeError, AttributeError) as exc:
+        raise LLMError(f"Unexpected Spark stream chunk shape: {chunk}") from exc
+
+
 @dataclass
 class LLMClient:
     """Thin wrapper around the iFLYTEK Spark chat completions endpoint."""
@@ -40,6 +120,8 @@ class LLMClient:
     temperature: float = field(default_factory=lambda: float(os.getenv("XUNFEI_TEMPERATURE", "0.7")))
     max_tokens: int = field(default_factory=lambda: int(os.getenv("XUNFEI_MAX_TOKENS", "2048")))
     timeout: int = field(default_factory=lambda: int(os.getenv("XUNFEI_TIMEOUT", "60")))
+    max_connections: int = field(default_factory=lambda: int(os.getenv("XUNFEI_MAX_CONNECTIONS", "32")))
+    throttle: Throttle = field(default_factory=lambda: get_throttle("spark"), repr=False)
 
     def __post_init__(self) -> None:
         if not self.api_key:
@@ -56,9 +138,20 @@ class LLMClient:
         parsed = urlparse(self.api_url)
         self._host = parsed.netloc
         self._path = parsed.path or "/v2/chat/completions"
-        self._session = requests.Session()
+        self._session: Any = None
+        self._async_http: Any = None
+
+    def _http(self) -> Any:
+        """``requests.Session`` created on first use; importing requests is slow at startup."""
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+        return self._session
 
     def _build_headers(self) -> Dict[str, str]:
+        from email.utils import formatdate
+
         date_header = formatdate(time.time(), usegmt=True)
         signature_origin = f"host: {self._host}\ndate: {date_header}\nPOST {self._path} HTTP/1.1"
         signature_sha = hmac.new(
@@ -80,28 +173,147 @@ class LLMClient:
             "Date": date_header,
         }
 
-    def complete(self, system_prompt: str, prompt: str) -> str:
-        messages = _build_messages(system_prompt, prompt)
-        payload = {
+    def _build_payload(
+        self, system_prompt: str, prompt: str, *, stream: bool = False, history: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
             "app_id": self.app_id,
-            "messages": messages,
+            "messages": _build_messages(system_prompt, prompt, history),
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def complete(self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        """Chat completion; ``history`` holds earlier user/assistant messages, oldest first."""
+        return self.throttle.call(self._complete_once, self._build_payload(system_prompt, prompt, history=history))
 
-        response = self._session.post(
+    def _complete_once(self, payload: Dict[str, Any]) -> str:
+        response = self._http().post(
             self.api_url,
             headers=self._build_headers(),
             json=payload,
             timeout=self.timeout,
         )
+        record_response(self.throttle.name, response)
+        if not response.ok:  # pragma: no cover - network failure
+            raise _spark_http_error(response.status_code, response.text, response.headers.get("Retry-After"))
+
+        return _parse_completion(response.json())
+
+    def stream(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> Iterator[str]:
+        """Yield content deltas as Spark streams them back (SSE ``stream: true``).
+
+        Throttling is retried while opening the stream; a quota error reported inside
+        an already started stream surfaces as :class:`SparkThrottledError`. The stream
+        holds its concurrency slot until it closes, as Spark counts open streams.
+        """
+        payload = self._build_payload(system_prompt, prompt, stream=True, history=history)
+        response, lease = self.throttle.call_held(self._open_stream, payload)
+        received = 0
         try:
-            response.raise_for_status()
-        except requests.HTTPError as exc:  # pragma: no cover - network failure
-            raise LLMError(f"Spark request failed: {exc} - {response.text}") from exc
+            with response:
+                # Decode explicitly: SSE responses rarely declare a charset and requests
+                # would otherwise fall back to ISO-8859-1 for Chinese text.
+                for data in _iter_sse_data(raw.decode("utf-8") for raw in response.iter_lines()):
+                    received += len(data)
+                    delta = _parse_stream_chunk(data)
+                    if delta:
+                        yield delta
+        except SparkThrottledError:
+            lease.release(throttled=True)
+            raise
+        finally:
+            lease.release()
+            record_bytes(self.throttle.name, received=received)
+
+    def _open_stream(self, payload: Dict[str, Any]) -> Any:
+        response = self._http().post(
+            self.api_url,
+            headers=self._build_headers(),
+            json=payload,
+            timeout=self.timeout,
+            stream=True,
+        )
+        record_response(self.throttle.name, response, streamed=True)
+        if not response.ok:  # pragma: no cover - network failure
+            with response:
+                raise _spark_http_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        return response
 
-        data = response.json()
+    def _async_client(self) -> Any:
+        """Shared ``httpx.AsyncClient`` so concurrent sessions reuse pooled connections."""
+        if self._async_http is None:
+            import httpx
+
+            self._async_http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._async_http
+
+    async def acomplete(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        payload = self._build_payload(system_prompt, prompt, history=history)
+        return await self.throttle.acall(self._acomplete_once, payload)
+
+    async def _acomplete_once(self, payload: Dict[str, Any]) -> str:
+        response = await self._async_client().post(
+            self.api_url,
+            headers=self._build_headers(),
+            json=payload,
+        )
+        record_response(self.throttle.name, response)
+        if response.is_error:  # pragma: no cover - network failure
+            raise _spark_http_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        return _parse_completion(response.json())
+
+    async def astream(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
+        """Async counterpart of :meth:`stream`."""
+        payload = self._build_payload(system_prompt, prompt, stream=True, history=history)
+        response, lease = await self.throttle.acall_held(self._aopen_stream, payload)
+        received = 0
         try:
-            return data["choices"][0]["message"]["content"]
-        except (KeyError, IndexError, TypeError) as exc:
-            raise LLMError(f"Unexpected Spark response shape: {data}") from exc
+            async for line in response.aiter_lines():
+                received += len(line)
+                data = _sse_data(line)
+                if data is None:
+                    continue
+                if data == _SSE_DONE:
+                    return
+                delta = _parse_stream_chunk(data)
+                if delta:
+                    yield delta
+        except SparkThrottledError:
+            lease.release(throttled=True)
+            raise
+        finally:
+            lease.release()
+            record_bytes(self.throttle.name, received=received)
+            await response.aclose()
+
+    async def _aopen_stream(self, payload: Dict[str, Any]) -> Any:
+        client = self._async_client()
+        request = client.build_request("POST", self.api_url, headers=self._build_headers(), json=payload)
+        response = await client.send(request, stream=True)
+        record_response(self.throttle.name, response, streamed=True)
+        if response.is_error:  # pragma: no cover - network failure
+            body = (await response.aread()).decode("utf-8", "replace")
+            await response.aclose()
+            raise _spark_http_error(response.status_code, body, response.headers.get("Retry-After"))
+        return response
+
+    async def aclose(self) -> None:
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
@@ -0,0 +1,35 @@
+"""Shared thread pool for running blocking SDK calls from asyncio code."""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def blocking_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool used for SDKs without a native async API."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = int(os.getenv("AILA_BLOCKING_WORKERS", "32"))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aila-blocking")
+        return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    import asyncio  # deferred: only async callers pay for it
+
+    loop = asyncio.get_running_loop()
+    # Carry context variables over to the worker thread, like asyncio.to_thread does.
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(blocking_executor(), call)
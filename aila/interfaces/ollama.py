@@ -0,0 +1,414 @@
+"""LLM client for the local Ollama runtime (``services/ollama``)."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional
+
+from .llm import LLMError, _build_messages, _retry_after
+from .offload import run_blocking
+from .residency import ModelResidencyScheduler
+from .throttle import Throttle, ThrottledError, get_throttle
+from ..telemetry import record_bytes, record_response
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_ADAPTER = Path(__file__).resolve().parents[2] / "services" / "ollama" / "main" / "adapter.py"
+
+
+class OllamaThrottledError(LLMError, ThrottledError):
+    """Ollama refused the request because its queue (``OLLAMA_MAX_QUEUE``) is full."""
+
+
+def _ollama_error(status: int, body: str, retry_after: Optional[str] = None) -> LLMError:
+    try:
+        message = json.loads(body).get("error") or body
+    except (ValueError, AttributeError):
+        message = body
+    if status in {429, 503}:
+        return OllamaThrottledError(f"Ollama busy: HTTP {status} - {message}", retry_after=_retry_after(retry_after))
+    return LLMError(f"Ollama request failed: HTTP {status} - {message}")
+
+
+def _parse_stream_line(line: str | bytes) -> Dict[str, Any]:
+    try:
+        data = json.loads(line)
+    except ValueError as exc:
+        raise LLMError(f"malformed Ollama stream line: {line[:200]!r}") from exc
+    if not isinstance(data, dict):
+        raise LLMError(f"malformed Ollama stream line: {line[:200]!r}")
+    return data
+
+
+def _parse_chat(data: Dict[str, Any]) -> str:
+    if data.get("error"):
+        raise LLMError(f"Ollama error: {data['error']}")
+    try:
+        return data["message"].get("content") or ""
+    except (KeyError, AttributeError) as exc:
+        raise LLMError(f"Unexpected Ollama response shape: {data}") from exc
+
+
+@dataclass
+class PromptAdapter:
+    """``transform_prompt``/``post_process`` hooks from ``services/ollama/main/adapter.py``."""
+
+    transform_prompt: Callable[[str, Optional[Dict[str, Any]]], str]
+    post_process: Callable[[str], str]
+
+    @classmethod
+    def identity(cls) -> "PromptAdapter":
+        return cls(transform_prompt=lambda prompt, context=None: prompt, post_process=lambda text: text)
+
+    @classmethod
+    def load(cls, path: str | Path | None) -> "PromptAdapter":
+        """Load the hooks from a file; the services tree is not an importable package.
+
+        An empty ``path`` disables the hooks; a configured path that does not exist is
+        an error, so a deployment never silently drops the persona.
+        """
+        if not path:
+            return cls.identity()
+        if not Path(path).is_file():
+            raise LLMError(f"Ollama adapter {path} not found; set OLLAMA_ADAPTER to its deployed path or to ''")
+        spec = importlib.util.spec_from_file_location("aila_ollama_adapter", path)
+        if spec is None or spec.loader is None:
+            raise LLMError(f"Cannot load Ollama adapter from {path}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        identity = cls.identity()
+        return cls(
+            transform_prompt=getattr(module, "transform_prompt", identity.transform_prompt),
+            post_process=getattr(module, "post_process", identity.post_process),
+        )
+
+
+def _render(messages: List[Dict[str, str]]) -> str:
+    return "".join(f"<{message['role']}>{message['content']}\n" for message in messages)
+
+
+@dataclass
+class PrefixCache:
+    """Track how much of each prompt Ollama can serve from its KV cache.
+
+    The runner keeps the last sequence evaluated in each of its ``slots``
+    (``OLLAMA_NUM_PARALLEL``) and only prefills a new prompt from the end of the
+    longest prefix it shares with one of them. This mirrors that bookkeeping on the
+    rendered messages, and converts the shared characters to tokens using the
+    tokens-per-character ratio observed in the server's ``prompt_eval_count``.
+    """
+
+    slots: int = field(default_factory=lambda: int(os.getenv("OLLAMA_NUM_PARALLEL", "1") or 1))
+    requests: int = 0
+    reused_tokens: float = 0.0
+    recomputed_tokens: int = 0
+    prefill_seconds: float = 0.0
+    _sequences: Deque[str] = field(default_factory=deque, init=False, repr=False)
+    _tokens_per_char: float = field(default=0.25, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record(self, messages: List[Dict[str, str]], reply: str, final: Dict[str, Any]) -> None:
+        """Account for one finished request; ``final`` is the last response object."""
+        prompt = _render(messages)
+        with self._lock:
+            best, slot = 0, -1
+            for index, sequence in enumerate(self._sequences):
+                shared = len(os.path.commonprefix([sequence, prompt]))
+                if shared > best:
+                    best, slot = shared, index
+            if slot >= 0:
+                del self._sequences[slot]
+            elif len(self._sequences) >= max(1, self.slots):
+                self._sequences.popleft()
+            self._sequences.append(prompt + _render([{"role": "assistant", "content": reply}]))
+
+            evaluated = int(final.get("prompt_eval_count") or 0)
+            if evaluated and len(prompt) > best:
+                ratio = evaluated / (len(prompt) - best)
+                self._tokens_per_char += 0.2 * (ratio - self._tokens_per_char)
+            self.requests += 1
+            self.reused_tokens += best * self._tokens_per_char
+            self.recomputed_tokens += evaluated
+            self.prefill_seconds += (final.get("prompt_eval_duration") or 0) / 1e9
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.reused_tokens + self.recomputed_tokens
+            return {
+                "requests": self.requests,
+                "reused_tokens": int(self.reused_tokens),
+                "recomputed_tokens": self.recomputed_tokens,
+                "reuse_ratio": round(self.reused_tokens / total, 3) if total else 0.0,
+                "prefill_seconds": round(self.prefill_seconds, 3),
+            }
+
+
+@dataclass
+class OllamaClient:
+    """Ollama ``/api/chat`` client with the same contract as :class:`~aila.interfaces.llm.LLMClient`.
+
+    Prompts pass through the persona adapter hooks. ``keep_alive`` is sent with every
+    request so the model stays resident between conversations, and :meth:`warm_up`
+    loads it before the first user request. Conversation history is rendered exactly
+    as it was first sent so the server's prefix cache skips re-prefilling it;
+    :attr:`prefix_cache` reports how many prompt tokens that saved.
+    """
+
+    base_url: str = field(default_factory=lambda: os.getenv("OLLAMA_URL", "http://127.0.0.1:11434"))
+    model: str = field(default_factory=lambda: os.getenv("OLLAMA_MODEL", "llama3.1"))
+    temperature: float = field(default_factory=lambda: float(os.getenv("OLLAMA_TEMPERATURE", "0.7")))
+    num_ctx: Optional[int] = field(default_factory=lambda: int(os.getenv("OLLAMA_NUM_CTX", "0")) or None)
+    keep_alive: str = field(default_factory=lambda: os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+    timeout: float = field(default_factory=lambda: float(os.getenv("OLLAMA_TIMEOUT", "120")))
+    max_connections: int = field(default_factory=lambda: int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8")))
+    persona: Optional[str] = field(default_factory=lambda: os.getenv("OLLAMA_PERSONA") or None)
+    adapter_path: Optional[str] = field(default_factory=lambda: os.getenv("OLLAMA_ADAPTER"))
+    throttle: Throttle = field(default_factory=lambda: get_throttle("ollama"), repr=False)
+    scheduler: Optional[ModelResidencyScheduler] = field(default=None, repr=False)
+    prefix_cache: PrefixCache = field(default_factory=PrefixCache, repr=False)
+    _session: Any = field(default=None, init=False, repr=False)
+    _async_http: Any = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.base_url = self.base_url.rstrip("/")
+        if self.adapter_path is None:
+            # Unset: use the source checkout's hooks; deployments set OLLAMA_ADAPTER.
+            if _DEFAULT_ADAPTER.is_file():
+                self.adapter_path = str(_DEFAULT_ADAPTER)
+            else:
+                logger.warning("OLLAMA_ADAPTER is not set and %s does not exist; persona hooks are off", _DEFAULT_ADAPTER)
+        self.adapter = PromptAdapter.load(self.adapter_path)
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/api/chat"
+
+    def _http(self) -> Any:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _async_client(self) -> Any:
+        if self._async_http is None:
+            import httpx
+
+            self._async_http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._async_http
+
+    def _build_payload(
+        self, system_prompt: str, prompt: str, *, stream: bool = False, history: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        context = {"persona": self.persona} if self.persona else None
+        options: Dict[str, Any] = {"temperature": self.temperature}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        # Earlier user turns go through the adapter again so they match, byte for byte,
+        # what the KV cache already holds from the previous request.
+        history = [
+            {**message, "content": self.adapter.transform_prompt(message["content"], context)}
+            if message.get("role") == "user"
+            else message
+            for message in history or ()
+        ]
+        return {
+            "model": self.model,
+            "messages": _build_messages(system_prompt, self.adapter.transform_prompt(prompt, context), history),
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": options,
+        }
+
+    @contextmanager
+    def _residency(self) -> Iterator[None]:
+        """Hold the model resident for the duration of a request when a scheduler is attached."""
+        if self.scheduler is None:
+            yield
+            return
+        with self.scheduler.use(self.model):
+            yield
+
+    async def _aacquire(self) -> None:
+        if self.scheduler is not None:
+            await run_blocking(self.scheduler.acquire, self.model)
+
+    def _release(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.release(self.model)
+
+    def complete(self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        with self._residency():
+            return self.throttle.call(self._complete_once, self._build_payload(system_prompt, prompt, history=history))
+
+    def _complete_once(self, payload: Dict[str, Any]) -> str:
+        response = self._http().post(self.api_url, json=payload, timeout=self.timeout)
+        record_response(self.throttle.name, response)
+        if not response.ok:
+            raise _ollama_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        data = response.json()
+        # Recorded as the planner will replay it in the next turn's history.
+        reply = self.adapter.post_process(_parse_chat(data))
+        self.prefix_cache.record(payload["messages"], reply, data)
+        return reply
+
+    def stream(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> Iterator[str]:
+        """Yield content deltas from Ollama's NDJSON stream.
+
+        ``post_process`` works on whole replies, so streamed output only has its
+        leading whitespace trimmed.
+        """
+        with self._residency():
+            yield from self._stream(self._build_payload(system_prompt, prompt, stream=True, history=history))
+
+    def _stream(self, payload: Dict[str, Any]) -> Iterator[str]:
+        # The slot stays taken while the runner is generating, not just until the headers.
+        response, lease = self.throttle.call_held(self._open_stream, payload)
+        received = 0
+        try:
+            with response:
+                started = False
+                parts: List[str] = []
+                for line in response.iter_lines():
+                    received += len(line)
+                    if not line:
+                        continue
+                    data = _parse_stream_line(line)
+                    delta = _parse_chat(data)
+                    if not started:
+                        delta = delta.lstrip()
+                        started = bool(delta)
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                    if data.get("done"):
+                        self.prefix_cache.record(payload["messages"], "".join(parts), data)
+                        return
+        finally:
+            lease.release()
+            record_bytes(self.throttle.name, received=received)
+
+    def _open_stream(self, payload: Dict[str, Any]) -> Any:
+        response = self._http().post(self.api_url, json=payload, timeout=self.timeout, stream=True)
+        record_response(self.throttle.name, response, streamed=True)
+        if not response.ok:
+            with response:
+                raise _ollama_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        return response
+
+    async def acomplete(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        payload = self._build_payload(system_prompt, prompt, history=history)
+        await self._aacquire()
+        try:
+            return await self.throttle.acall(self._acomplete_once, payload)
+        finally:
+            self._release()
+
+    async def _acomplete_once(self, payload: Dict[str, Any]) -> str:
+        response = await self._async_client().post(self.api_url, json=payload)
+        record_response(self.throttle.name, response)
+        if response.is_error:
+            raise _ollama_error(response.status_code, response.text, response.headers.get("Retry-After"))
+        data = response.json()
+        # Recorded as the planner will replay it in the next turn's history.
+        reply = self.adapter.post_process(_parse_chat(data))
+        self.prefix_cache.record(payload["messages"], reply, data)
+        return reply
+
+    async def astream(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
+        """Async counterpart of :meth:`stream`."""
+        payload = self._build_payload(system_prompt, prompt, stream=True, history=history)
+        await self._aacquire()
+        try:
+            response, lease = await self.throttle.acall_held(self._aopen_stream, payload)
+        except BaseException:
+            self._release()
+            raise
+        received = 0
+        try:
+            started = False
+            parts: List[str] = []
+            async for line in response.aiter_lines():
+                received += len(line)
+                if not line:
+                    continue
+                data = _parse_stream_line(line)
+                delta = _parse_chat(data)
+                if not started:
+                    delta = delta.lstrip()
+                    started = bool(delta)
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                if data.get("done"):
+                    self.prefix_cache.record(payload["messages"], "".join(parts), data)
+                    return
+        finally:
+            lease.release()
+            record_bytes(self.throttle.name, received=received)
+            await response.aclose()
+            self._release()
+
+    async def _aopen_stream(self, payload: Dict[str, Any]) -> Any:
+        client = self._async_client()
+        response = await client.send(client.build_request("POST", self.api_url, json=payload), stream=True)
+        record_response(self.throttle.name, response, streamed=True)
+        if response.is_error:
+            body = (await response.aread()).decode("utf-8", "replace")
+            await response.aclose()
+            raise _ollama_error(response.status_code, body, response.headers.get("Retry-After"))
+        return response
+
+    def warm_up(self) -> bool:
+        """Load the model into memory ahead of the first request (an empty ``/api/generate``)."""
+        if self.scheduler is not None:
+            with self.scheduler.use(self.model):
+                return self.model in self.scheduler.stats()["resident"]
+        try:
+            response = self._http().post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=self.timeout,
+            )
+        except OSError as exc:
+            logger.warning("Ollama warm-up for %s failed: %s", self.model, exc)
+            return False
+        if not response.ok:
+            logger.warning("Ollama warm-up for %s failed: HTTP %s - %s", self.model, response.status_code, response.text)
+            return False
+        logger.info("Ollama model %s loaded (keep_alive=%s)", self.model, self.keep_alive)
+        return True
+
+    async def aclose(self) -> None:
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
@@ -0,0 +1,253 @@
+"""Decide which Ollama models stay loaded, within ``max_runners`` and a RAM budget."""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_GIB = 1024**3
+
+
+@dataclass
+class ResidencyEvent:
+    kind: str  # "load", "unload" or "load_failed"
+    model: str
+    seconds: float
+    reason: str
+    at: float = field(default_factory=time.time)
+
+
+@dataclass
+class ModelResidencyScheduler:
+    """Keep the most requested Ollama models resident and evict the least recently used.
+
+    Every request goes through :meth:`acquire`/:meth:`release` (or :meth:`use`). A
+    model that is not loaded is loaded explicitly; if that would exceed ``max_runners``
+    or ``ram_budget`` bytes, idle resident models are unloaded in LRU order first.
+    A background loop (:meth:`start`) re-syncs with ``/api/ps`` and preloads models
+    whose decayed request rate marks them hot, so they are warm again after Ollama
+    idles them out.
+    """
+
+    base_url: str = "http://127.0.0.1:11434"
+    max_runners: int = 2
+    ram_budget: int = 0  # bytes; 0 disables the RAM check
+    keep_alive: str = "30m"
+    half_life: float = 600.0
+    hot_score: float = 1.0
+    timeout: float = 300.0
+    model_sizes: Dict[str, int] = field(default_factory=dict)
+    on_event: Optional[Callable[[ResidencyEvent], None]] = None
+    events: Deque[ResidencyEvent] = field(default_factory=lambda: deque(maxlen=256), init=False)
+    _resident: "OrderedDict[str, float]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _in_flight: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _scores: Dict[str, tuple] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+    _session: Any = field(default=None, init=False, repr=False)
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    @classmethod
+    def from_yaml(cls, path: str | Path, base_url: str, **kwargs: Any) -> "ModelResidencyScheduler":
+        """Read ``server.max_runners``, ``server.ram_budget_gb`` and per-model ``ram_gb``."""
+        import yaml
+
+        data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+        server = data.get("server") or {}
+        sizes = {
+            str(model["name"]): int(float(model["ram_gb"]) * _GIB)
+            for model in data.get("models") or []
+            if model.get("ram_gb")
+        }
+        return cls(
+            base_url=base_url,
+            max_runners=int(server.get("max_runners", 2)),
+            ram_budget=int(float(server.get("ram_budget_gb", 0)) * _GIB),
+            model_sizes=sizes,
+            **kwargs,
+        )
+
+    def _http(self) -> Any:
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+        return self._session
+
+    def _score(self, model: str, now: float) -> float:
+        value, updated = self._scores.get(model, (0.0, now))
+        return value * math.exp(-(now - updated) * math.log(2) / self.half_life)
+
+    def _ram_used(self, exclude: str = "") -> int:
+        return sum(self.model_sizes.get(name, 0) for name in self._resident if name != exclude)
+
+    def _fits(self, model: str) -> bool:
+        others = [name for name in self._resident if name != model]
+        if len(others) + 1 > self.max_runners:
+            return False
+        return not self.ram_budget or self._ram_used(model) + self.model_sizes.get(model, 0) <= self.ram_budget
+
+    def acquire(self, model: str) -> None:
+        """Record a request for ``model`` and make sure it is loaded before returning."""
+        with self._lock:
+            now = time.monotonic()
+            self._scores[model] = (self._score(model, now) + 1.0, now)
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            if model in self._resident:
+                self._resident[model] = now
+                self._resident.move_to_end(model)
+                return
+            victims = self._plan_evictions(model)
+            # Reserve the slot now so concurrent requests for the same model skip
+            # straight to Ollama, which queues them behind this load.
+            self._resident[model] = now
+        for victim in victims:
+            self._unload(victim, reason=f"make room for {model}")
+        if not self._load(model, reason="request"):
+            with self._lock:
+                self._resident.pop(model, None)
+
+    def release(self, model: str) -> None:
+        with self._lock:
+            self._in_flight[model] = max(0, self._in_flight.get(model, 0) - 1)
+            self._lock.notify_all()
+
+    @contextmanager
+    def use(self, model: str) -> Iterator[None]:
+        self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def _plan_evictions(self, model: str) -> List[str]:
+        """Pick LRU victims (under the lock) until ``model`` fits; busy models are waited for."""
+        victims: List[str] = []
+        while not self._fits(model):
+            idle = [name for name in self._resident if name != model and not self._in_flight.get(name)]
+            if not idle:
+                if not [name for name in self._resident if name != model]:
+                    break  # larger than the whole budget on its own: load it anyway
+                self._lock.wait(timeout=1.0)
+                continue
+            victim = idle[0]  # OrderedDict keeps least recently used first
+            del self._resident[victim]
+            victims.append(victim)
+        return victims
+
+    def _post(self, model: str, keep_alive: Any) -> None:
+        response = self._http().post(
+            f"{self.base_url.rstrip('/')}/api/generate",
+            json={"model": model, "keep_alive": keep_alive},
+            timeout=self.timeout,
+        )
+        if not response.ok:
+            raise RuntimeError(f"HTTP {response.status_code} - {response.text}")
+
+    def _load(self, model: str, *, reason: str) -> bool:
+        started = time.perf_counter()
+        try:
+            self._post(model, self.keep_alive)
+        except (OSError, RuntimeError) as exc:
+            self._emit(ResidencyEvent("load_failed", model, time.perf_counter() - started, f"{reason}: {exc}"))
+            return False
+        self._emit(ResidencyEvent("load", model, time.perf_counter() - started, reason))
+        return True
+
+    def _unload(self, model: str, *, reason: str) -> None:
+        started = time.perf_counter()
+        try:
+            self._post(model, 0)
+        except (OSError, RuntimeError) as exc:
+            logger.warning("Unloading Ollama model %s failed: %s", model, exc)
+        self._emit(ResidencyEvent("unload", model, time.perf_counter() - started, reason))
+
+    def _emit(self, event: ResidencyEvent) -> None:
+        self.events.append(event)
+        logger.info("Ollama %s %s in %.2fs (%s)", event.kind, event.model, event.seconds, event.reason)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def sync(self) -> None:
+        """Refresh the resident set and model sizes from ``/api/ps``."""
+        try:
+            response = self._http().get(f"{self.base_url.rstrip('/')}/api/ps", timeout=10)
+            response.raise_for_status()
+            running = response.json().get("models") or []
+        except (OSError, ValueError) as exc:
+            logger.warning("Ollama /api/ps failed: %s", exc)
+            return
+        with self._lock:
+            loaded = set()
+            for entry in running:
+                name = str(entry.get("name") or entry.get("model") or "")
+                if not name:
+                    continue
+                name = name[:-7] if name.endswith(":latest") else name
+                loaded.add(name)
+                if entry.get("size"):
+                    self.model_sizes[name] = int(entry["size"])
+                self._resident.setdefault(name, time.monotonic())
+            for name in list(self._resident):
+                if name not in loaded and not self._in_flight.get(name):
+                    del self._resident[name]
+
+    def preload(self) -> None:
+        """Load hot models that fit without evicting anything."""
+        with self._lock:
+            now = time.monotonic()
+            hot = sorted(
+                (name for name in self._scores if self._score(name, now) >= self.hot_score),
+                key=lambda name: self._score(name, now),
+                reverse=True,
+            )
+            wanted = []
+            for name in hot:
+                if name not in self._resident and self._fits(name):
+                    self._resident[name] = now
+                    self._resident.move_to_end(name, last=False)  # preloaded, not yet used
+                    wanted.append(name)
+        for name in wanted:
+            if not self._load(name, reason="preload hot model"):
+                with self._lock:
+                    self._resident.pop(name, None)
+
+    def start(self, interval: float = 30.0) -> threading.Thread:
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                self.sync()
+                self.preload()
+
+        self.sync()
+        thread = threading.Thread(target=loop, name="aila-ollama-residency", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            counts: Dict[str, int] = {}
+            for event in self.events:
+                counts[event.kind] = counts.get(event.kind, 0) + 1
+            return {
+                "resident": list(self._resident),
+                "ram_used_gb": round(self._ram_used() / _GIB, 2),
+                "scores": {name: round(self._score(name, now), 3) for name in self._scores},
+                "events": counts,
+                "recent": [
+                    {"kind": e.kind, "model": e.model, "seconds": round(e.seconds, 3), "reason": e.reason}
+                    for e in list(self.events)[-10:]
+                ],
+            }
@@ -0,0 +1,431 @@
+"""Latency-aware routing with failover and hedged requests across interchangeable backends."""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Generic, Iterator, List, Optional, TypeVar
+
+from .asr import SpeechRecognitionClient
+from .offload import run_blocking
+
+
+logger = logging.getLogger(__name__)
+
+B = TypeVar("B")
+T = TypeVar("T")
+
+_EMPTY = object()  # first "item" of a stream that ended without yielding
+
+
+def _first_item(iterable: Any) -> tuple:
+    """Open a stream and wait for its first item; the unit a stream attempt is timed on."""
+    iterator = iter(iterable)
+    try:
+        return iterator, next(iterator)
+    except StopIteration:
+        return iterator, _EMPTY
+
+
+def _close_stream(future: "Future[tuple]") -> None:
+    """Close a losing stream attempt once its first item has arrived."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    iterator, _ = future.result()
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+async def _aclose(name: str, iterator: Any) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception as exc:
+        logger.warning("Closing the %s stream failed: %s", name, exc)
+
+
+@dataclass
+class BackendStats:
+    """EWMA latency and error rate plus a sliding window of latencies for percentiles."""
+
+    alpha: float = 0.2
+    window: int = 200
+    latency: float = 0.0
+    error_rate: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    hedge_wins: int = 0
+    last_attempt: float = 0.0
+    _samples: Deque[float] = field(default_factory=deque, init=False, repr=False)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.calls += 1
+        self.last_attempt = time.monotonic()
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if not ok:
+            self.errors += 1
+            return
+        self.latency = seconds if self.calls == 1 or not self.latency else self.latency + self.alpha * (seconds - self.latency)
+        self._samples.append(seconds)
+        while len(self._samples) > self.window:
+            self._samples.popleft()
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "latency": round(self.latency, 4),
+            "p95": round(self.percentile(0.95) or 0.0, 4),
+            "error_rate": round(self.error_rate, 4),
+            "calls": self.calls,
+            "errors": self.errors,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+@dataclass
+class LatencyRouter(Generic[B]):
+    """Send each call to the fastest healthy backend, failing over on errors.
+
+    Backends whose error EWMA exceeds ``max_error_rate`` are tried last, except that
+    one call is let through every ``probe_interval`` seconds so a recovered backend is
+    noticed. With ``hedge`` enabled, a second backend is started when the first has
+    not answered within its p95 latency (once ``min_samples`` latencies are known) and
+    the first successful answer wins. Synchronous hedged attempts run on the router's
+    own pool of ``hedge_workers`` threads, never on the shared blocking pool that
+    their callers may already occupy.
+    """
+
+    backends: Dict[str, B]
+    hedge: bool = False
+    max_error_rate: float = 0.5
+    probe_interval: float = 30.0
+    min_samples: int = 20
+    min_hedge_delay: float = 0.05
+    hedge_workers: int = field(default_factory=lambda: int(os.getenv("AILA_HEDGE_WORKERS", "16")))
+    stats: Dict[str, BackendStats] = field(default_factory=dict)
+    hedges: int = field(default=0, init=False)
+    _pool: Optional[ThreadPoolExecutor] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.backends:
+            raise ValueError("LatencyRouter needs at least one backend")
+        for name in self.backends:
+            self.stats.setdefault(name, BackendStats())
+
+    def ranked(self) -> List[str]:
+        """Backend names in the order they should be tried."""
+        now = time.monotonic()
+        with self._lock:
+            probes: List[str] = []
+            healthy: List[str] = []
+            degraded: List[str] = []
+            for name in self.backends:
+                stats = self.stats[name]
+                if stats.error_rate <= self.max_error_rate:
+                    healthy.append(name)
+                elif now - stats.last_attempt >= self.probe_interval:
+                    stats.last_attempt = now  # claim the probe so concurrent calls don't pile on
+                    probes.append(name)
+                else:
+                    degraded.append(name)
+            # Unmeasured backends sort first (latency 0.0) so each gets explored once, but
+            # any backend whose recent calls failed goes behind the ones that succeed.
+            failing = self.max_error_rate / 4
+            healthy.sort(key=lambda name: (self.stats[name].error_rate > failing, self.stats[name].latency))
+            degraded.sort(key=lambda name: self.stats[name].error_rate)
+            return probes + healthy + degraded
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = self.stats[name].percentile(0.95, self.min_samples)
+        return None if p95 is None else max(self.min_hedge_delay, p95)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="aila-hedge")
+            return self._pool
+
+    def _submit(self, name: str, op: Callable[[B], T]) -> "Future[T]":
+        # Copy the context so attempt spans stay inside the caller's trace.
+        return self._executor().submit(contextvars.copy_context().run, self._attempt, name, op)
+
+    def _record(self, name: str, started: float, ok: bool) -> None:
+        with self._lock:
+            self.stats[name].record(time.perf_counter() - started, ok)
+
+    def _won(self, name: str, primary: str) -> None:
+        if name != primary:
+            with self._lock:
+                self.stats[name].hedge_wins += 1
+
+    def _attempt(self, name: str, op: Callable[[B], T]) -> T:
+        started = time.perf_counter()
+        try:
+            result = op(self.backends[name])
+        except Exception as exc:
+            self._record(name, started, ok=False)
+            logger.warning("Backend %s failed: %s", name, exc)
+            raise
+        self._record(name, started, ok=True)
+        return result
+
+    async def _aattempt(self, name: str, op: Callable[[B], Awaitable[T]]) -> T:
+        started = time.perf_counter()
+        try:
+            result = await op(self.backends[name])
+        except Exception as exc:
+            self._record(name, started, ok=False)
+            logger.warning("Backend %s failed: %s", name, exc)
+            raise
+        self._record(name, started, ok=True)
+        return result
+
+    def call(self, op: Callable[[B], T]) -> T:
+        order = self.ranked()
+        if not self.hedge or len(order) == 1:
+            return self._failover(order, op)
+        return self._hedged(order, op)
+
+    def _failover(self, order: List[str], op: Callable[[B], T]) -> T:
+        last: Optional[Exception] = None
+        for name in order:
+            try:
+                return self._attempt(name, op)
+            except Exception as exc:
+                last = exc
+        assert last is not None
+        raise last
+
+    def _hedged(
+        self, order: List[str], op: Callable[[B], T], discard: Optional[Callable[["Future[T]"], None]] = None
+    ) -> T:
+        primary, rest = order[0], order[1:]
+        running: Dict["Future[T]", str] = {self._submit(primary, op): primary}
+        last: Optional[Exception] = None
+        try:
+            # Every pass leaves at least one attempt running, or there is nothing left to try.
+            while running:
+                delay = self.hedge_delay(primary) if rest else None
+                done, _ = wait(running, timeout=delay, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        last = exc
+                        continue
+                    self._won(name, primary)
+                    return result  # losers finish on the hedge pool and still update their stats
+                if rest and (not done or not running):
+                    name = rest.pop(0)
+                    if not done:
+                        self.hedges += 1
+                        logger.info("Hedging %s with %s after %.3fs", primary, name, delay)
+                    running[self._submit(name, op)] = name
+        finally:
+            if discard is not None:
+                for future in running:
+                    future.add_done_callback(discard)
+        assert last is not None
+        raise last
+
+    async def acall(self, op: Callable[[B], Awaitable[T]]) -> T:
+        import asyncio
+
+        order = self.ranked()
+        primary, rest = order[0], order[1:]
+        running: Dict["asyncio.Task[T]", str] = {asyncio.ensure_future(self._aattempt(primary, op)): primary}
+        last: Optional[Exception] = None
+        try:
+            while running:
+                delay = self.hedge_delay(primary) if rest else None
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as exc:
+                        last = exc
+                        continue
+                    self._won(name, primary)
+                    return result
+                if rest and (not done or not running):
+                    name = rest.pop(0)
+                    if not done:
+                        self.hedges += 1
+                        logger.info("Hedging %s with %s after %.3fs", primary, name, delay)
+                    running[asyncio.ensure_future(self._aattempt(name, op))] = name
+        finally:
+            for task in running:
+                task.cancel()
+        assert last is not None
+        raise last
+
+    def stream(self, op: Callable[[B], Iterator[T]]) -> Iterator[T]:
+        """Stream from the best backend, failing over only until the first item arrives.
+
+        With ``hedge`` on, the time to first item is hedged like :meth:`call`: each attempt
+        opens its stream on the hedge pool, and a losing stream is closed as soon as its
+        first item arrives.
+        """
+        order = self.ranked()
+        def start(backend: B) -> tuple:
+            return _first_item(op(backend))
+
+        if self.hedge and len(order) > 1:
+            iterator, first = self._hedged(order, start, discard=_close_stream)
+        else:
+            iterator, first = self._failover(order, start)
+        if first is _EMPTY:
+            return
+        yield first
+        yield from iterator
+
+    async def astream(self, op: Callable[[B], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Async stream whose time to first item is hedged like :meth:`acall`."""
+        import asyncio
+
+        order = self.ranked()
+        primary, rest = order[0], order[1:]
+        racers: Dict["asyncio.Future[T]", tuple] = {}
+
+        def launch(name: str) -> None:
+            iterator = op(self.backends[name]).__aiter__()
+            racers[asyncio.ensure_future(iterator.__anext__())] = (name, iterator, time.perf_counter())
+
+        launch(primary)
+        winner: Optional[tuple] = None
+        last: Optional[Exception] = None
+        try:
+            while winner is None and racers:
+                delay = self.hedge_delay(primary) if rest else None
+                done, _ = await asyncio.wait(racers, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, iterator, started = racers.pop(task)
+                    try:
+                        first: Any = task.result()
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as exc:
+                        self._record(name, started, ok=False)
+                        logger.warning("Backend %s failed before streaming: %s", name, exc)
+                        last = exc
+                        continue
+                    self._record(name, started, ok=True)
+                    self._won(name, primary)
+                    winner = (name, iterator, first)
+                    break
+                if winner is None and rest and (not done or not racers):
+                    if not done:
+                        self.hedges += 1
+                    launch(rest.pop(0))
+        finally:
+            for task in racers:
+                task.cancel()
+            # A generator cannot be closed while its __anext__ is still running.
+            await asyncio.gather(*racers, return_exceptions=True)
+            for name, iterator, _ in racers.values():
+                await _aclose(name, iterator)
+        if winner is None:
+            assert last is not None
+            raise last
+        name, iterator, first = winner
+        try:
+            if first is None:
+                return
+            yield first
+            async for item in iterator:
+                yield item
+        finally:
+            await _aclose(name, iterator)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hedges": self.hedges,
+                "backends": {name: stats.snapshot() for name, stats in self.stats.items()},
+            }
+
+
+class RoutedLLMClient:
+    """LLM client fanning out to several backends through :class:`LatencyRouter`.
+
+    Completions are ranked by total latency and streams by time to first delta, each
+    with its own statistics.
+    """
+
+    def __init__(self, backends: Dict[str, Any], *, hedge: bool = False) -> None:
+        self.backends = backends
+        self.router: LatencyRouter[Any] = LatencyRouter(backends, hedge=hedge)
+        self.stream_router: LatencyRouter[Any] = LatencyRouter(backends, hedge=hedge)
+
+    def complete(self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        return self.router.call(lambda llm: llm.complete(system_prompt, prompt, history=history))
+
+    def stream(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> Iterator[str]:
+        return self.stream_router.stream(lambda llm: llm.stream(system_prompt, prompt, history=history))
+
+    async def acomplete(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        return await self.router.acall(lambda llm: llm.acomplete(system_prompt, prompt, history=history))
+
+    def astream(
+        self, system_prompt: str, prompt: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
+        return self.stream_router.astream(lambda llm: llm.astream(system_prompt, prompt, history=history))
+
+    async def aclose(self) -> None:
+        for backend in self.backends.values():
+            aclose = getattr(backend, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"complete": self.router.snapshot(), "stream": self.stream_router.snapshot()}
+
+
+class RoutedASRClient(SpeechRecognitionClient):
+    """Speech recognizer routing each utterance to the fastest healthy backend."""
+
+    def __init__(self, backends: Dict[str, SpeechRecognitionClient], *, hedge: bool = False) -> None:
+        self.backends = backends
+        self.router: LatencyRouter[SpeechRecognitionClient] = LatencyRouter(backends, hedge=hedge)
+
+    def transcribe(self, audio_path: str) -> str:
+        return self.router.call(lambda asr: asr.transcribe(audio_path))
+
+    async def atranscribe(self, audio_path: str) -> str:
+        return await self.router.acall(lambda asr: asr.atranscribe(audio_path))
+
+    async def atranscribe_bytes(self, data: bytes, suffix: str = ".wav") -> str:
+        return await self.router.acall(lambda asr: _atranscribe_bytes(asr, data, suffix))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.router.snapshot()
+
+
+async def _atranscribe_bytes(asr: SpeechRecognitionClient, data: bytes, suffix: str) -> str:
+    atranscribe_bytes = getattr(asr, "atranscribe_bytes", None)
+    if atranscribe_bytes is not None:
+        return await atranscribe_bytes(data, suffix)
+    return await run_blocking(asr.transcribe_bytes, data, suffix)
@@ -4,24 +4,106 @@ from __future__ import annotations
 
 import base64
 import logging
+import os
 import tempfile
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, BinaryIO, Deque, Optional, Tuple, Union
 
-from tencentcloud.common import credential
-from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
-from tencentcloud.tts.v20190823 import models, tts_client
+from .offload import run_blocking
+from .throttle import Throttle, ThrottledError, call_tencent, get_throttle, tencent_client_profile
+from ..telemetry import record_bytes, span, stage
 
 
 logger = logging.getLogger(__name__)
 
 
+AudioSink = Union[BinaryIO, bytearray]
+
+
 class TextToSpeechClient:
-    """Abstract TTS client."""
+    """Abstract TTS client.
+
+    ``synthesize`` returns the audio in memory; ``speak`` is the file-path adapter kept
+    for callers that hand a path to a player.
+    """
+
+    def synthesize(self, text: str) -> bytes:
+        raise NotImplementedError
+
+    def synthesize_into(self, text: str, sink: AudioSink) -> int:
+        """Write the synthesized audio into a caller-provided buffer or binary stream."""
+        data = self.synthesize(text)
+        if isinstance(sink, bytearray):
+            sink.extend(data)
+        else:
+            sink.write(data)
+        return len(data)
 
     def speak(self, text: str) -> str:
         raise NotImplementedError
 
+    async def asynthesize(self, text: str) -> bytes:
+        """Async synthesis; defaults to running :meth:`synthesize` on the shared pool."""
+        return await run_blocking(self.synthesize, text)
+
+    async def aspeak(self, text: str) -> str:
+        return await run_blocking(self.speak, text)
+
+
+@dataclass
+class AudioFileSpool:
+    """Directory of synthesized audio files with a bounded lifetime.
+
+    Files are pruned once more than ``max_files`` exist or they are older than
+    ``max_age`` seconds, so long-running hosts do not accumulate utterances forever.
+    Leftovers from previous runs are adopted and pruned on startup.
+    """
+
+    directory: Optional[Path] = None
+    max_files: int = 64
+    max_age: float = 3600.0
+    prefix: str = "aila-tts-"
+    _files: Deque[Tuple[float, Path]] = field(default_factory=deque, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.directory is None:
+            self.directory = Path(tempfile.gettempdir()) / "aila-tts"
+        self.directory = Path(self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = []
+        for path in self.directory.glob(f"{self.prefix}*"):
+            try:
+                existing.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        self._files.extend(sorted(existing))
+        self.prune()
+
+    def write(self, data: bytes, suffix: str = ".wav") -> Path:
+        fd, name = tempfile.mkstemp(dir=self.directory, prefix=self.prefix, suffix=suffix)
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        path = Path(name)
+        with self._lock:
+            self._files.append((time.time(), path))
+        self.prune()
+        return path
+
+    def prune(self) -> int:
+        cutoff = time.time() - self.max_age
+        expired = []
+        with self._lock:
+            while self._files and (len(self._files) > self.max_files or self._files[0][0] < cutoff):
+                expired.append(self._files.popleft()[1])
+        for path in expired:
+            path.unlink(missing_ok=True)
+        return len(expired)
+
 
 @dataclass
 class SpeechInterface:
@@ -30,7 +112,20 @@ class SpeechInterface:
     tts: TextToSpeechClient
 
     def speak(self, text: str) -> str:
-        return self.tts.speak(text)
+        with stage("tts"):
+            return self.tts.speak(text)
+
+    def synthesize(self, text: str) -> bytes:
+        with stage("tts"):
+            return self.tts.synthesize(text)
+
+    async def aspeak(self, text: str) -> str:
+        with stage("tts"):
+            return await self.tts.aspeak(text)
+
+    async def asynthesize(self, text: str) -> bytes:
+        with stage("tts"):
+            return await self.tts.asynthesize(text)
 
 
 @dataclass
@@ -45,22 +140,44 @@ class TencentTTSClient(TextToSpeechClient):
     volume: int = 0
     audio_format: str = "wav"
     sample_rate: int = 16000
-    _client: tts_client.TtsClient = field(init=False, repr=False)
-
-    def __post_init__(self) -> None:
-        cred = credential.Credential(self.secret_id, self.secret_key)
-        self._client = tts_client.TtsClient(cred, self.region)
-        logger.info(
-            "Initialized Tencent TTS client (region=%s, voice_type=%s, format=%s)",
-            self.region,
-            self.voice_type,
-            self.audio_format,
-        )
-
-    def speak(self, text: str) -> str:
+    endpoint: Optional[str] = field(default_factory=lambda: os.getenv("TENCENT_TTS_ENDPOINT") or None)
+    spool: AudioFileSpool = field(default_factory=AudioFileSpool, repr=False)
+    throttle: Throttle = field(default_factory=lambda: get_throttle("tencent_tts"), repr=False)
+    _client: Any = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _sdk_client(self) -> Any:
+        """Build the SDK client on first use; importing tencentcloud dominates startup."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.secret_id or not self.secret_key:
+                        raise RuntimeError(
+                            "TENCENT_SECRET_ID and TENCENT_SECRET_KEY must be set "
+                            "(see system/etc/aila/env.d/tencent.conf)."
+                        )
+                    from tencentcloud.common import credential
+                    from tencentcloud.tts.v20190823 import tts_client
+
+                    cred = credential.Credential(self.secret_id, self.secret_key)
+                    self._client = tts_client.TtsClient(cred, self.region, tencent_client_profile(self.endpoint))
+                    logger.info(
+                        "Initialized Tencent TTS client (region=%s, voice_type=%s, format=%s)",
+                        self.region,
+                        self.voice_type,
+                        self.audio_format,
+                    )
+        return self._client
+
+    def synthesize(self, text: str) -> bytes:
         if not text.strip():
             raise ValueError("text must not be empty for TTS synthesis")
 
+        from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+        from tencentcloud.tts.v20190823 import models
+
+        client = self._sdk_client()
+
         request = models.TextToVoiceRequest()
         request.Text = text
         request.VoiceType = self.voice_type
@@ -70,20 +187,23 @@ class TencentTTSClient(TextToSpeechClient):
         request.SampleRate = self.sample_rate
 
         try:
-            response = self._client.TextToVoice(request)
+            response = self.throttle.call(call_tencent, client.TextToVoice, request)
+        except ThrottledError as exc:
+            raise ThrottledError(f"Tencent TTS synthesis throttled: {exc}") from exc
         except TencentCloudSDKException as exc:  # pragma: no cover - network failure
             logger.error("Tencent TTS synthesis failed: %s", exc)
             raise RuntimeError(f"Tencent TTS synthesis failed: {exc}") from exc
 
         audio_b64 = getattr(response, "Audio", None)
+        record_bytes(self.throttle.name, sent=len(text.encode("utf-8")), received=len(audio_b64 or ""))
         if not audio_b64:
             raise RuntimeError("Tencent TTS response missing audio payload")
 
-        audio_bytes = base64.b64decode(audio_b64)
-        suffix = f".{self.audio_format.lower()}" if self.audio_format else ".wav"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as wav_file:
-            wav_file.write(audio_bytes)
-            output_path = Path(wav_file.name)
+        with span("base64_decode", chars=len(audio_b64)):
+            return base64.b64decode(audio_b64)
 
+    def speak(self, text: str) -> str:
+        suffix = f".{self.audio_format.lower()}" if self.audio_format else ".wav"
+        output_path = self.spool.write(self.synthesize(text), suffix=suffix)
         logger.debug("Tencent TTS synthesis wrote %s", output_path)
         return str(output_path)
@@ -0,0 +1,371 @@
+"""Shared rate limiting, adaptive concurrency and retries for cloud backends."""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from ..telemetry import BACKEND_IN_FLIGHT, BACKEND_REQUESTS, BACKEND_SECONDS, span
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Tencent Cloud error codes signalling that the account or IP exceeded its QPS quota.
+_TENCENT_THROTTLE_PREFIXES = ("RequestLimitExceeded", "LimitExceeded")
+
+
+class ThrottledError(RuntimeError):
+    """Raised when a backend rejects a request because a rate or concurrency quota was hit."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_tencent_throttle(exc: BaseException) -> bool:
+    code = getattr(exc, "code", None) or ""
+    return any(code.startswith(prefix) for prefix in _TENCENT_THROTTLE_PREFIXES)
+
+
+def call_tencent(method: Callable[[Any], T], request: Any) -> T:
+    """Invoke a Tencent SDK action, mapping quota errors to :class:`ThrottledError`."""
+    try:
+        return method(request)
+    except Exception as exc:
+        if is_tencent_throttle(exc):
+            raise ThrottledError(str(exc)) from exc
+        raise
+
+
+def tencent_client_profile(endpoint: Optional[str]) -> Any:
+    """SDK profile sending requests to ``endpoint`` instead of the public API host.
+
+    ``endpoint`` is ``host[:port]`` or a URL such as ``http://127.0.0.1:8081`` for a
+    local stand-in; ``None`` keeps the SDK default.
+    """
+    if not endpoint:
+        return None
+    from tencentcloud.common.profile.client_profile import ClientProfile
+    from tencentcloud.common.profile.http_profile import HttpProfile
+
+    scheme, _, host = endpoint.rpartition("://")
+    return ClientProfile(httpProfile=HttpProfile(protocol=scheme or "https", endpoint=host.rstrip("/")))
+
+
+@dataclass
+class TokenBucket:
+    """Token bucket admitting ``rate`` calls per second with bursts up to ``burst``.
+
+    A non-positive ``rate`` disables the limit.
+    """
+
+    rate: float
+    burst: float = 1.0
+    _tokens: float = field(init=False, repr=False)
+    _updated: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.burst = max(1.0, self.burst)
+        self._tokens = self.burst
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            import asyncio
+
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: grow additively on success, shrink multiplicatively on throttling."""
+
+    initial: float = 8.0
+    minimum: float = 1.0
+    maximum: float = 64.0
+    backoff: float = 0.5
+    limit: float = field(init=False)
+    in_flight: int = field(default=0, init=False)
+    _cond: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+    # Futures of coroutines waiting in aacquire, each with the loop that owns it.
+    _async_waiters: Deque[Tuple[Any, Any]] = field(default_factory=deque, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.limit = min(self.maximum, max(self.minimum, self.initial))
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        """Wait for a slot without blocking the event loop; woken by :meth:`release`."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._cond:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:  # woken just before the cancellation: pass the wake-up on
+                        self._wake_async()
+                raise
+
+    def release(self, *, throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            else:
+                # Roughly +1 per "window" of limit successful calls.
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+            self._wake_async()
+
+    def _wake_async(self) -> None:
+        """Wake one async waiter per free slot; the caller holds ``_cond``."""
+        for _ in range(max(0, int(self.limit) - self.in_flight)):
+            if not self._async_waiters:
+                return
+            loop, future = self._async_waiters.popleft()
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: Any) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+@dataclass
+class Lease:
+    """Concurrency slot held past the call that took it, e.g. for an open response stream.
+
+    Release it exactly once when the stream closes, with ``throttled`` set when the
+    backend reported a quota error mid-stream; later calls are no-ops.
+    """
+
+    throttle: "Throttle"
+    released: bool = False
+
+    def release(self, *, throttled: bool = False) -> None:
+        if self.released:
+            return
+        self.released = True
+        if throttled:
+            self.throttle._count("throttled")
+        self.throttle._release(throttled=throttled)
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter for throttled calls."""
+
+    max_attempts: int = 4
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+
+
+@dataclass
+class Throttle:
+    """Per-backend admission control combining a token bucket, AIMD concurrency and retries.
+
+    The wrapped callable signals quota rejections by raising :class:`ThrottledError`;
+    those are retried with jittered backoff while the concurrency limit shrinks.
+    """
+
+    name: str
+    bucket: TokenBucket
+    concurrency: AdaptiveConcurrency
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    calls: int = field(default=0, init=False)
+    throttled: int = field(default=0, init=False)
+    retries: int = field(default=0, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        result, lease = self.call_held(func, *args, **kwargs)
+        lease.release()
+        return result
+
+    def call_held(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> Tuple[T, Lease]:
+        """Like :meth:`call`, but the concurrency slot stays taken until the returned lease is released.
+
+        For streaming responses, which occupy a backend quota slot until they close.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.concurrency.acquire()
+            started = self._begin()
+            try:
+                with span(self.name, attempt=attempt):
+                    result = func(*args, **kwargs)
+            except ThrottledError as exc:
+                self._end(started, "throttled")
+                self._release(throttled=True)
+                delay = self._on_throttled(exc, attempt)
+            except BaseException:
+                self._end(started, "error")
+                self._release()
+                raise
+            else:
+                self._end(started, "ok")
+                self._count("calls")
+                return result, Lease(self)
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        result, lease = await self.acall_held(func, *args, **kwargs)
+        lease.release()
+        return result
+
+    async def acall_held(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> Tuple[T, Lease]:
+        """Async counterpart of :meth:`call_held`."""
+        import asyncio
+
+        attempt = 0
+        while True:
+            await self.bucket.aacquire()
+            await self.concurrency.aacquire()
+            started = self._begin()
+            try:
+                with span(self.name, attempt=attempt):
+                    result = await func(*args, **kwargs)
+            except ThrottledError as exc:
+                self._end(started, "throttled")
+                self._release(throttled=True)
+                delay = self._on_throttled(exc, attempt)
+            except BaseException:
+                self._end(started, "error")
+                self._release()
+                raise
+            else:
+                self._end(started, "ok")
+                self._count("calls")
+                return result, Lease(self)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _begin(self) -> float:
+        BACKEND_IN_FLIGHT.labels(self.name).inc()
+        return time.perf_counter()
+
+    def _end(self, started: float, outcome: str) -> None:
+        BACKEND_SECONDS.labels(self.name).observe(time.perf_counter() - started)
+        BACKEND_REQUESTS.labels(self.name, outcome).inc()
+
+    def _release(self, *, throttled: bool = False) -> None:
+        BACKEND_IN_FLIGHT.labels(self.name).dec()
+        self.concurrency.release(throttled=throttled)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _on_throttled(self, exc: ThrottledError, attempt: int) -> float:
+        """Count a throttled attempt; re-raise once retries are exhausted, else return the delay."""
+        self._count("throttled")
+        if attempt + 1 >= self.retry.max_attempts:
+            logger.error("%s throttled, giving up after %d attempts: %s", self.name, attempt + 1, exc)
+            raise exc
+        self._count("retries")
+        delay = self.retry.delay(attempt, exc.retry_after)
+        logger.warning(
+            "%s throttled (attempt %d, limit now %.1f), retrying in %.2fs: %s",
+            self.name,
+            attempt + 1,
+            self.concurrency.limit,
+            delay,
+            exc,
+        )
+        return delay
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "concurrency_limit": self.concurrency.limit,
+            "in_flight": self.concurrency.in_flight,
+        }
+
+
+_throttles: Dict[str, Throttle] = {}
+_registry_lock = threading.Lock()
+
+
+def _env(backend: str, key: str, default: str) -> str:
+    return os.getenv(f"AILA_{backend.upper()}_{key}", default)
+
+
+def get_throttle(backend: str) -> Throttle:
+    """Return the process-wide throttle for ``backend`` (e.g. ``"spark"``, ``"tencent_asr"``).
+
+    Limits come from ``AILA_<BACKEND>_QPS`` (0 = unlimited), ``_BURST``,
+    ``_CONCURRENCY``, ``_MAX_CONCURRENCY`` and ``_RETRIES``.
+    """
+    with _registry_lock:
+        throttle = _throttles.get(backend)
+        if throttle is None:
+            qps = float(_env(backend, "QPS", "0"))
+            throttle = Throttle(
+                name=backend,
+                bucket=TokenBucket(rate=qps, burst=float(_env(backend, "BURST", str(max(1.0, qps))))),
+                concurrency=AdaptiveConcurrency(
+                    initial=float(_env(backend, "CONCURRENCY", "8")),
+                    maximum=float(_env(backend, "MAX_CONCURRENCY", "64")),
+                ),
+                retry=RetryPolicy(max_attempts=int(_env(backend, "RETRIES", "4"))),
+            )
+            _throttles[backend] = throttle
+        return throttle
@@ -0,0 +1,286 @@
+"""Content-addressed cache for synthesized speech."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from .speech import TextToSpeechClient
+
+
+logger = logging.getLogger(__name__)
+
+# Synthesis parameters that change the produced audio and therefore the cache key.
+_KEY_FIELDS = ("voice_type", "speed", "volume", "audio_format", "sample_rate")
+
+
+@dataclass
+class TTSAudioCache:
+    """On-disk audio store with LRU eviction by total bytes and an in-memory hot tier.
+
+    Entries are files named after the SHA-256 of the synthesis parameters, so the cache
+    survives restarts; file mtimes carry the LRU order across runs.
+    """
+
+    directory: Path
+    max_bytes: int = 256 * 1024 * 1024
+    hot_max_bytes: int = 16 * 1024 * 1024
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    _index: "OrderedDict[str, Path]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _sizes: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _hot: "OrderedDict[str, bytes]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _total_bytes: int = field(default=0, init=False, repr=False)
+    _hot_bytes: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.directory = Path(self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.directory.iterdir():
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._index[path.stem] = path
+            self._sizes[path.stem] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict_locked()
+        logger.info(
+            "TTS cache at %s holds %d entries (%d bytes, limit %d)",
+            self.directory,
+            len(self._index),
+            self._total_bytes,
+            self.max_bytes,
+        )
+
+    @staticmethod
+    def key(text: str, **params: Any) -> str:
+        material = json.dumps({"text": text, **params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def __contains__(self, digest: object) -> bool:
+        with self._lock:
+            return digest in self._index
+
+    def lookup(self, digest: str) -> Optional[Path]:
+        """Return the cached file for ``digest`` and mark it recently used."""
+        path = self._locate(digest)
+        self._count(path is not None)
+        return path
+
+    def get_bytes(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._hot.get(digest)
+            if data is not None:
+                self._hot.move_to_end(digest)
+                self._index.move_to_end(digest)
+                self.hits += 1
+                return data
+        path = self._locate(digest)
+        if path is not None:
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                pass  # evicted by another worker between the lookup and the read
+        self._count(data is not None)
+        if data is None:
+            return None
+        self._remember(digest, data)
+        return data
+
+    def _locate(self, digest: str) -> Optional[Path]:
+        with self._lock:
+            path = self._index.get(digest)
+            if path is None:
+                return None
+            self._index.move_to_end(digest)
+            hot = self._hot.get(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            if hot is None:
+                self._forget(digest)
+                return None
+            # Removed behind our back (e.g. tmp cleaner); restore from the hot tier.
+            self._write(path, hot)
+        return path
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def store(self, digest: str, data: bytes, suffix: str) -> Path:
+        path = self.directory / f"{digest}{suffix}"
+        self._write(path, data)
+        self._admit(digest, path, len(data))
+        self._remember(digest, data)
+        return path
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "hot_entries": len(self._hot),
+                "hot_bytes": self._hot_bytes,
+            }
+
+    def _write(self, path: Path, data: bytes) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _admit(self, digest: str, path: Path, size: int) -> None:
+        with self._lock:
+            previous = self._index.get(digest)
+            if previous is not None:
+                self._total_bytes -= self._sizes.get(digest, 0)
+                if previous != path:
+                    previous.unlink(missing_ok=True)
+            self._index[digest] = path
+            self._index.move_to_end(digest)
+            self._sizes[digest] = size
+            self._total_bytes += size
+            self._evict_locked()
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        if len(data) > self.hot_max_bytes:
+            return
+        with self._lock:
+            if digest not in self._index:
+                return
+            previous = self._hot.pop(digest, None)
+            if previous is not None:
+                self._hot_bytes -= len(previous)
+            self._hot[digest] = data
+            self._hot_bytes += len(data)
+            while self._hot_bytes > self.hot_max_bytes:
+                _, dropped = self._hot.popitem(last=False)
+                self._hot_bytes -= len(dropped)
+
+    def _forget(self, digest: str) -> None:
+        with self._lock:
+            self._drop_locked(digest)
+
+    def _drop_locked(self, digest: str) -> Optional[Path]:
+        path = self._index.pop(digest, None)
+        self._total_bytes -= self._sizes.pop(digest, 0)
+        hot = self._hot.pop(digest, None)
+        if hot is not None:
+            self._hot_bytes -= len(hot)
+        return path
+
+    def _evict_locked(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            digest = next(iter(self._index))
+            path = self._drop_locked(digest)
+            if path is not None:
+                path.unlink(missing_ok=True)
+            self.evictions += 1
+
+
+@dataclass
+class CachedTTSClient(TextToSpeechClient):
+    """Serve repeated phrases from :class:`TTSAudioCache` before calling the wrapped client.
+
+    The returned paths live inside the cache directory and are shared between callers;
+    treat them as read-only.
+    """
+
+    tts: TextToSpeechClient
+    cache: TTSAudioCache
+
+    def _digest(self, text: str) -> str:
+        params = {name: getattr(self.tts, name, None) for name in _KEY_FIELDS}
+        return TTSAudioCache.key(text, **params)
+
+    def _suffix(self) -> str:
+        audio_format = getattr(self.tts, "audio_format", None) or "wav"
+        return f".{audio_format.lower()}"
+
+    def synthesize(self, text: str) -> bytes:
+        digest = self._digest(text)
+        cached = self.cache.get_bytes(digest)
+        if cached is not None:
+            return cached
+
+        data = self.tts.synthesize(text)
+        self.cache.store(digest, data, self._suffix())
+        return data
+
+    def speak(self, text: str) -> str:
+        digest = self._digest(text)
+        cached = self.cache.lookup(digest)
+        if cached is not None:
+            return str(cached)
+
+        data = self.tts.synthesize(text)
+        return str(self.cache.store(digest, data, self._suffix()))
+
+    async def asynthesize(self, text: str) -> bytes:
+        digest = self._digest(text)
+        cached = self.cache.get_bytes(digest)
+        if cached is not None:
+            return cached
+
+        data = await self.tts.asynthesize(text)
+        self.cache.store(digest, data, self._suffix())
+        return data
+
+    async def aspeak(self, text: str) -> str:
+        digest = self._digest(text)
+        cached = self.cache.lookup(digest)
+        if cached is not None:
+            return str(cached)
+
+        data = await self.tts.asynthesize(text)
+        return str(self.cache.store(digest, data, self._suffix()))
+
+    def warm_up(self, phrases: Iterable[str]) -> int:
+        """Pre-synthesize ``phrases`` that are not cached yet; returns how many were added."""
+        added = 0
+        for phrase in phrases:
+            phrase = phrase.strip()
+            if not phrase:
+                continue
+            digest = self._digest(phrase)
+            if digest in self.cache:
+                continue
+            try:
+                data = self.tts.synthesize(phrase)
+            except Exception as exc:  # pragma: no cover - network failure
+                logger.warning("TTS cache warm-up failed for %r: %s", phrase, exc)
+                continue
+            self.cache.store(digest, data, self._suffix())
+            added += 1
+        logger.info("TTS cache warm-up added %d phrases", added)
+        return added
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
@@ -0,0 +1,200 @@
+"""Batch evaluation runs over audio directories and prompt JSONL files."""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO
+
+from .orchestrator import Orchestrator, _request
+
+
+logger = logging.getLogger("aila.batch")
+
+AUDIO_SUFFIXES = {".wav", ".pcm", ".mp3", ".silk", ".m4a", ".ogg", ".speex"}
+
+
+@dataclass
+class BatchItem:
+    id: str
+    text: Optional[str] = None
+    audio: Optional[str] = None
+    context: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class BatchSummary:
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def load_items(source: Path) -> Iterator[BatchItem]:
+    """Yield work items from a directory of audio files or a JSONL file of prompts.
+
+    JSONL lines look like ``{"id": "q1", "text": "..."}`` or ``{"id": "a1", "audio":
+    "clips/a1.wav"}``; relative audio paths are resolved against the JSONL location and
+    missing ids default to the line number.
+    """
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower() in AUDIO_SUFFIXES:
+                yield BatchItem(id=str(path.relative_to(source)), audio=str(path))
+        return
+
+    with source.open(encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"{source}:{line_no}: invalid JSON: {exc}") from exc
+            audio = record.get("audio")
+            if audio and not Path(audio).is_absolute():
+                audio = str(source.parent / audio)
+            if not audio and not record.get("text"):
+                raise ValueError(f"{source}:{line_no}: expected a 'text' or 'audio' field")
+            yield BatchItem(
+                id=str(record.get("id", f"line-{line_no}")),
+                text=record.get("text"),
+                audio=audio,
+                context=record.get("context"),
+            )
+
+
+def completed_ids(output: Path) -> Set[str]:
+    """Ids already answered successfully in ``output``; failures are retried on resume."""
+    done: Set[str] = set()
+    if not output.exists():
+        return done
+    with output.open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn final line from an interrupted run
+            if record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+
+def _drop_torn_tail(output: Path) -> None:
+    """Cut a partial last line left by a killed run, so appended results start on a fresh line."""
+    if not output.exists():
+        return
+    with output.open("rb+") as handle:
+        data = handle.read()
+        if data and not data.endswith(b"\n"):
+            handle.truncate(data.rfind(b"\n") + 1)
+
+
+def audio_dir(output: Path) -> Path:
+    """Directory receiving ``--batch-speak`` audio, next to the results file."""
+    return output.with_name(f"{output.name}.audio")
+
+
+@dataclass
+class BatchRunner:
+    """Run batch items through the pipeline on a worker pool with bounded in-flight work.
+
+    Results are appended to a JSONL file as they complete, so an interrupted run can be
+    resumed by pointing it at the same output file. With ``speak`` each reply's audio is
+    written to ``<output>.audio/<id>.<format>`` and that path is recorded.
+    """
+
+    orchestrator: Orchestrator
+    workers: int = 4
+    max_in_flight: int = 16
+    speak: bool = False
+    _summary: BatchSummary = field(default_factory=BatchSummary, init=False, repr=False)
+    _audio_dir: Optional[Path] = field(default=None, init=False, repr=False)
+
+    def run(self, items: Iterable[BatchItem], output: Path, *, resume: bool = True) -> BatchSummary:
+        self._summary = BatchSummary()
+        done = completed_ids(output) if resume else set()
+        if done:
+            logger.info("Resuming batch: %d items already completed in %s", len(done), output)
+        if resume:
+            _drop_torn_tail(output)
+        if self.speak:
+            self._audio_dir = audio_dir(output)
+            self._audio_dir.mkdir(parents=True, exist_ok=True)
+
+        started = time.perf_counter()
+        limit = max(self.max_in_flight, self.workers)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aila-batch") as pool, output.open(
+            "a" if resume else "w", encoding="utf-8"
+        ) as sink:
+            in_flight: Set["Future[Dict[str, Any]]"] = set()
+            for item in items:
+                if item.id in done:
+                    self._summary.skipped += 1
+                    continue
+                if len(in_flight) >= limit:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._write(sink, finished)
+                in_flight.add(pool.submit(self._process, item))
+            self._write(sink, wait(in_flight).done)
+
+        self._summary.elapsed = time.perf_counter() - started
+        logger.info(
+            "Batch finished: %d processed (%d failed), %d skipped, %.2f items/s",
+            self._summary.processed,
+            self._summary.failed,
+            self._summary.skipped,
+            self._summary.throughput,
+        )
+        return self._summary
+
+    def _process(self, item: BatchItem) -> Dict[str, Any]:
+        mind = self.orchestrator.mind
+        record: Dict[str, Any] = {"id": item.id}
+        started = time.perf_counter()
+        try:
+            with _request("batch_item", item.context, item.audio):
+                if item.audio:
+                    record["audio"] = item.audio
+                    text = mind.perception.transcribe(item.audio)
+                    record["transcript"] = text
+                else:
+                    text = item.text or ""
+                reply = mind.handle_text(text, context=item.context)
+                record["reply"] = reply
+                if self.speak:
+                    record["speech"] = str(self._write_audio(item.id, mind.speech.synthesize(reply)))
+            record["status"] = "ok"
+        except Exception as exc:
+            logger.warning("Batch item %s failed: %s", item.id, exc)
+            record["status"] = "error"
+            record["error"] = f"{type(exc).__name__}: {exc}"
+        record["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return record
+
+    def _write_audio(self, item_id: str, data: bytes) -> Path:
+        # The spool behind speak() prunes old files, so batch audio gets its own directory.
+        suffix = getattr(self.orchestrator.mind.speech.tts, "audio_format", None) or "wav"
+        name = re.sub(r"[^\w.-]+", "_", item_id)
+        path = self._audio_dir / f"{name}.{suffix}"
+        path.write_bytes(data)
+        return path
+
+    def _write(self, sink: TextIO, finished: Iterable["Future[Dict[str, Any]]"]) -> None:
+        for future in finished:
+            record = future.result()
+            sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._summary.processed += 1
+            if record["status"] != "ok":
+                self._summary.failed += 1
+        sink.flush()
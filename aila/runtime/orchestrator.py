@@ -5,13 +5,32 @@ from __future__ import annotations
 import argparse
 import logging
 import os
-from dataclasses import dataclass
-from typing import Any
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
-from ..core import MindPipeline, PerceptionRouter, Planner
-from ..interfaces.asr import TencentASRClient
+from ..core import AsyncMindPipeline, MindPipeline, PerceptionRouter, Planner, SessionStore
+from ..core.memory import LLMSummarizer
+from ..core.response_cache import ResponseCache
+from ..interfaces.asr import SpeechRecognitionClient, TencentASRClient, WhisperServiceClient
+from ..interfaces.ollama import OllamaClient
+from ..interfaces.residency import ModelResidencyScheduler
+from ..interfaces.router import RoutedASRClient, RoutedLLMClient
 from ..interfaces.llm import LLMClient
-from ..interfaces.speech import SpeechInterface, TencentTTSClient
+from ..interfaces.speech import AudioFileSpool, SpeechInterface, TencentTTSClient, TextToSpeechClient
+from ..interfaces.tts_cache import CachedTTSClient, TTSAudioCache
+from ..telemetry import (
+    PROFILER,
+    RECORDER,
+    REQUEST_ERRORS,
+    annotate,
+    audio_shape,
+    configure_recording,
+    configure_tracing,
+    trace,
+)
 
 
 logger = logging.getLogger("aila.orchestrator")
@@ -26,30 +45,195 @@ def _parse_int(value: Any, *, name: str) -> int:
 
 @dataclass
 class Orchestrator:
+    """Entry points for one request each; every call is the root of a trace.
+
+    A ``trace_id`` in ``context`` is reused so callers can correlate their own logs.
+    With ``AILA_RECORD_FILE`` set, each request's shape is also recorded for replay.
+    """
+
     mind: MindPipeline
+    amind: AsyncMindPipeline = field(init=False, repr=False)
 
-    def process_audio(self, audio_path: str) -> str:
+    def __post_init__(self) -> None:
+        self.amind = AsyncMindPipeline.from_pipeline(self.mind)
+
+    def process_audio(self, audio_path: str, context: Dict[str, str] | None = None) -> str:
         logger.debug("Processing audio %s", audio_path)
-        return self.mind.handle_audio(audio_path)
+        with _request("process_audio", context, audio_path):
+            return self.mind.handle_audio(audio_path, context=context)
+
+    def stream_audio(
+        self, audio_path: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> Iterator[Union[str, bytes]]:
+        logger.debug("Streaming audio %s", audio_path)
+        with _request("stream_audio", context, audio_path):
+            yield from self.mind.handle_audio_stream(audio_path, context=context, as_bytes=as_bytes)
 
-    def process_text(self, text: str) -> str:
+    def process_text(self, text: str, context: Dict[str, str] | None = None) -> str:
         logger.debug("Processing text: %s", text)
-        return self.mind.handle_text(text)
+        with _request("process_text", context):
+            return self.mind.handle_text(text, context=context)
+
+    def stream_text(self, text: str, context: Dict[str, str] | None = None) -> Iterator[str]:
+        logger.debug("Streaming text: %s", text)
+        with _request("stream_text", context):
+            yield from self.mind.handle_text_stream(text, context=context)
+
+    async def aprocess_audio(
+        self, audio_path: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> Union[str, bytes]:
+        logger.debug("Processing audio %s", audio_path)
+        with _request("process_audio", context, audio_path):
+            return await self.amind.handle_audio(audio_path, context=context, as_bytes=as_bytes)
+
+    async def aprocess_text(self, text: str, context: Dict[str, str] | None = None) -> str:
+        logger.debug("Processing text: %s", text)
+        with _request("process_text", context):
+            return await self.amind.handle_text(text, context=context)
+
+    async def astream_audio(
+        self, audio_path: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> AsyncIterator[Union[str, bytes]]:
+        logger.debug("Streaming audio %s", audio_path)
+        with _request("stream_audio", context, audio_path):
+            async for segment in self.amind.handle_audio_stream(audio_path, context=context, as_bytes=as_bytes):
+                yield segment
+
+    async def astream_text(self, text: str, context: Dict[str, str] | None = None) -> AsyncIterator[str]:
+        logger.debug("Streaming text: %s", text)
+        with _request("stream_text", context):
+            async for delta in self.amind.handle_text_stream(text, context=context):
+                yield delta
+
+    async def astream_speech(
+        self, text: str, context: Dict[str, str] | None = None, *, as_bytes: bool = False
+    ) -> AsyncIterator[Union[str, bytes]]:
+        logger.debug("Streaming speech for text: %s", text)
+        with _request("stream_speech", context):
+            async for segment in self.amind.respond_stream(text, context=context, as_bytes=as_bytes):
+                yield segment
+
 
+@contextmanager
+def _request(name: str, context: Dict[str, str] | None, audio: Optional[str] = None) -> Iterator[None]:
+    """Trace root of one request; with traffic recording on, also note its shape.
 
-def build_pipeline(tts_client: TencentTTSClient, asr_client: TencentASRClient) -> MindPipeline:
+    Failures are counted in ``aila_request_errors_total``, including those raised by a
+    stream after its first item.
+    """
+    with trace(name, context.get("trace_id") if context else None):
+        if RECORDER.enabled:
+            annotate(session=context.get("session_id") if context else None, **(audio_shape(audio) if audio else {}))
+        try:
+            yield
+        except Exception as exc:
+            REQUEST_ERRORS.labels(name, type(exc).__name__).inc()
+            raise
+
+
+def _read_phrases(path: str) -> List[str]:
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+def build_pipeline(
+    tts_client: TextToSpeechClient,
+    asr_client: SpeechRecognitionClient,
+    *,
+    tts_workers: int = 3,
+    response_cache: ResponseCache | None = None,
+    llm: Any = None,
+    memory: SessionStore | None = None,
+) -> MindPipeline:
     perception = PerceptionRouter(recognizer=asr_client)
-    llm = LLMClient()
-    planner = Planner(llm=llm)
+    planner = Planner(llm=LLMClient() if llm is None else llm, cache=response_cache, memory=memory)
     speech = SpeechInterface(tts=tts_client)
-    return MindPipeline(perception=perception, planner=planner, speech=speech)
+    return MindPipeline(perception=perception, planner=planner, speech=speech, tts_workers=tts_workers)
 
 
-def main() -> None:
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Command line of the orchestrator; every option also has an environment default."""
     parser = argparse.ArgumentParser()
     parser.add_argument("--audio", help="Path to WAV/PCM file for recognition")
     parser.add_argument("--text", help="Text prompt bypassing ASR")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a long-lived HTTP/WebSocket server instead of handling one request",
+    )
+    parser.add_argument(
+        "--batch",
+        help="Directory of audio files or JSONL of prompts to process in one run",
+    )
+    parser.add_argument("--batch-output", help="JSONL file receiving batch results (appended on resume)")
+    parser.add_argument(
+        "--batch-workers",
+        default=os.getenv("AILA_BATCH_WORKERS", "4"),
+        help="Concurrent pipeline runs in --batch mode",
+    )
+    parser.add_argument(
+        "--batch-max-in-flight",
+        default=os.getenv("AILA_BATCH_MAX_IN_FLIGHT", "16"),
+        help="Upper bound on submitted but unfinished batch items",
+    )
+    parser.add_argument(
+        "--batch-speak",
+        action="store_true",
+        help="Also synthesize each batch reply into <batch-output>.audio/",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Overwrite --batch-output instead of skipping items it already completed",
+    )
+    parser.add_argument("--host", default=os.getenv("AILA_HOST", "127.0.0.1"), help="Listen address for --serve")
+    parser.add_argument("--port", default=os.getenv("AILA_PORT", "9080"), help="Listen port for --serve")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the reply incrementally: text deltas with --text, one audio file per sentence with --audio",
+    )
     parser.add_argument("--log-level", default="INFO")
+    parser.add_argument(
+        "--llm-cache-size",
+        default=os.getenv("AILA_LLM_CACHE_SIZE", "1024"),
+        help="Max planner replies kept for requests that opt in with context cache=1 (0 disables)",
+    )
+    parser.add_argument(
+        "--llm-cache-ttl",
+        default=os.getenv("AILA_LLM_CACHE_TTL", "3600"),
+        help="Seconds a cached planner reply stays valid",
+    )
+    parser.add_argument(
+        "--memory-tokens",
+        default=os.getenv("AILA_MEMORY_TOKENS", "1024"),
+        help="Token budget for the recent turns replayed per session; older turns are summarized (0 disables)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=os.getenv("AILA_TRACE_FILE", ""),
+        help="Rotating JSONL file receiving per-request span timings (empty disables tracing)",
+    )
+    parser.add_argument(
+        "--trace-sample",
+        default=os.getenv("AILA_TRACE_SAMPLE", "0.05"),
+        help="Fraction of requests traced; failed requests are always kept",
+    )
+    parser.add_argument(
+        "--trace-slow-ms",
+        default=os.getenv("AILA_TRACE_SLOW_MS", "0"),
+        help="Always keep traces of requests slower than this (0 disables)",
+    )
+    parser.add_argument(
+        "--record-file",
+        default=os.getenv("AILA_RECORD_FILE", ""),
+        help="JSONL file receiving the anonymized shape of every request for benchmarks/replay.py (empty disables)",
+    )
+    parser.add_argument(
+        "--memory-sessions",
+        default=os.getenv("AILA_MEMORY_SESSIONS", "256"),
+        help="Conversations kept in memory before the least recently used is dropped",
+    )
     parser.add_argument(
         "--tts-region",
         default=os.getenv("TENCENT_TTS_REGION", "ap-beijing"),
@@ -80,6 +264,79 @@ def main() -> None:
         default=os.getenv("TENCENT_TTS_SAMPLE_RATE", "16000"),
         help="Sample rate in Hz",
     )
+    parser.add_argument(
+        "--tts-output-dir",
+        default=os.getenv("AILA_TTS_OUTPUT_DIR", ""),
+        help="Directory for synthesized audio files (default: <tmp>/aila-tts)",
+    )
+    parser.add_argument(
+        "--tts-output-keep",
+        default=os.getenv("AILA_TTS_OUTPUT_KEEP", "64"),
+        help="Number of synthesized audio files kept before the oldest are removed",
+    )
+    parser.add_argument(
+        "--tts-output-max-age",
+        default=os.getenv("AILA_TTS_OUTPUT_MAX_AGE", "3600"),
+        help="Seconds after which synthesized audio files are removed",
+    )
+    parser.add_argument(
+        "--tts-cache-dir",
+        default=os.getenv("AILA_TTS_CACHE_DIR", ""),
+        help="Directory for the persistent TTS audio cache (disabled when empty)",
+    )
+    parser.add_argument(
+        "--tts-cache-max-mb",
+        default=os.getenv("AILA_TTS_CACHE_MAX_MB", "256"),
+        help="Disk budget of the TTS audio cache in MiB",
+    )
+    parser.add_argument(
+        "--tts-cache-warmup",
+        default=os.getenv("AILA_TTS_CACHE_WARMUP", ""),
+        help="Text file with one phrase per line to pre-synthesize into the cache at startup",
+    )
+    parser.add_argument(
+        "--tts-workers",
+        default=os.getenv("AILA_TTS_WORKERS", "3"),
+        help="Concurrent sentence synthesis requests in --stream mode",
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=("spark", "ollama", "routed"),
+        default=os.getenv("AILA_LLM_BACKEND", "spark"),
+        help="Planner LLM: iFLYTEK Spark, the local Ollama runtime, or both behind the latency router",
+    )
+    parser.add_argument(
+        "--ollama-url",
+        default=os.getenv("OLLAMA_URL", "http://127.0.0.1:11434"),
+        help="Base URL of the Ollama server",
+    )
+    parser.add_argument(
+        "--ollama-model",
+        default=os.getenv("OLLAMA_MODEL", "llama3.1"),
+        help="Ollama model name (see services/ollama/config/ollama.yaml)",
+    )
+    parser.add_argument(
+        "--ollama-config",
+        default=os.getenv("OLLAMA_CONFIG", "/etc/ollama/ollama.yaml"),
+        help="ollama.yaml whose max_runners/ram_budget_gb drive model residency (skipped if missing)",
+    )
+    parser.add_argument(
+        "--asr-backend",
+        choices=("tencent", "whisper", "routed"),
+        default=os.getenv("AILA_ASR_BACKEND", "tencent"),
+        help="Speech recognizer: Tencent Cloud, the local services/whisper instance, or both behind the latency router",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        default=os.getenv("AILA_HEDGE", "0") in {"1", "true", "True"},
+        help="With routed backends, start a second request when the first exceeds its p95 latency",
+    )
+    parser.add_argument(
+        "--whisper-url",
+        default=os.getenv("WHISPER_URL", "http://127.0.0.1:9081"),
+        help="Base URL of the local Whisper service for --asr-backend whisper",
+    )
     parser.add_argument(
         "--asr-region",
         default=os.getenv("TENCENT_ASR_REGION", "ap-beijing"),
@@ -100,24 +357,30 @@ def main() -> None:
         default=os.getenv("TENCENT_ASR_ENABLE_PUNCTUATION", "1"),
         help="Enable punctuation (1 or 0)",
     )
-    args = parser.parse_args()
+    return parser
 
-    logging.basicConfig(level=args.log_level.upper())
 
-    secret_id = os.getenv("TENCENT_SECRET_ID")
-    secret_key = os.getenv("TENCENT_SECRET_KEY")
-    if not secret_id or not secret_key:
-        raise RuntimeError(
-            "TENCENT_SECRET_ID and TENCENT_SECRET_KEY must be set (see system/etc/aila/env.d/tencent.conf)."
-        )
+def build_orchestrator(args: argparse.Namespace) -> Orchestrator:
+    """Assemble the backends and pipeline described by ``args`` (see :func:`build_arg_parser`)."""
+    # Tencent clients connect lazily and validate credentials on first use, so
+    # --text runs never pay for the SDK import.
+    secret_id = os.getenv("TENCENT_SECRET_ID", "")
+    secret_key = os.getenv("TENCENT_SECRET_KEY", "")
 
     voice_type = _parse_int(args.tts_voice_type, name="tts_voice_type")
     speed = _parse_int(args.tts_speed, name="tts_speed")
     volume = _parse_int(args.tts_volume, name="tts_volume")
     sample_rate = _parse_int(args.tts_sample_rate, name="tts_sample_rate")
+    tts_workers = _parse_int(args.tts_workers, name="tts_workers")
+    cache_max_mb = _parse_int(args.tts_cache_max_mb, name="tts_cache_max_mb")
+    spool = AudioFileSpool(
+        directory=Path(args.tts_output_dir) if args.tts_output_dir else None,
+        max_files=_parse_int(args.tts_output_keep, name="tts_output_keep"),
+        max_age=float(_parse_int(args.tts_output_max_age, name="tts_output_max_age")),
+    )
     enable_punctuation = args.asr_punctuation not in {"0", "false", "False"}
 
-    tts_client = TencentTTSClient(
+    tts_client: TextToSpeechClient = TencentTTSClient(
         secret_id=secret_id,
         secret_key=secret_key,
         region=args.tts_region,
@@ -126,28 +389,133 @@ def main() -> None:
         volume=volume,
         audio_format=args.tts_format,
         sample_rate=sample_rate,
+        spool=spool,
     )
+    if args.tts_cache_dir:
+        cached_tts = CachedTTSClient(
+            tts=tts_client,
+            cache=TTSAudioCache(Path(args.tts_cache_dir), max_bytes=cache_max_mb * 1024 * 1024),
+        )
+        if args.tts_cache_warmup:
+            phrases = _read_phrases(args.tts_cache_warmup)
+            threading.Thread(
+                target=cached_tts.warm_up, args=(phrases,), name="aila-tts-warmup", daemon=True
+            ).start()
+        tts_client = cached_tts
 
-    asr_client = TencentASRClient(
-        secret_id=secret_id,
-        secret_key=secret_key,
-        region=args.asr_region,
-        engine_model=args.asr_engine,
-        audio_format=args.asr_format,
-        enable_punctuation=enable_punctuation,
+    asr_backends: Dict[str, SpeechRecognitionClient] = {}
+    if args.asr_backend in {"whisper", "routed"}:
+        asr_backends["whisper"] = WhisperServiceClient(base_url=args.whisper_url)
+    if args.asr_backend in {"tencent", "routed"}:
+        asr_backends["tencent"] = TencentASRClient(
+            secret_id=secret_id,
+            secret_key=secret_key,
+            region=args.asr_region,
+            engine_model=args.asr_engine,
+            audio_format=args.asr_format,
+            enable_punctuation=enable_punctuation,
+        )
+    asr_client: SpeechRecognitionClient
+    if len(asr_backends) > 1:
+        asr_client = RoutedASRClient(asr_backends, hedge=args.hedge)
+    else:
+        asr_client = next(iter(asr_backends.values()))
+
+    llm_backends: Dict[str, Any] = {}
+    if args.llm_backend in {"ollama", "routed"}:
+        ollama = OllamaClient(base_url=args.ollama_url, model=args.ollama_model)
+        if Path(args.ollama_config).is_file():
+            ollama.scheduler = ModelResidencyScheduler.from_yaml(
+                args.ollama_config, args.ollama_url, keep_alive=ollama.keep_alive
+            )
+            ollama.scheduler.start()
+        # Pay the cold model load now rather than on the first utterance.
+        threading.Thread(target=ollama.warm_up, name="aila-ollama-warmup", daemon=True).start()
+        llm_backends["ollama"] = ollama
+    if args.llm_backend in {"spark", "routed"}:
+        llm_backends["spark"] = LLMClient()
+    llm = RoutedLLMClient(llm_backends, hedge=args.hedge) if len(llm_backends) > 1 else next(iter(llm_backends.values()))
+
+    cache_size = _parse_int(args.llm_cache_size, name="llm_cache_size")
+    response_cache = None
+    if cache_size > 0:
+        response_cache = ResponseCache(
+            ttl=float(_parse_int(args.llm_cache_ttl, name="llm_cache_ttl")), max_entries=cache_size
+        )
+
+    memory_tokens = _parse_int(args.memory_tokens, name="memory_tokens")
+    memory = None
+    if memory_tokens > 0:
+        memory = SessionStore(
+            summarizer=LLMSummarizer(llm),
+            token_budget=memory_tokens,
+            summary_budget=max(64, memory_tokens // 4),
+            max_sessions=_parse_int(args.memory_sessions, name="memory_sessions"),
+        )
+
+    mind = build_pipeline(
+        tts_client=tts_client,
+        asr_client=asr_client,
+        tts_workers=tts_workers,
+        response_cache=response_cache,
+        llm=llm,
+        memory=memory,
     )
+    return Orchestrator(mind=mind)
 
-    mind = build_pipeline(tts_client=tts_client, asr_client=asr_client)
-    orchestrator = Orchestrator(mind=mind)
 
-    if args.audio:
+def main() -> None:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    # Before any client is built: those need credentials and start background threads.
+    if not (args.serve or args.batch or args.audio or args.text):
+        parser.error("Provide --audio, --text, --batch or --serve")
+
+    logging.basicConfig(level=args.log_level.upper())
+    configure_tracing(
+        path=args.trace_file or None,
+        sample_rate=float(args.trace_sample),
+        slow_ms=float(args.trace_slow_ms),
+    )
+    configure_recording(path=args.record_file or None)
+    # `kill -USR2 <pid>` profiles the next AILA_PROFILE_REQUESTS requests.
+    PROFILER.install_signal()
+
+    orchestrator = build_orchestrator(args)
+
+    if args.serve:
+        from .server import serve
+
+        serve(orchestrator, args.host, _parse_int(args.port, name="port"), log_level=args.log_level)
+    elif args.batch:
+        from .batch import BatchRunner, load_items
+
+        source = Path(args.batch)
+        output = Path(args.batch_output) if args.batch_output else source.with_name(f"{source.stem}.results.jsonl")
+        runner = BatchRunner(
+            orchestrator=orchestrator,
+            workers=_parse_int(args.batch_workers, name="batch_workers"),
+            max_in_flight=_parse_int(args.batch_max_in_flight, name="batch_max_in_flight"),
+            speak=args.batch_speak,
+        )
+        summary = runner.run(load_items(source), output, resume=not args.no_resume)
+        print(
+            f"{summary.processed} processed ({summary.failed} failed), {summary.skipped} skipped, "
+            f"{summary.throughput:.2f} items/s -> {output}"
+        )
+    elif args.audio and args.stream:
+        for segment in orchestrator.stream_audio(args.audio):
+            print(segment, flush=True)
+    elif args.audio:
         result = orchestrator.process_audio(args.audio)
         print(result)
+    elif args.text and args.stream:
+        for delta in orchestrator.stream_text(args.text):
+            print(delta, end="", flush=True)
+        print()
     elif args.text:
         result = orchestrator.process_text(args.text)
         print(result)
-    else:
-        parser.error("Provide either --audio or --text")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+"""Long-running HTTP/WebSocket front end keeping the orchestrator clients warm."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+import uvicorn
+
+from ..interfaces.router import RoutedASRClient, RoutedLLMClient
+from ..telemetry import PROFILER, RECORDER, REGISTRY, TRACER, annotate, audio_shape, trace
+from .orchestrator import Orchestrator
+
+
+logger = logging.getLogger("aila.server")
+
+_MEDIA_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg", "pcm": "audio/L16"}
+
+
+class TextRequest(BaseModel):
+    text: str
+    system_prompt: str | None = None
+    stream: bool = False
+    cache: bool = False
+    session_id: str | None = None
+
+
+def _context(
+    system_prompt: str | None, cache: bool = False, session_id: str | None = None
+) -> Optional[Dict[str, str]]:
+    context: Dict[str, str] = {}
+    if system_prompt:
+        context["system_prompt"] = system_prompt
+    if cache:
+        context["cache"] = "1"
+    if session_id:
+        context["session_id"] = session_id
+    return context or None
+
+
+def _audio_media_type(orchestrator: Orchestrator) -> str:
+    audio_format = getattr(orchestrator.mind.speech.tts, "audio_format", None) or "wav"
+    return _MEDIA_TYPES.get(audio_format.lower(), "application/octet-stream")
+
+
+def _residency_stats(llm: Any) -> Optional[Dict[str, Any]]:
+    backends = llm.backends.values() if isinstance(llm, RoutedLLMClient) else [llm]
+    for backend in backends:
+        scheduler = getattr(backend, "scheduler", None)
+        if scheduler is not None:
+            return scheduler.stats()
+    return None
+
+
+def _prefix_cache_stats(llm: Any) -> Optional[Dict[str, Any]]:
+    backends = llm.backends.values() if isinstance(llm, RoutedLLMClient) else [llm]
+    for backend in backends:
+        prefix_cache = getattr(backend, "prefix_cache", None)
+        if prefix_cache is not None:
+            return prefix_cache.stats()
+    return None
+
+
+def create_app(orchestrator: Orchestrator, *, upload_suffix: str = ".wav") -> FastAPI:
+    app = FastAPI(title="Aila Orchestrator")
+    media_type = _audio_media_type(orchestrator)
+
+    async def transcribe_upload(data: bytes) -> str:
+        if not data:
+            raise HTTPException(status_code=400, detail="empty audio body")
+        return await orchestrator.amind.perception.atranscribe_bytes(data, upload_suffix)
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        return {"status": "ok"}
+
+    @app.get("/metrics")
+    async def metrics() -> PlainTextResponse:
+        """Stage and backend metrics in the Prometheus text format, aggregated by ``services/monitor``."""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/debug/profile")
+    async def start_profile(requests: int = 5, mode: str = "cpu") -> Dict[str, Any]:
+        """Profile the next ``requests`` requests with cProfile (``cpu``) or tracemalloc (``memory``)."""
+        try:
+            PROFILER.arm(requests, mode)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return PROFILER.stats()
+
+    @app.get("/debug/profile")
+    async def profile_status() -> Dict[str, Any]:
+        return PROFILER.stats()
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        cache = orchestrator.mind.planner.cache
+        memory = orchestrator.mind.planner.memory
+        llm = orchestrator.mind.planner.llm
+        recognizer = orchestrator.mind.perception.recognizer
+        return {
+            "planner_cache": cache.stats() if cache is not None else None,
+            "conversation_memory": memory.stats() if memory is not None else None,
+            "llm_routing": llm.stats() if isinstance(llm, RoutedLLMClient) else None,
+            "asr_routing": recognizer.stats() if isinstance(recognizer, RoutedASRClient) else None,
+            "ollama_residency": _residency_stats(llm),
+            "ollama_prefix_cache": _prefix_cache_stats(llm),
+            "tracing": {"file": TRACER.path, "sample_rate": TRACER.sample_rate, "written": TRACER.written},
+            "recording": RECORDER.stats(),
+        }
+
+    async def stream_text(text_in: str, context: Optional[Dict[str, str]]) -> AsyncIterator[str]:
+        # The status line is already sent, so a failure ends the body with an error line.
+        try:
+            async for delta in orchestrator.astream_text(text_in, context=context):
+                yield delta
+        except (HTTPException, ValueError, RuntimeError) as exc:
+            detail = getattr(exc, "detail", None) or str(exc)
+            logger.warning("Streamed /text failed: %s", detail)
+            yield f"\n[error] {detail}\n"
+        except Exception:
+            logger.exception("Streamed /text failed")
+            yield "\n[error] internal error\n"
+
+    @app.post("/text")
+    async def text(request: TextRequest) -> Any:
+        """Reply to ``text``; with ``stream`` the reply is sent as plain-text deltas.
+
+        A streamed reply that fails after it started ends with a ``[error] <detail>`` line.
+        """
+        context = _context(request.system_prompt, request.cache, request.session_id)
+        if request.stream:
+            return StreamingResponse(stream_text(request.text, context), media_type="text/plain; charset=utf-8")
+        reply = await orchestrator.aprocess_text(request.text, context=context)
+        return {"reply": reply}
+
+    @app.post("/speak")
+    async def speak(request: TextRequest) -> Response:
+        context = _context(request.system_prompt, request.cache, request.session_id)
+        with trace("speak"):
+            reply = await orchestrator.aprocess_text(request.text, context=context)
+            audio = await orchestrator.amind.speech.asynthesize(reply)
+        return Response(content=audio, media_type=media_type)
+
+    @app.post("/audio")
+    async def audio(request: Request, cache: bool = False, session_id: str | None = None) -> Response:
+        """Transcribe the raw audio body, plan a reply and return it as synthesized audio."""
+        data = await request.body()
+        # One trace root for the whole turn, so transcription and synthesis are
+        # recorded with the reply rather than as separate requests.
+        with trace("audio_upload"):
+            if RECORDER.enabled:
+                annotate(**audio_shape(data))
+            transcript = await transcribe_upload(data)
+            reply = await orchestrator.aprocess_text(transcript, context=_context(None, cache, session_id))
+            audio_bytes = await orchestrator.amind.speech.asynthesize(reply)
+        return Response(
+            content=audio_bytes,
+            media_type=media_type,
+            headers={"X-Aila-Transcript": json.dumps(transcript), "X-Aila-Reply": json.dumps(reply)},
+        )
+
+    @app.websocket("/ws")
+    async def conversation(websocket: WebSocket) -> None:
+        """Conversation socket streaming the spoken reply sentence by sentence.
+
+        Clients send either a binary frame holding one utterance of audio or a JSON text
+        frame ``{"text": ..., "system_prompt": ...}``. The server answers with JSON
+        events (``transcript``, an ``audio`` header per segment, ``end``/``error``) and one
+        binary frame of audio per reply sentence. The connection is one conversation
+        unless a JSON frame names another ``session_id``.
+        """
+        session_id = websocket.query_params.get("session_id") or uuid.uuid4().hex
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                context = _context(None, session_id=session_id)
+                try:
+                    with trace("ws_audio" if message.get("bytes") is not None else "ws_text"):
+                        if message.get("bytes") is not None:
+                            if RECORDER.enabled:
+                                annotate(**audio_shape(message["bytes"]))
+                            text_in = await transcribe_upload(message["bytes"])
+                            await websocket.send_json({"type": "transcript", "text": text_in})
+                        else:
+                            payload = json.loads(message.get("text") or "{}")
+                            text_in = str(payload.get("text", "")).strip()
+                            context = _context(
+                                payload.get("system_prompt"),
+                                bool(payload.get("cache")),
+                                payload.get("session_id") or session_id,
+                            )
+                            if not text_in:
+                                raise ValueError("text must not be empty")
+                        index = 0
+                        async for segment in orchestrator.astream_speech(text_in, context=context, as_bytes=True):
+                            await websocket.send_json({"type": "audio", "index": index, "media_type": media_type})
+                            await websocket.send_bytes(segment)  # type: ignore[arg-type]
+                            index += 1
+                        await websocket.send_json({"type": "end", "segments": index})
+                except WebSocketDisconnect:
+                    raise
+                except (HTTPException, ValueError, RuntimeError) as exc:
+                    detail = getattr(exc, "detail", None) or str(exc)
+                    logger.warning("WebSocket turn failed: %s", detail)
+                    await websocket.send_json({"type": "error", "detail": detail})
+                except Exception:
+                    # Keep the conversation open; the turn still ends with an event.
+                    logger.exception("WebSocket turn failed")
+                    await websocket.send_json({"type": "error", "detail": "internal error"})
+        except WebSocketDisconnect:
+            return
+
+    return app
+
+
+def serve(orchestrator: Orchestrator, host: str, port: int, *, log_level: str = "info") -> None:
+    app = create_app(orchestrator)
+    logger.info("Serving orchestrator on %s:%s (pid %s)", host, port, os.getpid())
+    uvicorn.run(app, host=host, port=port, log_level=log_level.lower())
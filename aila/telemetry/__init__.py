@@ -0,0 +1,54 @@
+"""Process-wide metrics for the pipeline stages and backend clients."""
+
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from .metrics import REGISTRY, Counter, Gauge, Histogram, Registry, counter, gauge, histogram
+from .profiling import PROFILER, RequestProfiler
+from .recording import RECORDER, TrafficRecorder, audio_shape, configure_recording
+from .tracing import TRACER, Tracer, add_span, annotate, configure_tracing, current_trace_id, span, trace
+
+STAGE_SECONDS = histogram(
+    "aila_stage_seconds",
+    "Wall time of each pipeline stage (asr, llm, llm_first_token, tts)",
+    ["stage"],
+)
+BACKEND_SECONDS = histogram(
+    "aila_backend_request_seconds",
+    "Backend call attempts; streaming calls are timed until the response headers",
+    ["backend"],
+)
+BACKEND_REQUESTS = counter(
+    "aila_backend_requests_total",
+    "Backend call attempts by outcome (ok, error, throttled)",
+    ["backend", "outcome"],
+)
+REQUEST_ERRORS = counter(
+    "aila_request_errors_total",
+    "Orchestrator requests that failed, by entry point and exception type",
+    ["request", "error"],
+)
+BACKEND_BYTES = counter("aila_backend_bytes_total", "Payload bytes exchanged with backends", ["backend", "direction"])
+BACKEND_IN_FLIGHT = gauge("aila_backend_in_flight", "Backend calls currently running", ["backend"])
+
+
+@contextmanager
+def stage(name: str, **attrs: Any) -> Iterator[None]:
+    """Time a pipeline stage into ``aila_stage_seconds`` and the current trace."""
+    with span(name, **attrs), STAGE_SECONDS.time(name):
+        yield
+
+
+def record_bytes(backend: str, sent: int = 0, received: int = 0) -> None:
+    if sent:
+        BACKEND_BYTES.labels(backend, "sent").inc(sent)
+    if received:
+        BACKEND_BYTES.labels(backend, "received").inc(received)
+
+
+def record_response(backend: str, response: object, *, streamed: bool = False) -> None:
+    """Count the request body and, unless ``streamed``, the response body of a requests/httpx exchange."""
+    request = getattr(response, "request", None)
+    body = getattr(request, "body", None) if hasattr(request, "body") else getattr(request, "content", None)
+    received = 0 if streamed else len(getattr(response, "content", b"") or b"")
+    record_bytes(backend, len(body) if body else 0, received)
@@ -0,0 +1,148 @@
+"""Capture cProfile or tracemalloc data for the next few requests of a running daemon."""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cpu", "memory")
+
+
+@dataclass
+class _Capture:
+    profiler: "RequestProfiler"
+    mode: str
+    handle: Any = None
+    snapshot: Any = None
+
+    def end(self, trace_id: str, name: str) -> None:
+        self.profiler._finish(self, trace_id, name)
+
+
+@dataclass
+class RequestProfiler:
+    """Profile the next ``remaining`` requests once armed, then switch itself off.
+
+    ``cpu`` runs cProfile around one request at a time and writes a ``.prof`` file
+    per request, readable with ``pstats`` or snakeviz. cProfile follows the thread
+    that entered the request, so on the asyncio server the file also covers other
+    sessions that ran on the event loop meanwhile. ``memory`` runs tracemalloc and
+    writes the top allocation growth per request. Output goes to ``directory``.
+    """
+
+    directory: Path = field(default_factory=lambda: Path(os.getenv("AILA_PROFILE_DIR", "/tmp/aila-profiles")))
+    remaining: int = 0
+    mode: str = "cpu"
+    written: int = field(default=0, init=False)
+    _pending: Optional[Tuple[int, str]] = field(default=None, init=False, repr=False)
+    _busy: bool = field(default=False, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def armed(self) -> bool:
+        return self.remaining > 0 or self._pending is not None
+
+    def arm(self, requests: int = 5, mode: str = "cpu") -> None:
+        if mode not in MODES:
+            raise ValueError(f"profile mode must be one of {MODES}, got {mode!r}")
+        with self._lock:
+            self.remaining = max(0, requests)
+            self.mode = mode
+        if mode == "memory":
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+        logger.warning("Profiling the next %d requests (%s) into %s", requests, mode, self.directory)
+
+    def begin(self) -> Optional[_Capture]:
+        """Start a capture for this request if armed and no other capture is running."""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            try:
+                self.arm(*pending)
+            except ValueError as exc:
+                logger.warning("Ignoring profile signal: %s", exc)
+        if not self.remaining:
+            return None
+        with self._lock:
+            if not self.remaining or self._busy:
+                return None
+            self.remaining -= 1
+            self._busy = True
+            capture = _Capture(self, self.mode)
+        if capture.mode == "cpu":
+            import cProfile
+
+            capture.handle = cProfile.Profile()
+            try:
+                capture.handle.enable()
+            except ValueError as exc:  # another profiler (e.g. a debugger) owns the hook
+                logger.warning("cProfile unavailable: %s", exc)
+                capture.handle = None
+        else:
+            import tracemalloc
+
+            capture.snapshot = tracemalloc.take_snapshot()
+        return capture
+
+    def _finish(self, capture: _Capture, trace_id: str, name: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{trace_id}"
+        try:
+            if capture.mode == "cpu" and capture.handle is not None:
+                capture.handle.disable()
+                capture.handle.dump_stats(f"{stem}.prof")
+            elif capture.mode == "memory":
+                import tracemalloc
+
+                stats = tracemalloc.take_snapshot().compare_to(capture.snapshot, "lineno")
+                lines = [str(stat) for stat in stats[:50]]
+                Path(f"{stem}.alloc.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+            self.written += 1
+        finally:
+            with self._lock:
+                self._busy = False
+                done = not self.remaining
+            if done and capture.mode == "memory":
+                import tracemalloc
+
+                tracemalloc.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "remaining": self.remaining,
+            "pending": self._pending is not None,
+            "mode": self.mode,
+            "written": self.written,
+            "directory": str(self.directory),
+        }
+
+    def install_signal(self, signum: int = getattr(signal, "SIGUSR2", 0)) -> None:
+        """Arm on ``signum`` (``SIGUSR2``) with ``AILA_PROFILE_REQUESTS``/``AILA_PROFILE_MODE``.
+
+        The handler only stores the request; the next :meth:`begin` arms the profiler.
+        Taking locks, logging or starting tracemalloc inside the handler could deadlock
+        against the interrupted code on the main thread.
+        """
+        if not signum:
+            return
+        requests = int(os.getenv("AILA_PROFILE_REQUESTS", "5"))
+        mode = os.getenv("AILA_PROFILE_MODE", "cpu")
+
+        def handler(_signum: int, _frame: Any) -> None:
+            self._pending = (requests, mode)
+
+        signal.signal(signum, handler)
+
+
+PROFILER = RequestProfiler()
@@ -0,0 +1,116 @@
+"""Record the shape of production traffic for replay by ``benchmarks/replay.py``."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import wave
+from dataclasses import dataclass, field
+from typing import Any, Dict, IO, Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("asr", "llm", "llm_first_token", "tts")
+
+
+def audio_shape(audio: Union[str, bytes]) -> Dict[str, Any]:
+    """Size and, for WAV input, duration of an utterance given as a path or in memory."""
+    try:
+        shape: Dict[str, Any] = {"audio_bytes": len(audio) if isinstance(audio, bytes) else os.path.getsize(audio)}
+    except OSError:
+        return {}
+    try:
+        with wave.open(io.BytesIO(audio) if isinstance(audio, bytes) else audio, "rb") as handle:
+            shape["audio_s"] = round(handle.getnframes() / handle.getframerate(), 3)
+    except (OSError, EOFError, wave.Error, ZeroDivisionError):
+        pass  # not WAV; the size alone still drives replay
+    return shape
+
+
+@dataclass
+class TrafficRecorder:
+    """Append one JSON line per request to ``path``, holding its shape but none of its content.
+
+    A line keeps the start time (for inter-arrival gaps), the entry point, total and
+    per-stage milliseconds, audio size and duration, prompt and reply lengths in
+    characters, the number of synthesized segments and a salted hash of the session
+    id. Transcripts, prompts and replies are never written. Recording stops once the
+    file reaches ``max_bytes``.
+    """
+
+    path: Optional[str] = field(default_factory=lambda: os.getenv("AILA_RECORD_FILE") or None)
+    max_bytes: int = field(default_factory=lambda: int(os.getenv("AILA_RECORD_MAX_BYTES", str(100 * 1024 * 1024))))
+    recorded: int = field(default=0, init=False)
+    _salt: bytes = field(default_factory=lambda: uuid.uuid4().bytes, init=False, repr=False)
+    _handle: Optional[IO[str]] = field(default=None, init=False, repr=False)
+    _full: bool = field(default=False, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and not self._full
+
+    def record(self, trace: Any, duration: float, error: Optional[str]) -> None:
+        """Write the shape of a finished :class:`~aila.telemetry.tracing.Trace`."""
+        stages: Dict[str, float] = {}
+        segments = 0
+        for span in trace.spans:
+            if span.parent is None and span.name in STAGES:
+                stages[span.name] = stages.get(span.name, 0.0) + span.duration * 1000
+                segments += span.name == "tts"
+        attrs = dict(trace.attrs)
+        session = attrs.pop("session", None)
+        line: Dict[str, Any] = {
+            "t": round(time.time() - duration, 3),
+            "kind": trace.name,
+            "ms": round(duration * 1000, 1),
+            **attrs,
+            "segments": segments,
+            "stages": {name: round(value, 1) for name, value in stages.items()},
+        }
+        if session:
+            line["session"] = hashlib.blake2b(str(session).encode(), key=self._salt, digest_size=6).hexdigest()
+        if error:
+            line["error"] = error.split(":", 1)[0]
+        self._write(json.dumps(line, separators=(",", ":")))
+
+    def _write(self, line: str) -> None:
+        with self._lock:
+            if not self.enabled:
+                return
+            if self._handle is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._handle = open(self.path, "a", encoding="utf-8")
+            self._handle.write(line + "\n")
+            self._handle.flush()
+            self.recorded += 1
+            if self._handle.tell() >= self.max_bytes:
+                logger.warning("Traffic recording %s reached %d bytes; recording stopped", self.path, self.max_bytes)
+                self._handle.close()
+                self._handle = None
+                self._full = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"file": self.path, "recorded": self.recorded, "full": self._full}
+
+
+RECORDER = TrafficRecorder()
+
+
+def configure_recording(**settings: Any) -> TrafficRecorder:
+    """Update the process-wide recorder in place, e.g. from CLI flags."""
+    with RECORDER._lock:
+        for name, value in settings.items():
+            setattr(RECORDER, name, value)
+        if RECORDER._handle is not None:
+            RECORDER._handle.close()
+        RECORDER._handle = None
+        RECORDER._full = False
+    return RECORDER
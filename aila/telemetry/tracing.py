@@ -0,0 +1,221 @@
+"""Request-scoped traces with nested span timings, written to a rotating JSONL file."""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .profiling import PROFILER
+from .recording import RECORDER
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    parent: Optional[int]
+    index: int
+    attrs: Dict[str, Any]
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def open(self, name: str, parent: Optional[Span], attrs: Dict[str, Any]) -> Span:
+        # list.append is atomic, so spans from TTS worker threads need no lock.
+        span = Span(name, time.perf_counter(), parent.index if parent else None, len(self.spans), attrs)
+        self.spans.append(span)
+        return span
+
+    def to_json(self, duration: float, error: Optional[str]) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "at": round(time.time() - duration, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "error": error,
+            **({"attrs": self.attrs} if self.attrs else {}),
+            "spans": [
+                {
+                    "name": span.name,
+                    "parent": span.parent,
+                    "offset_ms": round((span.start - self.started) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    **({"error": span.error} if span.error else {}),
+                    **span.attrs,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("aila_trace", default=None)
+_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("aila_span", default=None)
+
+
+def _reset(var: contextvars.ContextVar, token: contextvars.Token, previous: Any) -> None:
+    try:
+        var.reset(token)
+    except ValueError:  # a generator finished in a different context than it started in
+        var.set(previous)
+
+
+@dataclass
+class Tracer:
+    """Decide which requests are traced and append the kept traces to ``path``.
+
+    A fraction ``sample_rate`` of requests is kept, plus every request slower than
+    ``slow_ms`` or failing. The file rotates at ``max_bytes`` keeping ``backups``
+    old files. Without a ``path`` tracing costs one context variable lookup per span.
+    """
+
+    path: Optional[str] = field(default_factory=lambda: os.getenv("AILA_TRACE_FILE") or None)
+    sample_rate: float = field(default_factory=lambda: float(os.getenv("AILA_TRACE_SAMPLE", "0.05")))
+    slow_ms: float = field(default_factory=lambda: float(os.getenv("AILA_TRACE_SLOW_MS", "0")))
+    max_bytes: int = field(default_factory=lambda: int(os.getenv("AILA_TRACE_MAX_BYTES", str(50 * 1024 * 1024))))
+    backups: int = field(default_factory=lambda: int(os.getenv("AILA_TRACE_BACKUPS", "5")))
+    written: int = field(default=0, init=False)
+    _writer: Optional[logging.Logger] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _log(self) -> logging.Logger:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    handler = logging.handlers.RotatingFileHandler(
+                        self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8"
+                    )
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    writer = logging.getLogger("aila.trace.file")
+                    writer.handlers[:] = [handler]
+                    writer.setLevel(logging.INFO)
+                    writer.propagate = False
+                    self._writer = writer
+        return self._writer
+
+    def keep(self, duration: float, error: Optional[str]) -> bool:
+        if not self.enabled:
+            return False
+        if error or (self.slow_ms and duration * 1000 >= self.slow_ms):
+            return True
+        return random.random() < self.sample_rate
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        writer = self._log()
+        with self._lock:
+            writer.info(line)
+            self.written += 1
+
+
+TRACER = Tracer()
+
+
+def configure_tracing(**settings: Any) -> Tracer:
+    """Update the process-wide tracer in place, e.g. from CLI flags."""
+    with TRACER._lock:
+        for name, value in settings.items():
+            setattr(TRACER, name, value)
+        TRACER._writer = None
+    return TRACER
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def trace(name: str, trace_id: Optional[str] = None) -> Iterator[Optional[str]]:
+    """Make the enclosed request a trace root; nested calls join the current trace.
+
+    Yields the trace id, or ``None`` when neither tracing, recording nor the profiler
+    is active.
+    """
+    if _trace.get() is not None:
+        yield current_trace_id()
+        return
+    profile = PROFILER.begin()
+    if not TRACER.enabled and not RECORDER.enabled and profile is None:
+        yield None
+        return
+    current = Trace(trace_id or uuid.uuid4().hex[:16], name)
+    token = _trace.set(current)
+    error: Optional[str] = None
+    try:
+        yield current.trace_id
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _reset(_trace, token, None)
+        duration = time.perf_counter() - current.started
+        if profile is not None:
+            profile.end(current.trace_id, name)
+        if TRACER.keep(duration, error):
+            TRACER.write(current.to_json(duration, error))
+        if RECORDER.enabled:
+            RECORDER.record(current, duration, error)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """Time the enclosed block as a child of the innermost open span."""
+    current = _trace.get()
+    if current is None:
+        yield
+        return
+    parent = _span.get()
+    opened = current.open(name, parent, attrs)
+    token = _span.set(opened)
+    try:
+        yield
+    except BaseException as exc:
+        opened.error = type(exc).__name__
+        raise
+    finally:
+        opened.duration = time.perf_counter() - opened.start
+        _reset(_span, token, parent)
+
+
+def annotate(**attrs: Any) -> None:
+    """Attach request-level attributes (sizes, session) to the current trace, if any."""
+    current = _trace.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def add_span(name: str, started: float, **attrs: Any) -> None:
+    """Record an already finished span that began at ``started`` (``time.perf_counter``).
+
+    For work spread over a generator's lifetime, where holding the span open would
+    make it the parent of whatever the consumer does between items.
+    """
+    current = _trace.get()
+    if current is None:
+        return
+    recorded = current.open(name, _span.get(), attrs)
+    recorded.start = started
+    recorded.duration = time.perf_counter() - started
@@ -0,0 +1 @@
+"""Offline load benchmarks for the Aila pipeline; see ``benchmarks/README.md``."""
@@ -0,0 +1,221 @@
+"""Local stand-ins for Spark, Tencent ASR/TTS and the Whisper service.
+
+Each fake answers with the response shape the real client parses, after a delay
+drawn from a configurable latency distribution, so the pipeline can be measured
+without paid API calls. Run standalone with ``python -m benchmarks.fakes``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+_WORDS = "the quick brown fox jumps over a lazy dog while Aila listens and answers".split()
+_NOISE = random.Random(0).randbytes(1 << 22)  # sliced for audio payloads; generating per request costs CPU
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Delay distribution parsed from ``fixed:MS``, ``uniform:LO:HI``, ``normal:MEAN:STD`` or ``lognormal:MEDIAN:SIGMA``."""
+
+    kind: str
+    a: float
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, _, rest = spec.partition(":")
+        values = [float(value) for value in rest.split(":") if value]
+        if kind not in {"fixed", "uniform", "normal", "lognormal"} or not values:
+            raise ValueError(f"invalid latency spec {spec!r}")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self) -> float:
+        """One delay in seconds."""
+        if self.kind == "fixed":
+            ms = self.a
+        elif self.kind == "uniform":
+            ms = random.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            ms = random.gauss(self.a, self.b)
+        else:
+            ms = self.a * math.exp(random.gauss(0.0, self.b))
+        return max(0.0, ms) / 1000.0
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.a:g}" + (f":{self.b:g}" if self.kind != "fixed" else "")
+
+
+def _text(words: int) -> str:
+    body = " ".join(random.choice(_WORDS) for _ in range(max(1, words)))
+    # Sentence breaks every dozen words exercise the sentence-level TTS pipeline.
+    parts = body.split(" ")
+    return " ".join(word + ("." if index % 12 == 11 else "") for index, word in enumerate(parts)) + "."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+    routes: Dict[str, Callable[["_Handler", bytes], None]] = {}
+
+    def log_message(self, *args: object) -> None:
+        return
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        route = self.routes.get(self.path.split("?", 1)[0]) or self.routes.get("*")
+        if route is None:
+            self._send(404, b"{}")
+            return
+        route(self, body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._send(200, b'{"status":"ok"}')
+
+    def _send(self, status: int, payload: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@dataclass
+class FakeSpark:
+    """``POST /v2/chat/completions``, plain JSON or SSE when the payload sets ``stream``."""
+
+    latency: Latency = Latency("lognormal", 400, 0.4)  # time to first token
+    token_latency: Latency = Latency("fixed", 15)
+    reply_words: int = 40
+
+    def __call__(self, handler: _Handler, body: bytes) -> None:
+        payload = json.loads(body or b"{}")
+        time.sleep(self.latency.sample())
+        reply = _text(self.reply_words)
+        sid = uuid.uuid4().hex
+        if not payload.get("stream"):
+            time.sleep(sum(self.token_latency.sample() for _ in range(self.reply_words)))
+            data = {
+                "code": 0,
+                "message": "Success",
+                "sid": sid,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}}],
+            }
+            handler._send(200, json.dumps(data).encode())
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        for word in reply.split(" "):
+            chunk = {"code": 0, "sid": sid, "choices": [{"index": 0, "delta": {"content": word + " "}}]}
+            _chunk(handler, f"data: {json.dumps(chunk)}\n\n".encode())
+            time.sleep(self.token_latency.sample())
+        _chunk(handler, b"data: [DONE]\n\n")
+        _chunk(handler, b"")
+
+
+def _chunk(handler: _Handler, data: bytes) -> None:
+    handler.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    handler.wfile.flush()
+
+
+@dataclass
+class FakeTencent:
+    """Tencent Cloud API 3.0 endpoint answering ``SentenceRecognition`` and ``TextToVoice``."""
+
+    asr_latency: Latency = Latency("lognormal", 300, 0.3)
+    tts_latency: Latency = Latency("lognormal", 250, 0.3)
+    transcript_words: int = 12
+    audio_bytes_per_char: int = 3200  # ~0.1 s of 16 kHz 16-bit audio per character
+
+    def __call__(self, handler: _Handler, body: bytes) -> None:
+        action = handler.headers.get("X-TC-Action", "")
+        request_id = str(uuid.uuid4())
+        if action == "SentenceRecognition":
+            time.sleep(self.asr_latency.sample())
+            response = {"Result": _text(self.transcript_words), "AudioDuration": 3000, "RequestId": request_id}
+        elif action == "TextToVoice":
+            text = json.loads(body or b"{}").get("Text", "")
+            time.sleep(self.tts_latency.sample())
+            audio = _NOISE[: max(1, len(text)) * self.audio_bytes_per_char]
+            response = {"Audio": base64.b64encode(audio).decode(), "SessionId": "", "RequestId": request_id}
+        else:
+            response = {
+                "Error": {"Code": "InvalidAction", "Message": f"unsupported action {action}"},
+                "RequestId": request_id,
+            }
+        handler._send(200, json.dumps({"Response": response}).encode())
+
+
+@dataclass
+class FakeWhisper:
+    """``POST /transcribe`` of the local Whisper service."""
+
+    latency: Latency = Latency("lognormal", 350, 0.3)
+    transcript_words: int = 12
+
+    def __call__(self, handler: _Handler, body: bytes) -> None:
+        time.sleep(self.latency.sample())
+        data = {"text": _text(self.transcript_words), "language": "en", "duration": len(body) / 32000}
+        handler._send(200, json.dumps(data).encode())
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: object, client_address: object) -> None:
+        # Clients dropping idle keep-alive connections is routine, not worth a traceback.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve(route: Callable[[_Handler, bytes], None], path: str = "*", host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start ``route`` on a daemon thread; ``server.server_port`` holds the bound port."""
+    handler = type("Handler", (_Handler,), {"routes": {path: route}})
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, name=f"fake-{type(route).__name__}", daemon=True).start()
+    return server
+
+
+def start_all(
+    spark: Optional[FakeSpark] = None,
+    tencent: Optional[FakeTencent] = None,
+    whisper: Optional[FakeWhisper] = None,
+) -> Dict[str, str]:
+    """Start every fake on an ephemeral port and return their base URLs."""
+    servers = {
+        "spark": serve(spark or FakeSpark(), "/v2/chat/completions"),
+        "tencent": serve(tencent or FakeTencent()),
+        "whisper": serve(whisper or FakeWhisper(), "/transcribe"),
+    }
+    return {name: f"http://127.0.0.1:{server.server_port}" for name, server in servers.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spark-latency", type=Latency.parse, default="lognormal:400:0.4")
+    parser.add_argument("--asr-latency", type=Latency.parse, default="lognormal:300:0.3")
+    parser.add_argument("--tts-latency", type=Latency.parse, default="lognormal:250:0.3")
+    parser.add_argument("--whisper-latency", type=Latency.parse, default="lognormal:350:0.3")
+    args = parser.parse_args()
+    urls = start_all(
+        FakeSpark(latency=args.spark_latency),
+        FakeTencent(asr_latency=args.asr_latency, tts_latency=args.tts_latency),
+        FakeWhisper(latency=args.whisper_latency),
+    )
+    print(json.dumps(urls), flush=True)
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
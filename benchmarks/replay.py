@@ -0,0 +1,308 @@
+"""Re-drive recorded production traffic against the pipeline.
+
+Record on the daemon with ``AILA_RECORD_FILE=/var/log/aila/traffic.jsonl`` (or
+``--record-file``), then::
+
+    python -m benchmarks.replay traffic.jsonl --speed 4
+    python -m benchmarks.replay traffic.jsonl --backends real --llm-backend ollama --tts-workers 6
+
+Requests start at their recorded offsets divided by ``--speed`` (``0`` sends them as
+fast as ``--max-in-flight`` allows), whether or not earlier ones have finished,
+like real users. Stub backends sleep for each request's recorded stage latency and
+return a reply of the recorded length and sentence count. Real backends are built
+from the orchestrator's own options, and any option not listed here is forwarded to
+it. Prompts and audio are synthetic filler of the recorded size, because the
+recording holds no content.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import re
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.run import ROOT, compare, git_commit, stage_timings, summarize, write_wav
+
+# Recorded entry point -> replayed request type.
+KIND_MODES = {
+    "process_text": "text",
+    "stream_text": "text_stream",
+    "process_audio": "audio",
+    "audio_upload": "audio",
+    "stream_audio": "audio_stream",
+    "ws_audio": "audio_stream",
+    "stream_speech": "speech",
+    "ws_text": "speech",
+    "speak": "speak",
+}
+
+_shape: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("replay_shape", default={})
+
+
+def _stage_seconds(name: str, parts: int = 1) -> float:
+    return _shape.get().get("stages", {}).get(name, 0.0) / 1000 / max(1, parts)
+
+
+def filler(chars: int, sentences: int = 1) -> str:
+    """About ``chars`` characters of text split into ``sentences`` sentences."""
+    sentences = max(1, sentences)
+    words = max(1, chars // sentences // 5)
+    return " ".join(" ".join(["word"] * words) + "." for _ in range(sentences))
+
+
+def load_recording(path: Path, limit: int = 0) -> List[Dict[str, Any]]:
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            record = json.loads(line)
+            if record.get("kind") in KIND_MODES:
+                records.append(record)
+    records.sort(key=lambda record: record["t"])
+    return records[:limit] if limit else records
+
+
+def build_stub_orchestrator(args: argparse.Namespace, workdir: Path) -> Any:
+    from aila.interfaces.asr import SpeechRecognitionClient
+    from aila.interfaces.speech import AudioFileSpool, TextToSpeechClient
+    from aila.runtime.orchestrator import Orchestrator, build_pipeline
+
+    class StubASR(SpeechRecognitionClient):
+        def transcribe(self, audio_path: str) -> str:
+            time.sleep(_stage_seconds("asr"))
+            return filler(_shape.get().get("prompt_chars", 40))
+
+    class StubTTS(TextToSpeechClient):
+        spool = AudioFileSpool(directory=workdir / "tts")
+
+        def synthesize(self, text: str) -> bytes:
+            time.sleep(_stage_seconds("tts", _shape.get().get("segments", 1)))
+            return bytes(len(text) * args.tts_bytes_per_char)
+
+        def speak(self, text: str) -> str:
+            return str(self.spool.write(self.synthesize(text)))
+
+    class StubLLM:
+        model = "replay-stub"
+
+        @staticmethod
+        def _reply() -> Tuple[str, float, float]:
+            shape = _shape.get()
+            reply = filler(shape.get("reply_chars", 120), shape.get("segments", 1))
+            first = _stage_seconds("llm_first_token")
+            return reply, first, max(0.0, _stage_seconds("llm") - first)
+
+        def complete(self, system_prompt: str, prompt: str, history: Any = None) -> str:
+            reply, _, _ = self._reply()
+            time.sleep(_stage_seconds("llm"))
+            return reply
+
+        def stream(self, system_prompt: str, prompt: str, history: Any = None) -> Any:
+            reply, first, rest = self._reply()
+            deltas = re.findall(r"\S+\s*", reply)
+            time.sleep(first)
+            for delta in deltas:
+                yield delta
+                time.sleep(rest / len(deltas))
+
+        async def acomplete(self, system_prompt: str, prompt: str, history: Any = None) -> str:
+            reply, _, _ = self._reply()
+            await asyncio.sleep(_stage_seconds("llm"))
+            return reply
+
+        async def astream(self, system_prompt: str, prompt: str, history: Any = None) -> Any:
+            reply, first, rest = self._reply()
+            deltas = re.findall(r"\S+\s*", reply)
+            await asyncio.sleep(first)
+            for delta in deltas:
+                yield delta
+                await asyncio.sleep(rest / len(deltas))
+
+    mind = build_pipeline(tts_client=StubTTS(), asr_client=StubASR(), tts_workers=args.tts_workers or 3, llm=StubLLM())
+    return Orchestrator(mind=mind)
+
+
+def build_real_orchestrator(forwarded: List[str]) -> Any:
+    from aila.runtime.orchestrator import build_arg_parser, build_orchestrator
+
+    return build_orchestrator(build_arg_parser().parse_args(forwarded))
+
+
+class AudioInputs:
+    """Synthetic WAV files matching recorded utterance durations, shared per 100 ms bucket."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._files: Dict[float, str] = {}
+
+    def for_record(self, record: Dict[str, Any]) -> str:
+        seconds = record.get("audio_s") or record.get("audio_bytes", 96000) / 32000
+        bucket = max(0.1, round(seconds, 1))
+        if bucket not in self._files:
+            path = self.directory / f"utterance-{bucket:.1f}s.wav"
+            write_wav(path, bucket)
+            self._files[bucket] = str(path)
+        return self._files[bucket]
+
+
+async def _call(orchestrator: Any, record: Dict[str, Any], audio: Optional[str]) -> None:
+    from aila.telemetry import trace
+
+    mode = KIND_MODES[record["kind"]]
+    context = {"session_id": record["session"]} if record.get("session") else None
+    prompt = filler(record.get("prompt_chars", 40))
+    if mode == "text":
+        await orchestrator.aprocess_text(prompt, context=context)
+    elif mode == "text_stream":
+        async for _ in orchestrator.astream_text(prompt, context=context):
+            pass
+    elif mode == "audio":
+        await orchestrator.aprocess_audio(audio, context=context, as_bytes=True)
+    elif mode == "audio_stream":
+        async for _ in orchestrator.astream_audio(audio, context=context, as_bytes=True):
+            pass
+    elif mode == "speech":
+        async for _ in orchestrator.astream_speech(prompt, context=context, as_bytes=True):
+            pass
+    else:
+        with trace("speak"):
+            reply = await orchestrator.aprocess_text(prompt, context=context)
+            await orchestrator.amind.speech.asynthesize(reply)
+
+
+async def replay(orchestrator: Any, records: List[Dict[str, Any]], audio: AudioInputs, speed: float, max_in_flight: int) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+    latencies: List[float] = []
+    lags: List[float] = []
+    errors: List[str] = []
+    start = loop.time()
+    origin = records[0]["t"]
+
+    async def one(record: Dict[str, Any]) -> None:
+        due = start + ((record["t"] - origin) / speed if speed else 0.0)
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        _shape.set(record)  # each task runs in its own copy of the context
+        path = audio.for_record(record) if "audio" in KIND_MODES[record["kind"]] else None
+        if semaphore is not None:
+            await semaphore.acquire()
+        lags.append((loop.time() - due) * 1000)
+        started = time.perf_counter()
+        try:
+            await _call(orchestrator, record, path)
+            latencies.append((time.perf_counter() - started) * 1000)
+        except Exception as exc:  # recorded, the replay continues
+            errors.append(f"{type(exc).__name__}: {exc}")
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    await asyncio.gather(*(one(record) for record in records))
+    return {"latencies": latencies, "lags": lags, "errors": errors, "elapsed": loop.time() - start}
+
+
+def recorded_latency(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    stages: Dict[str, List[float]] = {"end_to_end": [record["ms"] for record in records if not record.get("error")]}
+    for record in records:
+        for name, ms in record.get("stages", {}).items():
+            # TTS is recorded per request; the traces of the replay time each sentence.
+            stages.setdefault(name, []).append(ms / record["segments"] if name == "tts" and record.get("segments") else ms)
+    return {name: summarize(values) for name, values in stages.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="JSONL written with AILA_RECORD_FILE / --record-file")
+    parser.add_argument("--speed", type=float, default=1.0, help="Arrival acceleration factor; 0 replays back to back")
+    parser.add_argument("--backends", choices=("stub", "real"), default="stub")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Cap on concurrent requests (0: unbounded, open loop)")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests")
+    parser.add_argument("--tts-workers", type=int, help="Sentence synthesis workers (default 3, or the orchestrator's)")
+    parser.add_argument("--tts-bytes-per-char", type=int, default=3200, help="Stub TTS audio size")
+    parser.add_argument("--output", help="Result JSON (default benchmarks/results/<commit>-replay.json)")
+    parser.add_argument("--compare", help="Earlier replay result to diff against")
+    parser.add_argument("--fail-over", type=float, default=0.0, help="Exit 1 if a metric regresses by more than this percent")
+    args, forwarded = parser.parse_known_args()
+    if forwarded and args.backends != "real":
+        parser.error(f"unrecognized arguments: {' '.join(forwarded)} (orchestrator options need --backends real)")
+
+    sys.path.insert(0, str(ROOT))
+    records = load_recording(Path(args.recording), args.limit)
+    if not records:
+        parser.error(f"{args.recording} holds no replayable requests")
+
+    from aila.telemetry import configure_recording, configure_tracing
+
+    workdir = Path(tempfile.mkdtemp(prefix="aila-replay-"))
+    trace_file = workdir / "traces.jsonl"
+    configure_recording(path=None)  # never record the replay itself
+    configure_tracing(path=str(trace_file), sample_rate=1.0, slow_ms=0.0, max_bytes=0)
+    if args.backends == "stub":
+        orchestrator = build_stub_orchestrator(args, workdir)
+    else:
+        workers = ["--tts-workers", str(args.tts_workers)] if args.tts_workers else []
+        orchestrator = build_real_orchestrator(forwarded + workers)
+
+    cpu_before = time.process_time()
+    outcome = asyncio.run(replay(orchestrator, records, AudioInputs(workdir), args.speed, args.max_in_flight))
+    cpu = time.process_time() - cpu_before
+
+    window = records[-1]["t"] - records[0]["t"]
+    offered = len(records) / (window / args.speed) if window and args.speed else None
+    elapsed = outcome["elapsed"]
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "recording": str(Path(args.recording).resolve()),
+        "config": {key: value for key, value in vars(args).items() if key not in {"recording", "output", "compare", "fail_over"}},
+        "forwarded": forwarded,
+        "requests": len(records),
+        "kinds": {kind: sum(record["kind"] == kind for record in records) for kind in sorted({r["kind"] for r in records})},
+        "errors": len(outcome["errors"]),
+        "error_samples": sorted(set(outcome["errors"]))[:5],
+        "duration_s": round(elapsed, 3),
+        "offered_rps": round(offered, 3) if offered else None,
+        "throughput_rps": round(len(outcome["latencies"]) / elapsed, 3) if elapsed else 0.0,
+        "cpu_seconds": round(cpu, 3),
+        "start_lag_ms": summarize(outcome["lags"]),
+        "latency_ms": {
+            "end_to_end": summarize(outcome["latencies"]),
+            **{name: summarize(values) for name, values in sorted(stage_timings(trace_file).items())},
+        },
+        "recorded_ms": recorded_latency(records),
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+        ),
+    }
+
+    output = Path(args.output) if args.output else ROOT / "benchmarks" / "results" / f"{result['commit'] or 'local'}-replay.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+
+    print(
+        f"replayed {len(outcome['latencies'])}/{len(records)} ok at {f'{args.speed:g}x' if args.speed else 'full'} speed in {elapsed:.1f} s "
+        f"({result['throughput_rps']} req/s, offered {result['offered_rps']}), start lag p95 "
+        f"{result['start_lag_ms']['p95']} ms, peak RSS {result['peak_rss_mb']} MB -> {output}"
+    )
+    print(f"  {'stage':<24}{'recorded p50/p95':>20}{'replayed p50/p95':>20}")
+    for name, stats in result["latency_ms"].items():
+        before = result["recorded_ms"].get(name)
+        recorded = f"{before['p50']}/{before['p95']}" if before else "-"
+        print(f"  {name:<24}{recorded:>20}{stats['p50']:>11}/{stats['p95']:<8}")
+    if args.compare:
+        regressions = compare(result, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.fail_over or float("inf"))
+        if args.fail_over and regressions:
+            print(f"Regressed beyond {args.fail_over}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Drive the Aila pipeline against the local fakes and report per-stage latency percentiles.
+
+Example::
+
+    python -m benchmarks.run --mode stream --requests 200 --concurrency 8 \\
+        --spark-latency lognormal:400:0.4 --compare benchmarks/results/main.json
+
+Stage timings come from the request traces (``aila.telemetry``), so they match what
+the daemon records in production. Results are written as JSON for comparison
+across commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Empty
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+MODES = ("text", "audio", "stream", "speech")
+STAGES = ("asr", "llm", "llm_first_token", "tts")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; ``q`` in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # q * n / 100 rather than q / 100 * n: the latter turns e.g. 7% of 100 into 7.000000000000001.
+    rank = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered) / 100) - 1))
+    return ordered[rank]
+
+
+def summarize(values_ms: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values_ms),
+        "p50": round(percentile(values_ms, 50), 2),
+        "p95": round(percentile(values_ms, 95), 2),
+        "p99": round(percentile(values_ms, 99), 2),
+        "mean": round(sum(values_ms) / len(values_ms), 2) if values_ms else 0.0,
+        "max": round(max(values_ms), 2) if values_ms else 0.0,
+    }
+
+
+def _run_fakes(settings: Dict[str, Any], urls: "multiprocessing.Queue[Dict[str, str]]") -> None:
+    import threading
+
+    from benchmarks.fakes import FakeSpark, FakeTencent, FakeWhisper, start_all
+
+    urls.put(
+        start_all(
+            FakeSpark(
+                latency=settings["spark_latency"],
+                token_latency=settings["token_latency"],
+                reply_words=settings["reply_words"],
+            ),
+            FakeTencent(
+                asr_latency=settings["asr_latency"],
+                tts_latency=settings["tts_latency"],
+                audio_bytes_per_char=settings["tts_bytes_per_char"],
+            ),
+            FakeWhisper(latency=settings["whisper_latency"]),
+        )
+    )
+    threading.Event().wait()
+
+
+def start_fakes(args: argparse.Namespace) -> tuple:
+    """Run the fakes in their own process so they do not count towards CPU time or RSS."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_fakes, args=(vars(args), queue), daemon=True)
+    process.start()
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            return process, queue.get(timeout=0.5)
+        except Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"fake backends exited with code {process.exitcode} before starting") from None
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("fake backends did not start within 30 s") from None
+
+
+def write_wav(path: Path, seconds: float, rate: int = 16000) -> None:
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(rate)
+        handle.writeframes(os.urandom(int(seconds * rate) * 2))
+
+
+def build_orchestrator(args: argparse.Namespace, urls: Dict[str, str], workdir: Path) -> Any:
+    from aila.interfaces.asr import TencentASRClient, WhisperServiceClient
+    from aila.interfaces.llm import LLMClient
+    from aila.interfaces.speech import AudioFileSpool, TencentTTSClient
+    from aila.runtime.orchestrator import Orchestrator, build_pipeline
+
+    if args.asr == "whisper":
+        asr: Any = WhisperServiceClient(base_url=urls["whisper"])
+    else:
+        asr = TencentASRClient(secret_id="bench", secret_key="bench", endpoint=urls["tencent"])
+    tts = TencentTTSClient(
+        secret_id="bench", secret_key="bench", endpoint=urls["tencent"], spool=AudioFileSpool(directory=workdir / "tts")
+    )
+    llm = LLMClient(app_id="bench", api_key="bench", api_secret="bench", api_url=f"{urls['spark']}/v2/chat/completions")
+    mind = build_pipeline(tts_client=tts, asr_client=asr, tts_workers=args.tts_workers, llm=llm)
+    return Orchestrator(mind=mind)
+
+
+def request_fn(orchestrator: Any, mode: str, audio: str, prompt: str) -> Callable[[], Any]:
+    if mode == "text":
+        return lambda: orchestrator.process_text(prompt)
+    if mode == "audio":
+        return lambda: orchestrator.process_audio(audio)
+    if mode == "stream":
+        return lambda: list(orchestrator.stream_audio(audio, as_bytes=True))
+    return lambda: asyncio.run(_async_request(orchestrator, mode, audio, prompt))
+
+
+async def _async_request(orchestrator: Any, mode: str, audio: str, prompt: str) -> Any:
+    if mode == "text":
+        return await orchestrator.aprocess_text(prompt)
+    if mode == "audio":
+        return await orchestrator.aprocess_audio(audio, as_bytes=True)
+    if mode == "stream":
+        return [segment async for segment in orchestrator.astream_audio(audio, as_bytes=True)]
+    return [segment async for segment in orchestrator.astream_speech(prompt, as_bytes=True)]
+
+
+def drive_threads(call: Callable[[], Any], requests: int, concurrency: int) -> tuple:
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    def one(_: int) -> None:
+        started = time.perf_counter()
+        try:
+            call()
+        except Exception as exc:  # recorded, the run continues
+            errors.append(f"{type(exc).__name__}: {exc}")
+            return
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    return latencies, errors
+
+
+async def drive_async(orchestrator: Any, mode: str, audio: str, prompt: str, requests: int, concurrency: int) -> tuple:
+    latencies: List[float] = []
+    errors: List[str] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await _async_request(orchestrator, mode, audio, prompt)
+            except Exception as exc:  # recorded, the run continues
+                errors.append(f"{type(exc).__name__}: {exc}")
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, errors
+
+
+def stage_timings(trace_file: Path) -> Dict[str, List[float]]:
+    """Per-stage and per-backend span durations (ms) from the trace JSONL."""
+    timings: Dict[str, List[float]] = defaultdict(list)
+    if not trace_file.exists():
+        return timings
+    for line in trace_file.read_text(encoding="utf-8").splitlines():
+        for span in json.loads(line)["spans"]:
+            if span["parent"] is None and span["name"] in STAGES:
+                timings[span["name"]].append(span["duration_ms"])
+            elif span["name"] not in STAGES and "attempt" in span:
+                timings[f"backend:{span['name']}"].append(span["duration_ms"])
+    return timings
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a delta table; return the metrics that regressed by more than ``threshold`` percent."""
+    regressions = []
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'delta':>10}")
+    rows = [("throughput_rps", baseline.get("throughput_rps", 0), result["throughput_rps"], True)]
+    for name, current in result["latency_ms"].items():
+        before = baseline.get("latency_ms", {}).get(name)
+        if before:
+            rows.extend((f"{name}.{q}", before[q], current[q], False) for q in ("p50", "p95", "p99"))
+    rows.append(("peak_rss_mb", baseline.get("peak_rss_mb", 0), result["peak_rss_mb"], False))
+    for metric, before, after, higher_is_better in rows:
+        delta = (after - before) / before * 100 if before else 0.0
+        worse = -delta if higher_is_better else delta
+        flag = " !" if worse > threshold else ""
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:<28}{before:>12.2f}{after:>12.2f}{delta:>+9.1f}%{flag}")
+    return regressions
+
+
+def main() -> None:
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.fakes import Latency
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=MODES, default="audio", help="text, audio, stream (audio -> sentence audio) or speech (text -> sentence audio)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Drive the asyncio pipeline instead of threads")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="Requests excluded from the results")
+    parser.add_argument("--asr", choices=("tencent", "whisper"), default="tencent")
+    parser.add_argument("--tts-workers", type=int, default=3)
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--prompt", default="Tell me something about the weather today.")
+    parser.add_argument("--spark-latency", type=Latency.parse, default="lognormal:400:0.4", help="Time to first token")
+    parser.add_argument("--token-latency", type=Latency.parse, default="fixed:15", help="Delay between streamed words")
+    parser.add_argument("--reply-words", type=int, default=40)
+    parser.add_argument("--asr-latency", type=Latency.parse, default="lognormal:300:0.3")
+    parser.add_argument("--tts-latency", type=Latency.parse, default="lognormal:250:0.3")
+    parser.add_argument("--tts-bytes-per-char", type=int, default=3200)
+    parser.add_argument("--whisper-latency", type=Latency.parse, default="lognormal:350:0.3")
+    parser.add_argument("--output", help="Result JSON (default benchmarks/results/<commit>-<mode>.json)")
+    parser.add_argument("--compare", help="Baseline result JSON to diff against")
+    parser.add_argument("--fail-over", type=float, default=0.0, help="Exit 1 if a metric regresses by more than this percent")
+    args = parser.parse_args()
+    if args.mode == "speech" and not args.use_async:
+        parser.error("--mode speech exercises the asyncio pipeline; add --async")
+
+    fakes, urls = start_fakes(args)
+    workdir = Path(tempfile.mkdtemp(prefix="aila-bench-"))
+    audio = workdir / "utterance.wav"
+    write_wav(audio, args.audio_seconds)
+    from aila.telemetry import configure_tracing
+
+    orchestrator = build_orchestrator(args, urls, workdir)
+    call = request_fn(orchestrator, args.mode, str(audio), args.prompt)
+    for _ in range(args.warmup):
+        call()
+
+    trace_file = workdir / "traces.jsonl"
+    configure_tracing(path=str(trace_file), sample_rate=1.0, max_bytes=0)
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    if args.use_async:
+        latencies, errors = asyncio.run(
+            drive_async(orchestrator, args.mode, str(audio), args.prompt, args.requests, args.concurrency)
+        )
+    else:
+        latencies, errors = drive_threads(call, args.requests, args.concurrency)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    fakes.terminate()
+
+    timings = stage_timings(trace_file)
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            key: str(value) if isinstance(value, Latency) else value
+            for key, value in vars(args).items()
+            if key not in {"output", "compare", "fail_over"}
+        },
+        "requests": args.requests,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "cpu_seconds": round(cpu, 3),
+        "latency_ms": {"end_to_end": summarize(latencies), **{name: summarize(v) for name, v in sorted(timings.items())}},
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+        ),
+    }
+
+    output = Path(args.output) if args.output else ROOT / "benchmarks" / "results" / f"{result['commit'] or 'local'}-{args.mode}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+
+    e2e = result["latency_ms"]["end_to_end"]
+    print(
+        f"{args.mode}: {len(latencies)}/{args.requests} ok, {result['throughput_rps']} req/s, "
+        f"p50 {e2e['p50']} ms, p95 {e2e['p95']} ms, p99 {e2e['p99']} ms, peak RSS {result['peak_rss_mb']} MB -> {output}"
+    )
+    for name, stats in result["latency_ms"].items():
+        if name != "end_to_end":
+            print(f"  {name:<24} p50 {stats['p50']:>9} p95 {stats['p95']:>9} p99 {stats['p99']:>9}  (n={stats['count']})")
+    if args.compare:
+        regressions = compare(result, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.fail_over or float("inf"))
+        if args.fail_over and regressions:
+            print(f"Regressed beyond {args.fail_over}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env bash
+# Guard CLI cold-start: importing the orchestrator must stay under a time budget and
+# must not pull in the heavy cloud SDKs, which are only loaded on first use.
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+BUDGET_MS="${AILA_IMPORT_BUDGET_MS:-150}"
+RUNS="${AILA_IMPORT_BUDGET_RUNS:-5}"
+PYTHON="${PYTHON:-python3}"
+
+cd "${ROOT_DIR}"
+"${PYTHON}" - "${BUDGET_MS}" "${RUNS}" "${PYTHON}" <<'PY'
+import subprocess
+import sys
+
+budget_ms, runs, python = float(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+module = "aila.runtime.orchestrator"
+forbidden = ("tencentcloud", "requests", "httpx", "fastapi", "uvicorn", "asyncio")
+
+probe = (
+    f"import sys, {module}; "
+    f"print(','.join(m for m in {forbidden!r} if m in sys.modules))"
+)
+samples = []
+for _ in range(runs):
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", probe], capture_output=True, text=True, check=True
+    )
+    leaked = proc.stdout.strip()
+    if leaked:
+        sys.exit(f"FAIL: importing {module} eagerly loaded: {leaked}")
+    # The outermost record (printed last) holds the cumulative time of the import.
+    cumulative = [
+        int(fields[1]) / 1000.0
+        for fields in ([part.strip() for part in line.split("|")] for line in proc.stderr.splitlines())
+        if len(fields) == 3 and fields[2] == module
+    ]
+    if cumulative:
+        samples.append(cumulative[-1])
+
+if not samples:
+    sys.exit(f"FAIL: no importtime record for {module}")
+best = min(samples)
+print(f"{module}: best {best:.1f} ms over {len(samples)} runs (budget {budget_ms:.0f} ms)")
+if best > budget_ms:
+    sys.exit("FAIL: import-time budget exceeded")
+PY
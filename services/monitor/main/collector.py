@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import argparse
+import threading
 import time
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 import requests
 import yaml
@@ -20,15 +22,175 @@ def load_config(path: Path) -> Dict[str, object]:
     return yaml.safe_load(path.read_text(encoding="utf-8"))
 
 
-def scrape(endpoints: Dict[str, str]) -> Dict[str, float]:
-    metrics: Dict[str, float] = {}
-    for name, url in endpoints.items():
-        try:
-            response = requests.get(url, timeout=3)
-            metrics[f"aila_service_up{{service=\"{name}\"}}"] = 1.0 if response.ok else 0.0
-        except requests.RequestException:
-            metrics[f"aila_service_up{{service=\"{name}\"}}"] = 0.0
-    return metrics
+def probe(name: str, url: str, timeout: float = 3.0) -> Dict[str, float]:
+    started = time.perf_counter()
+    try:
+        up = 1.0 if requests.get(url, timeout=timeout).ok else 0.0
+    except requests.RequestException:
+        up = 0.0
+    return {
+        f"aila_service_up{{service=\"{name}\"}}": up,
+        f"aila_probe_duration_seconds{{service=\"{name}\"}}": round(time.perf_counter() - started, 4),
+    }
+
+
+def scrape(
+    endpoints: Dict[str, str], timeout: float = 3.0, pool: Optional[ThreadPoolExecutor] = None
+) -> Dict[str, float]:
+    """Probe every endpoint concurrently; the whole scrape takes about one ``timeout`` at worst."""
+    if not endpoints:
+        return {}
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=len(endpoints))
+    try:
+        futures = [pool.submit(probe, name, url, timeout) for name, url in endpoints.items()]
+        metrics: Dict[str, float] = {}
+        for future in futures:
+            metrics.update(future.result())
+        return metrics
+    finally:
+        if own_pool:
+            pool.shutdown(wait=False)
+
+
+def fetch_exposition(url: str, timeout: float = 3.0) -> Optional[str]:
+    try:
+        response = requests.get(url, timeout=timeout)
+    except requests.RequestException:
+        return None
+    return response.text if response.ok else None
+
+
+_FAMILY_SUFFIXES = ("_bucket", "_sum", "_count", "_total", "_created")
+
+
+def _add_label(sample: str, service: str) -> str:
+    label = f'service="{service}"'
+    brace = sample.find("{")
+    space = sample.find(" ")
+    if brace != -1 and (space == -1 or brace < space):
+        inner = "" if sample[brace + 1] == "}" else ","
+        return f"{sample[:brace + 1]}{label}{inner}{sample[brace + 1:]}"
+    return f"{sample[:space]}{{{label}}}{sample[space:]}"
+
+
+def merge_exposition(texts: Dict[str, str]) -> str:
+    """Merge Prometheus text from several services, adding a ``service`` label to every sample.
+
+    Samples are regrouped per metric family so each ``# HELP``/``# TYPE`` header
+    appears once, as the exposition format requires.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for service, text in texts.items():
+        family = ""
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                parts = line.split(None, 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    if line not in headers.setdefault(family, []):
+                        headers[family].append(line)
+                continue
+            name = line.split("{", 1)[0].split(" ", 1)[0]
+            if name != family and name not in {family + suffix for suffix in _FAMILY_SUFFIXES}:
+                family = name
+            samples.setdefault(family, []).append(_add_label(line, service))
+    lines: List[str] = []
+    for family in dict.fromkeys([*headers, *samples]):
+        lines.extend(headers.get(family, ()))
+        lines.extend(samples.get(family, ()))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def scrape_exporters(
+    exporters: Dict[str, str], timeout: float = 3.0, pool: Optional[ThreadPoolExecutor] = None
+) -> Tuple[Dict[str, float], str]:
+    """Fetch every ``/metrics`` endpoint concurrently; returns per-service status and merged text."""
+    if not exporters:
+        return {}, ""
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=len(exporters))
+    try:
+        futures = {name: pool.submit(fetch_exposition, url, timeout) for name, url in exporters.items()}
+        texts = {name: future.result() for name, future in futures.items()}
+    finally:
+        if own_pool:
+            pool.shutdown(wait=False)
+    status = {
+        f"aila_monitor_export_up{{service=\"{name}\"}}": 0.0 if text is None else 1.0 for name, text in texts.items()
+    }
+    return status, merge_exposition({name: text for name, text in texts.items() if text})
+
+
+class Scraper:
+    """Scrape all endpoints every ``interval`` seconds and keep the latest snapshot in memory.
+
+    ``exporters`` are services publishing their own Prometheus metrics (such as the
+    orchestrator's ``/metrics``); they are fetched in the same round and re-exported
+    with a ``service`` label.
+    """
+
+    def __init__(
+        self,
+        endpoints: Dict[str, str],
+        interval: float = 15.0,
+        timeout: float = 3.0,
+        exporters: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.endpoints = endpoints
+        self.exporters = exporters or {}
+        self.interval = interval
+        self.timeout = min(timeout, interval)
+        self._pool = ThreadPoolExecutor(
+            # One extra worker for the exporter round, which waits on its own fetches.
+            max_workers=len(endpoints) + len(self.exporters) + 1,
+            thread_name_prefix="probe",
+        )
+        self._lock = threading.Lock()
+        self._snapshot: Tuple[Dict[str, float], str, float, float] = ({}, "", 0.0, 0.0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> None:
+        started = time.perf_counter()
+        exported = self._pool.submit(scrape_exporters, self.exporters, self.timeout, self._pool)
+        metrics = scrape(self.endpoints, self.timeout, self._pool)
+        status, text = exported.result()
+        with self._lock:
+            self._snapshot = ({**metrics, **status}, text, time.time(), time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            metrics, _, scraped_at, duration = self._snapshot
+        return {
+            **metrics,
+            "aila_monitor_last_scrape_timestamp_seconds": round(scraped_at, 3),
+            "aila_monitor_scrape_duration_seconds": round(duration, 4),
+        }
+
+    def exported(self) -> str:
+        with self._lock:
+            return self._snapshot[1]
+
+    def _run(self) -> None:
+        delay = self.interval  # start() has just taken the first snapshot
+        while not self._stop.wait(delay):
+            started = time.monotonic()
+            self.refresh()
+            delay = max(0.0, self.interval - (time.monotonic() - started))
+
+    def start(self) -> None:
+        self.refresh()  # serve a complete snapshot from the first request on
+        self._thread = threading.Thread(target=self._run, name="scraper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._pool.shutdown(wait=False)
 
 
 def format_metrics(metrics: Dict[str, float]) -> str:
@@ -38,8 +200,20 @@ def format_metrics(metrics: Dict[str, float]) -> str:
 
 def serve(config_path: Path, once: bool = False) -> None:
     cfg = load_config(config_path)
-    endpoints = cfg.get("endpoints", {})
+    endpoints = cfg.get("endpoints") or {}
     port = int(cfg.get("metrics_port", 9091))
+    timeout = float(cfg.get("scrape_timeout", 3))
+    exporters = cfg.get("metrics_endpoints") or {}
+
+    if once:
+        metrics = scrape(endpoints, timeout)
+        status, exported = scrape_exporters(exporters, timeout)
+        print(format_metrics({**metrics, **status}) + exported)
+        return
+
+    scraper = Scraper(
+        endpoints, interval=float(cfg.get("scrape_interval", 15)), timeout=timeout, exporters=exporters
+    )
 
     class Handler(BaseHTTPRequestHandler):
         def do_GET(self):  # type: ignore[override]
@@ -47,26 +221,23 @@ def serve(config_path: Path, once: bool = False) -> None:
                 self.send_response(404)
                 self.end_headers()
                 return
-            metrics = scrape(endpoints)
-            payload = format_metrics(metrics)
+            payload = (format_metrics(scraper.snapshot()) + scraper.exported()).encode("utf-8")
             self.send_response(200)
             self.send_header("Content-Type", "text/plain; version=0.0.4")
             self.send_header("Content-Length", str(len(payload)))
             self.end_headers()
-            self.wfile.write(payload.encode("utf-8"))
-
-    if once:
-        metrics = scrape(endpoints)
-        print(format_metrics(metrics))
-        return
+            self.wfile.write(payload)
 
-    server = HTTPServer(("0.0.0.0", port), Handler)
+    scraper.start()
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
     print(f"Serving metrics on :{port}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
+        scraper.stop()
         server.server_close()
 
 
@@ -0,0 +1,419 @@
+"""Whisper inference engine (CTranslate2 / faster-whisper) with dynamic request batching."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+logger = logging.getLogger("aila.whisper.engine")
+
+# Whisper's feature extractor is fixed at 16 kHz mono.
+SAMPLE_RATE = 16000
+
+# Config precision names mapped to CTranslate2 compute types.
+COMPUTE_TYPES = {
+    "fp32": "float32",
+    "fp16": "float16",
+    "bf16": "bfloat16",
+    "int8": "int8",
+    "int8_fp16": "int8_float16",
+    "int8_fp32": "int8_float32",
+}
+
+
+class QueueFull(RuntimeError):
+    """Raised by :meth:`DynamicBatcher.submit` when the request queue is at capacity."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("transcription queue is full")
+        self.retry_after = retry_after
+
+
+def load_audio(source: Any, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode a path or binary file object (any container ffmpeg reads) to mono float32."""
+    from faster_whisper import decode_audio
+
+    return decode_audio(source, sampling_rate=sample_rate)
+
+
+def pcm16_to_float32(data: bytes, sample_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Convert little-endian 16-bit mono PCM to float32 in [-1, 1] at ``target_rate``."""
+    audio = np.frombuffer(data[: len(data) - len(data) % 2], dtype="<i2").astype(np.float32) / 32768.0
+    return resample(audio, sample_rate, target_rate)
+
+
+def resample(audio: np.ndarray, sample_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    if sample_rate == target_rate or not len(audio):
+        return audio
+    # Linear resampling is adequate for speech going into an 80-bin mel frontend.
+    positions = np.arange(0, len(audio), sample_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+@dataclass
+class Transcription:
+    text: str
+    language: str
+    duration: float
+
+
+class WhisperEngine:
+    """Loads the Whisper model once and transcribes batches of 16 kHz mono float32 audio.
+
+    Clips of up to 30 s (one Whisper window) are encoded and decoded together in a
+    single batched ``generate`` call; longer clips fall back to faster-whisper's
+    sequential long-form transcription.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        model_dir: str,
+        *,
+        device: str = "cpu",
+        precision: str = "int8",
+        beam_size: int = 5,
+        temperature: float = 0.0,
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+    ) -> None:
+        from faster_whisper import WhisperModel
+
+        local_path = Path(model_dir) / model
+        model_ref = str(local_path) if local_path.is_dir() else model
+        compute_type = COMPUTE_TYPES.get(precision, precision)
+        started = time.perf_counter()
+        self._model = WhisperModel(
+            model_ref,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers,
+            download_root=model_dir,
+        )
+        self.beam_size = beam_size
+        self.temperature = temperature
+        self.sample_rate = self._model.feature_extractor.sampling_rate
+        self._window_samples = self._model.feature_extractor.n_samples
+        self._window_frames = self._model.feature_extractor.nb_max_frames
+        self._tokenizers: dict = {}
+        logger.info(
+            "Loaded Whisper model %s on %s (%s) in %.1fs",
+            model_ref,
+            device,
+            compute_type,
+            time.perf_counter() - started,
+        )
+
+    @classmethod
+    def from_config(cls, config: Any) -> "WhisperEngine":
+        return cls(**engine_options(config))
+
+    def submit_batch(
+        self, audios: Sequence[np.ndarray], languages: Sequence[Optional[str]]
+    ) -> "Future[List[Transcription]]":
+        """Run a batch in the calling thread; used when no worker processes are configured."""
+        future: "Future[List[Transcription]]" = Future()
+        try:
+            future.set_result(self.transcribe_batch(audios, languages))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> Transcription:
+        return self.transcribe_batch([audio], [language])[0]
+
+    def transcribe_batch(
+        self, audios: Sequence[np.ndarray], languages: Sequence[Optional[str]]
+    ) -> List[Transcription]:
+        results: List[Optional[Transcription]] = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= self._window_samples]
+        for index in range(len(audios)):
+            if index not in short:
+                results[index] = self._transcribe_long(audios[index], languages[index])
+        if short:
+            batch = self._transcribe_windows([audios[i] for i in short], [languages[i] for i in short])
+            for index, result in zip(short, batch):
+                results[index] = result
+        return [result for result in results if result is not None]
+
+    def _tokenizer(self, language: str) -> Any:
+        tokenizer = self._tokenizers.get(language)
+        if tokenizer is None:
+            from faster_whisper.tokenizer import Tokenizer
+
+            tokenizer = Tokenizer(
+                self._model.hf_tokenizer,
+                self._model.model.is_multilingual,
+                task="transcribe",
+                language=language,
+            )
+            self._tokenizers[language] = tokenizer
+        return tokenizer
+
+    def _transcribe_windows(
+        self, audios: Sequence[np.ndarray], languages: Sequence[Optional[str]]
+    ) -> List[Transcription]:
+        from faster_whisper.audio import pad_or_trim
+
+        features = np.stack(
+            [pad_or_trim(self._model.feature_extractor(audio), self._window_frames) for audio in audios]
+        )
+        encoder_output = self._model.encode(features)
+
+        resolved = list(languages)
+        if not self._model.model.is_multilingual:
+            resolved = ["en" if lang is None else lang for lang in resolved]
+        elif any(lang is None for lang in resolved):
+            detected = self._model.model.detect_language(encoder_output)
+            resolved = [lang or detected[i][0][0][2:-2] for i, lang in enumerate(resolved)]
+
+        prompts = []
+        for lang in resolved:
+            tokenizer = self._tokenizer(lang or "en")
+            prompts.append(list(tokenizer.sot_sequence) + [tokenizer.no_timestamps])
+
+        options: dict = {"beam_size": self.beam_size, "max_length": self._model.max_length}
+        if self.temperature > 0:
+            options.update(beam_size=1, sampling_topk=0, sampling_temperature=self.temperature)
+        outputs = self._model.model.generate(encoder_output, prompts, **options)
+
+        transcriptions = []
+        for audio, lang, output in zip(audios, resolved, outputs):
+            text = self._tokenizer(lang or "en").decode(output.sequences_ids[0]).strip()
+            transcriptions.append(Transcription(text=text, language=lang or "en", duration=len(audio) / self.sample_rate))
+        return transcriptions
+
+    def _transcribe_long(self, audio: np.ndarray, language: Optional[str]) -> Transcription:
+        segments, info = self._model.transcribe(
+            audio,
+            language=language,
+            beam_size=self.beam_size,
+            temperature=self.temperature,
+        )
+        text = "".join(segment.text for segment in segments).strip()
+        return Transcription(text=text, language=info.language, duration=info.duration)
+
+
+def engine_options(config: Any) -> Dict[str, Any]:
+    return {
+        "model": config.model,
+        "model_dir": config.model_dir,
+        "device": config.device,
+        "precision": config.precision,
+        "beam_size": config.beam_size,
+        "temperature": config.temperature,
+        "cpu_threads": config.cpu_threads,
+        "num_workers": config.num_workers,
+    }
+
+
+_worker_engine: Optional[WhisperEngine] = None
+
+
+def _init_worker(options: Dict[str, Any]) -> None:
+    global _worker_engine
+    _worker_engine = WhisperEngine(**options)
+
+
+def _worker_ready() -> int:
+    import os
+
+    return os.getpid()
+
+
+def _worker_transcribe(audios: Sequence[np.ndarray], languages: Sequence[Optional[str]]) -> List[Transcription]:
+    assert _worker_engine is not None, "worker started without a model"
+    return _worker_engine.transcribe_batch(audios, languages)
+
+
+class EnginePool:
+    """Worker processes each holding their own pre-loaded :class:`WhisperEngine`.
+
+    Inference runs outside the server process, so decoding batches never competes with
+    the event loop for the GIL. Workers use the ``spawn`` start method because
+    CTranslate2's thread pools do not survive ``fork``.
+    """
+
+    def __init__(self, options: Dict[str, Any], workers: int) -> None:
+        self.workers = max(1, workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(options,),
+        )
+        # Submitting one task per worker spawns every process now, so models load at
+        # startup rather than on the first requests.
+        started = time.perf_counter()
+        pids = [future.result() for future in [self._executor.submit(_worker_ready) for _ in range(self.workers)]]
+        logger.info(
+            "Started %d Whisper workers (pids %s) in %.1fs",
+            self.workers,
+            sorted(set(pids)),
+            time.perf_counter() - started,
+        )
+
+    @classmethod
+    def from_config(cls, config: Any) -> "EnginePool":
+        return cls(engine_options(config), config.workers)
+
+    def submit_batch(
+        self, audios: Sequence[np.ndarray], languages: Sequence[Optional[str]]
+    ) -> "Future[List[Transcription]]":
+        return self._executor.submit(_worker_transcribe, list(audios), list(languages))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class _Job:
+    audio: np.ndarray
+    language: Optional[str]
+    future: "Future[Transcription]"
+
+
+class DynamicBatcher:
+    """Collect concurrent requests into batches of up to ``max_batch_size``.
+
+    A batch is dispatched when it is full or ``max_wait_ms`` after its first request
+    arrived, whichever comes first, so a lone request only waits ``max_wait_ms``.
+    At most ``max_in_flight`` batches run at once (one per worker process), and
+    ``submit`` rejects work with :class:`QueueFull` once ``max_queue`` requests are
+    waiting or running.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        *,
+        max_batch_size: int = 4,
+        max_wait_ms: float = 20.0,
+        max_in_flight: int = 1,
+        max_queue: int = 0,
+    ) -> None:
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self.batch_seconds = 0.0  # EWMA of batch latency, used for Retry-After
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: np.ndarray, language: Optional[str] = None) -> "Future[Transcription]":
+        with self._lock:
+            if self.max_queue and self._pending >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(self.retry_after())
+            self._pending += 1
+        future: "Future[Transcription]" = Future()
+        future.add_done_callback(self._finished)
+        self._queue.put(_Job(audio=audio, language=language, future=future))
+        return future
+
+    def retry_after(self) -> float:
+        """Rough time for the current backlog to drain, in seconds."""
+        batches = self._pending / (self.max_batch_size * self.max_in_flight)
+        return max(1.0, (batches + 1) * (self.batch_seconds or 1.0))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "pending": self._pending,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "batch_seconds": round(self.batch_seconds, 4),
+            }
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+    def _finished(self, _: "Future[Transcription]") -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _collect(self, first: _Job) -> List[_Job]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)  # let the main loop see the shutdown marker
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Wait for a free worker before collecting, so requests keep accumulating
+            # into the next batch while every worker is busy.
+            self._slots.acquire()
+            batch = [job for job in self._collect(first) if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                self._slots.release()
+                continue
+            with self._lock:
+                self.in_flight += len(batch)
+            started = time.perf_counter()
+            try:
+                result = self.backend.submit_batch([job.audio for job in batch], [job.language for job in batch])
+            except Exception as exc:  # pragma: no cover - pool already shut down
+                result = Future()
+                result.set_exception(exc)
+            result.add_done_callback(lambda done, batch=batch, started=started: self._deliver(batch, done, started))
+
+    def _deliver(self, batch: List[_Job], done: "Future[List[Transcription]]", started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.in_flight -= len(batch)
+            self.batch_seconds = elapsed if not self.batch_seconds else 0.8 * self.batch_seconds + 0.2 * elapsed
+        self._slots.release()
+        exc = done.exception()
+        if exc is not None:
+            logger.error("Whisper batch of %d failed: %s", len(batch), exc)
+            for job in batch:
+                job.future.set_exception(exc)
+            return
+        for job, transcription in zip(batch, done.result()):
+            job.future.set_result(transcription)
+        logger.debug("Transcribed batch of %d in %.3fs", len(batch), elapsed)
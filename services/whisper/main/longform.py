@@ -0,0 +1,159 @@
+"""Long recordings: memory-mapped WAV windows cut at quiet points and stitched back together."""
+
+from __future__ import annotations
+
+import difflib
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from .engine import SAMPLE_RATE, resample
+
+
+class UnsupportedWav(ValueError):
+    """The file is not an uncompressed 16-bit PCM WAV and cannot be memory-mapped."""
+
+
+class WavMap:
+    """Read-only view of a 16-bit PCM WAV file backed by ``np.memmap``.
+
+    Only the slices that are actually read get paged in, so memory use is bounded by
+    the windows in flight rather than the length of the recording.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        offset, size, self.channels, self.sample_rate = self._parse_header()
+        frames = size // (2 * self.channels)
+        self._samples = np.memmap(
+            self.path, dtype="<i2", mode="r", offset=offset, shape=(frames, self.channels)
+        )
+
+    def __len__(self) -> int:
+        return self._samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return len(self) / self.sample_rate
+
+    def _parse_header(self) -> Tuple[int, int, int, int]:
+        try:
+            return self._read_chunks()
+        except struct.error as exc:
+            raise UnsupportedWav("truncated WAV header") from exc
+
+    def _read_chunks(self) -> Tuple[int, int, int, int]:
+        with self.path.open("rb") as handle:
+            riff, _, wave = struct.unpack("<4sI4s", handle.read(12))
+            if riff != b"RIFF" or wave != b"WAVE":
+                raise UnsupportedWav("not a RIFF/WAVE file")
+            fmt = None
+            while True:
+                header = handle.read(8)
+                if len(header) < 8:
+                    raise UnsupportedWav("no data chunk")
+                chunk_id, chunk_size = struct.unpack("<4sI", header)
+                if chunk_id == b"fmt ":
+                    fmt = struct.unpack("<HHIIHH", handle.read(16))
+                    handle.seek(chunk_size - 16 + chunk_size % 2, 1)
+                elif chunk_id == b"data":
+                    if fmt is None:
+                        raise UnsupportedWav("data chunk before fmt chunk")
+                    audio_format, channels, sample_rate, _, _, bits = fmt
+                    # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, which ffmpeg and sox emit for PCM too.
+                    if audio_format not in (1, 0xFFFE) or bits != 16:
+                        raise UnsupportedWav("only 16-bit PCM WAV can be memory-mapped")
+                    # Streaming writers leave the size at 0 or 0xFFFFFFFF; use the file length.
+                    available = self.path.stat().st_size - handle.tell()
+                    size = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+                    return handle.tell(), size, channels, sample_rate
+                else:
+                    handle.seek(chunk_size + chunk_size % 2, 1)
+
+    def energy(self, start: int, end: int, frame: int) -> np.ndarray:
+        """Mean absolute amplitude of each ``frame``-sample block in ``[start, end)``."""
+        block = np.abs(self._samples[start:end].astype(np.float32)).mean(axis=1)
+        usable = len(block) - len(block) % frame
+        if usable <= 0:
+            return np.zeros(0, dtype=np.float32)
+        return block[:usable].reshape(-1, frame).mean(axis=1)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Samples ``[start, end)`` as mono float32 at the model sample rate."""
+        block = self._samples[start:end].astype(np.float32).mean(axis=1) / 32768.0
+        return resample(block, self.sample_rate, SAMPLE_RATE)
+
+
+@dataclass(frozen=True)
+class Window:
+    start: int
+    end: int
+
+
+def plan_windows(
+    wav: WavMap,
+    *,
+    window_s: float = 28.0,
+    overlap_s: float = 2.0,
+    search_s: float = 4.0,
+    frame_ms: float = 30.0,
+) -> List[Window]:
+    """Cover the recording with windows of at most ``window_s`` overlapping by ``overlap_s``.
+
+    Each window ends at the quietest ``frame_ms`` frame in its last ``search_s`` seconds,
+    a cheap energy VAD that keeps cuts out of the middle of words. Only the search
+    regions are read from disk.
+    """
+    if window_s <= overlap_s:
+        raise ValueError("window_s must exceed overlap_s")
+    rate = wav.sample_rate
+    window = int(window_s * rate)
+    overlap = int(overlap_s * rate)
+    search = max(0, min(int(search_s * rate), window - overlap - rate))
+    frame = max(1, int(frame_ms * rate / 1000))
+    total = len(wav)
+
+    windows: List[Window] = []
+    start = 0
+    while start < total:
+        end = start + window
+        if end >= total:
+            windows.append(Window(start, total))
+            break
+        energy = wav.energy(end - search, end, frame)
+        if len(energy):
+            end = end - search + int(np.argmin(energy)) * frame + frame // 2
+        windows.append(Window(start, end))
+        start = end - overlap
+    return windows
+
+
+def merge_overlap(text: str, following: str, *, span: int = 80, min_match: int = 4) -> str:
+    """Append ``following`` to ``text``, dropping the words both windows transcribed.
+
+    The overlap is located as the longest common run of characters between the tail
+    of ``text`` and the head of ``following``, which works for unspaced Chinese as
+    well as spaced languages. Without a convincing match the texts are joined as-is.
+    """
+    following = following.strip()
+    if not text:
+        return following
+    if not following:
+        return text
+    tail = text[-span:]
+    head = following[:span]
+    match = difflib.SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+        0, len(tail), 0, len(head)
+    )
+    if match.size >= min_match:
+        cut = len(text) - len(tail) + match.a + match.size
+        return text[:cut] + following[match.b + match.size :]
+    joiner = "" if _is_cjk(text[-1]) or _is_cjk(following[0]) else " "
+    return text + joiner + following
+
+
+def _is_cjk(char: str) -> bool:
+    return "\u3000" <= char <= "\u9fff" or "\uff00" <= char <= "\uffef"
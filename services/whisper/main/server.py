@@ -3,15 +3,40 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import tempfile
+from collections import Counter, deque
 
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+import numpy as np
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import yaml
 
+from .engine import (
+    SAMPLE_RATE,
+    DynamicBatcher,
+    EnginePool,
+    QueueFull,
+    Transcription,
+    WhisperEngine,
+    load_audio,
+    pcm16_to_float32,
+)
+from .longform import UnsupportedWav, WavMap, merge_overlap, plan_windows
+
+
+logger = logging.getLogger("aila.whisper")
+
 
 class TranscribeRequest(BaseModel):
     audio_path: str
@@ -21,11 +46,22 @@ class TranscribeRequest(BaseModel):
 class WhisperConfig(BaseModel):
     model: str
     model_dir: str
-    device: str = "cuda"
-    precision: str = "fp16"
+    device: str = "cpu"
+    precision: str = "int8"
     beam_size: int = 5
     temperature: float = 0.0
     sample_rate: int = 16000
+    max_batch_size: int = 4
+    max_batch_wait_ms: float = 20.0
+    cpu_threads: int = 0
+    num_workers: int = 1
+    workers: int = 2
+    max_queue: int = 32
+    max_upload_mb: float = 64.0
+    stream_partial_interval_ms: int = 1000
+    long_window_s: float = 28.0
+    long_overlap_s: float = 2.0
+    max_long_upload_mb: float = 1024.0
     listen_host: str = "0.0.0.0"
     listen_port: int = 9081
 
@@ -35,28 +71,345 @@ def load_config(path: Path) -> WhisperConfig:
     return WhisperConfig(**data)
 
 
-def create_app(config: WhisperConfig) -> FastAPI:
-    app = FastAPI(title="Aila Whisper Service")
+# Content types carried as headerless 16-bit little-endian mono PCM.
+_PCM_TYPES = {"audio/l16", "audio/pcm", "audio/x-raw", "audio/s16le"}
+
+
+def _content_type(header: str) -> Tuple[str, Dict[str, str]]:
+    mime, _, rest = header.partition(";")
+    params: Dict[str, str] = {}
+    for part in rest.split(";"):
+        key, _, value = part.partition("=")
+        if key.strip():
+            params[key.strip().lower()] = value.strip().strip('"')
+    return mime.strip().lower(), params
+
+
+def _response(result: Transcription) -> Dict[str, Any]:
+    return {"text": result.text, "language": result.language, "duration": result.duration}
+
+
+def _too_busy(exc: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(math.ceil(exc.retry_after))})
+
+
+def _backend(config: WhisperConfig) -> Any:
+    """Worker processes when ``workers`` > 0, otherwise a single in-process model."""
+    if config.workers > 0:
+        return EnginePool.from_config(config)
+    return WhisperEngine.from_config(config)
+
+
+def create_app(config: WhisperConfig, backend: Any = None) -> FastAPI:
+    """Build the service; models are loaded here, once, rather than per request."""
+    backend = backend or _backend(config)
+    batcher = DynamicBatcher(
+        backend,
+        max_batch_size=config.max_batch_size,
+        max_wait_ms=config.max_batch_wait_ms,
+        max_in_flight=getattr(backend, "workers", 1),
+        max_queue=config.max_queue,
+    )
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        yield
+        batcher.close()
+
+    app = FastAPI(title="Aila Whisper Service", lifespan=lifespan)
 
     @app.get("/health")
     def health() -> Dict[str, Any]:
-        return {"status": "ok", "model": config.model, "device": config.device}
+        return {
+            "status": "ok",
+            "model": config.model,
+            "device": config.device,
+            "precision": config.precision,
+            "queue_depth": batcher.queue_depth,
+            "in_flight": batcher.in_flight,
+        }
 
-    @app.post("/transcribe")
-    def transcribe(request: TranscribeRequest) -> Dict[str, Any]:
-        audio_path = Path(request.audio_path)
-        if not audio_path.exists():
-            raise HTTPException(status_code=400, detail="audio_path not found")
-
-        # Placeholder inference logic.
-        # Integrate whisper.cpp or transformers pipeline in future iterations.
-        transcript = f"[mock-transcript] {audio_path.name}"
+    @app.get("/stats")
+    def stats() -> Dict[str, Any]:
+        return batcher.stats()
+
+    max_upload = int(config.max_upload_mb * 1024 * 1024)
+    max_long_upload = int(config.max_long_upload_mb * 1024 * 1024)
+    # The model window: streaming partials only ever re-decode the most recent 30 s.
+    window = 30 * SAMPLE_RATE
+
+    def decode(data: bytes, mime: str, rate: Optional[str]) -> np.ndarray:
+        if mime in _PCM_TYPES:
+            return pcm16_to_float32(data, int(rate or config.sample_rate), SAMPLE_RATE)
+        return load_audio(io.BytesIO(data))
+
+    async def run(audio: np.ndarray, language: Optional[str]) -> Transcription:
+        try:
+            future = batcher.submit(audio, language)
+        except QueueFull as exc:
+            raise _too_busy(exc) from exc
+        return await asyncio.wrap_future(future)
+
+    async def transcribe_windows(wav: WavMap, language: Optional[str]) -> Dict[str, Any]:
+        windows = await run_in_threadpool(
+            plan_windows, wav, window_s=config.long_window_s, overlap_s=config.long_overlap_s
+        )
+        results: List[Optional[Transcription]] = [None] * len(windows)
+        pending: Dict["asyncio.Future[Transcription]", int] = {}
+        # Enough windows in flight to fill every worker's batch, and no more: each one
+        # is a decoded slice held in memory until its transcript comes back.
+        limit = batcher.max_in_flight * batcher.max_batch_size
+
+        async def collect() -> None:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        try:
+            for index, window in enumerate(windows):
+                while len(pending) >= limit:
+                    await collect()
+                audio = await run_in_threadpool(wav.read, window.start, window.end)
+                while True:
+                    try:
+                        future = batcher.submit(audio, language)
+                        break
+                    except QueueFull as exc:
+                        # Shared queue full: wait for our own windows before giving up.
+                        if not pending:
+                            raise _too_busy(exc) from exc
+                        await collect()
+                pending[asyncio.wrap_future(future)] = index
+            while pending:
+                await collect()
+        finally:
+            for future in pending:
+                future.cancel()
+
+        text = ""
+        for result in results:
+            text = merge_overlap(text, result.text if result else "")
+        languages = Counter(result.language for result in results if result)
         return {
-            "text": transcript,
-            "language": request.language or "auto",
-            "status": "placeholder",
+            "text": text,
+            "language": languages.most_common(1)[0][0] if languages else language,
+            "duration": wav.duration,
+            "windows": len(windows),
         }
 
+    def check_length(request: Request, limit: int, setting: str = "max_upload_mb") -> None:
+        """Reject a declared oversize body before reading any of it."""
+        try:
+            declared = int(request.headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid Content-Length") from None
+        if declared > limit:
+            raise HTTPException(status_code=413, detail=f"audio exceeds {setting}")
+
+    async def read_body(request: Request, limit: int) -> bytes:
+        """The request body, read in chunks and refused once it passes ``limit`` bytes."""
+        check_length(request, limit)
+        data = bytearray()
+        async for chunk in request.stream():
+            data += chunk
+            if len(data) > limit:
+                raise HTTPException(status_code=413, detail="audio exceeds max_upload_mb")
+        return bytes(data)
+
+    async def read_request(request: Request) -> Tuple[np.ndarray, Optional[str]]:
+        mime, params = _content_type(request.headers.get("content-type", ""))
+        language = request.query_params.get("language")
+        check_length(request, max_upload)
+        rate = request.query_params.get("sample_rate") or params.get("rate")
+
+        if mime == "application/json":
+            try:
+                body = TranscribeRequest(**json.loads(await read_body(request, max_upload)))
+            except (ValueError, ValidationError) as exc:
+                raise HTTPException(status_code=422, detail="expected {\"audio_path\": ...}") from exc
+            audio_path = Path(body.audio_path)
+            if not audio_path.exists():
+                raise HTTPException(status_code=400, detail="audio_path not found")
+            return await run_in_threadpool(load_audio, str(audio_path)), body.language or language
+
+        if mime == "multipart/form-data":
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="multipart upload needs a 'file' field")
+            if upload.size is not None and upload.size > max_upload:
+                raise HTTPException(status_code=413, detail="audio exceeds max_upload_mb")
+            data = await upload.read()
+            mime, params = _content_type(upload.content_type or "")
+            language = str(form.get("language") or "") or language
+            rate = str(form.get("sample_rate") or "") or params.get("rate") or rate
+        else:
+            data = await read_body(request, max_upload)
+
+        if not data:
+            raise HTTPException(status_code=400, detail="empty audio body")
+        if len(data) > max_upload:
+            raise HTTPException(status_code=413, detail="audio exceeds max_upload_mb")
+        return await run_in_threadpool(decode, data, mime, rate), language
+
+    @app.post("/transcribe")
+    async def transcribe(request: Request) -> Dict[str, Any]:
+        """Transcribe a JSON ``{"audio_path": ...}`` reference, a multipart ``file`` or a raw body.
+
+        Raw bodies may be any container ffmpeg decodes, or headerless 16-bit PCM when sent
+        as ``audio/L16`` (rate from the ``rate`` parameter or ``?sample_rate=``).
+        """
+        try:
+            audio, language = await read_request(request)
+        except HTTPException:
+            raise
+        except Exception as exc:
+            logger.warning("Failed to decode upload: %s", exc)
+            raise HTTPException(status_code=400, detail="audio could not be decoded") from exc
+        return _response(await run(audio, language))
+
+    @app.post("/transcribe/long")
+    async def transcribe_long(request: Request) -> Dict[str, Any]:
+        """Transcribe a long 16-bit PCM WAV as overlapping windows decoded in parallel.
+
+        Accepts the same JSON ``{"audio_path": ...}`` body as ``/transcribe`` or a raw WAV
+        body, which is spooled to a temporary file so it can be memory-mapped.
+        """
+        mime, _ = _content_type(request.headers.get("content-type", ""))
+        language = request.query_params.get("language")
+        spooled: Optional[Path] = None
+        try:
+            if mime == "application/json":
+                try:
+                    body = TranscribeRequest(**json.loads(await read_body(request, max_upload)))
+                except (ValueError, ValidationError) as exc:
+                    raise HTTPException(status_code=422, detail="expected {\"audio_path\": ...}") from exc
+                audio_path = Path(body.audio_path)
+                if not audio_path.exists():
+                    raise HTTPException(status_code=400, detail="audio_path not found")
+                language = body.language or language
+            else:
+                check_length(request, max_long_upload, "max_long_upload_mb")
+                with tempfile.NamedTemporaryFile(delete=False, prefix="aila-whisper-", suffix=".wav") as handle:
+                    spooled = Path(handle.name)
+                    written = 0
+                    async for chunk in request.stream():
+                        written += len(chunk)
+                        if written > max_long_upload:
+                            raise HTTPException(status_code=413, detail="audio exceeds max_long_upload_mb")
+                        # Disk writes off the event loop: a slow volume must not stall other requests.
+                        await run_in_threadpool(handle.write, chunk)
+                audio_path = spooled
+            try:
+                wav = WavMap(audio_path)
+            except (UnsupportedWav, ValueError, OSError) as exc:
+                raise HTTPException(status_code=415, detail=f"long mode needs a 16-bit PCM WAV: {exc}") from exc
+            return await transcribe_windows(wav, language)
+        finally:
+            if spooled is not None:
+                spooled.unlink(missing_ok=True)
+
+    @app.websocket("/stream")
+    async def stream(websocket: WebSocket) -> None:
+        """Incremental transcription of 16-bit mono PCM frames.
+
+        An optional first text frame ``{"language": ..., "sample_rate": ...}`` configures the
+        session. Binary frames append audio; every ``stream_partial_interval_ms`` of new audio
+        yields a ``partial`` event over the trailing 30 s. The text frame ``{"type": "end"}``
+        (or ``"end"``) returns a ``final`` event for the whole utterance and resets the buffer.
+        An utterance longer than ``max_upload_mb`` of 16-bit PCM is dropped with an ``error``.
+        """
+        await websocket.accept()
+        language: Optional[str] = None
+        sample_rate = config.sample_rate
+        chunks: list = []  # the whole utterance, for the final
+        recent: Deque[np.ndarray] = deque()  # just enough trailing frames for a partial
+        recent_samples = 0
+        max_samples = max_upload // 2
+        samples = 0
+        since_partial = 0
+        partial_every = SAMPLE_RATE * config.stream_partial_interval_ms // 1000
+        pending: Optional[asyncio.Task] = None
+
+        async def send_partial(audio: np.ndarray, duration: float) -> None:
+            try:
+                result = await run(audio, language)
+            except HTTPException:
+                return  # overloaded: skip this partial, the final still gets queued
+            await websocket.send_json({"type": "partial", "text": result.text, "duration": duration})
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes") is not None:
+                    frame = pcm16_to_float32(message["bytes"], sample_rate, SAMPLE_RATE)
+                    if samples + len(frame) > max_samples:
+                        if pending is not None:
+                            pending.cancel()
+                            pending = None
+                        chunks, samples, since_partial = [], 0, 0
+                        recent.clear()
+                        recent_samples = 0
+                        await websocket.send_json({"type": "error", "detail": "utterance exceeds max_upload_mb"})
+                        continue
+                    chunks.append(frame)
+                    recent.append(frame)
+                    samples += len(frame)
+                    recent_samples += len(frame)
+                    since_partial += len(frame)
+                    while recent_samples - len(recent[0]) >= window:
+                        recent_samples -= len(recent.popleft())
+                    # Skip a partial while the previous one is still decoding so slow
+                    # inference never builds a backlog behind a fast talker.
+                    if since_partial >= partial_every and (pending is None or pending.done()):
+                        since_partial = 0
+                        audio = np.concatenate(recent)[-window:]
+                        pending = asyncio.create_task(send_partial(audio, samples / SAMPLE_RATE))
+                    continue
+
+                text = (message.get("text") or "").strip()
+                try:
+                    payload = json.loads(text) if text.startswith("{") else {"type": text}
+                except ValueError:
+                    payload = {"type": "invalid"}
+                if payload.get("type", "config") == "config":
+                    language = payload.get("language") or language
+                    try:
+                        rate = int(payload.get("sample_rate", sample_rate))
+                    except (TypeError, ValueError):
+                        rate = 0
+                    if rate <= 0:
+                        await websocket.send_json({"type": "error", "detail": "sample_rate must be a positive integer"})
+                        continue
+                    sample_rate = rate
+                    continue
+                if payload.get("type") != "end":
+                    await websocket.send_json({"type": "error", "detail": "unknown message"})
+                    continue
+                if pending is not None:
+                    await pending
+                    pending = None
+                if not chunks:
+                    await websocket.send_json({"type": "final", "text": "", "language": language, "duration": 0.0})
+                    continue
+                try:
+                    result = await run(np.concatenate(chunks), language)
+                except HTTPException as exc:
+                    retry_after = (exc.headers or {}).get("Retry-After")
+                    await websocket.send_json({"type": "error", "detail": exc.detail, "retry_after": retry_after})
+                    continue
+                await websocket.send_json({"type": "final", **_response(result)})
+                chunks, samples, since_partial = [], 0, 0
+                recent.clear()
+                recent_samples = 0
+        except WebSocketDisconnect:
+            return
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
     return app
 
 
@@ -67,6 +420,7 @@ def main() -> None:
 
     config_path = Path(args.config)
     config = load_config(config_path)
+    logging.basicConfig(level=logging.INFO)
 
     app = create_app(config)
 
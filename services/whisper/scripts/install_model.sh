@@ -11,8 +11,7 @@ MODELS_DIR="${MODELS_DIR:-/opt/aila/whisper/models}"
 mkdir -p "${MODELS_DIR}"
 
 case "${SIZE}" in
-  tiny|base|small|medium|large)
-    MODEL_URL="https://huggingface.co/ggerganov/whisper.cpp/resolve/main/ggml-${SIZE}.bin"
+  tiny|base|small|medium|large-v2|large-v3)
     ;;
   *)
     echo "Unsupported size: ${SIZE}" >&2
@@ -20,4 +19,11 @@ case "${SIZE}" in
     ;;
 esac
 
-curl -L "${MODEL_URL}" -o "${MODELS_DIR}/ggml-${SIZE}.bin"
+# CTranslate2 conversion of the OpenAI checkpoints, as loaded by faster-whisper.
+python3 - "${SIZE}" "${MODELS_DIR}/${SIZE}" <<'PY'
+import sys
+
+from faster_whisper import download_model
+
+download_model(sys.argv[1], output_dir=sys.argv[2])
+PY